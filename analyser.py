@@ -1,13 +1,29 @@
 """Analyser class for running analysis on columns depending on the column type"""
 
 
+import heapq
 import re
-from statistics import mode, StatisticsError
+import sys
+from array import array
+from collections import Counter
 
-from math import floor, log10, pow, ceil
+from math import floor, fsum, log10, pow, ceil
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from .storage import NumericVector, INT, FLOAT, BAD
+    from .sketch import Moments, KLL, DistinctCount, SpaceSaving
+except:
+    from storage import NumericVector, INT, FLOAT, BAD
+    from sketch import Moments, KLL, DistinctCount, SpaceSaving
 
 threshold = 0.9
 max_Outliers = 100
+sketch_chunk_size = 65536
 standardDeviations = 3
 re_date = re.compile('^((31(\/|-)(0?[13578]|1[02]))(\/|-)|((29|30)(\/|-)(0?[1,3-9]|1[0-2])(\/|-)))((1[6-9]|[2-9]\d)?\d{2})$|^(29(\/|-)0?2(\/|-)(((1[6-9]|[2-9]\d)?(0[48]|[2468][048]|[13579][26])|((16|[2468][048]|[3579][26])00))))$|^(0?[1-9]|1\d|2[0-8])(\/|-)((0?[1-9])|(1[0-2]))(\/|-)((1[6-9]|[2-9]\d)?\d{2})$')
 re_dateDF = re.compile('^\d{1,2}(\/|-)((0?[12])|(12))')
@@ -20,12 +36,283 @@ re_timeAM = re.compile('[aA][mM]$')
 re_timehr = re.compile('^\d{1,2}')
 
 
+def mode_of(counts):
+    """Returns the most common value in a frequency table, or 'N/A' if it is empty. As with
+    statistics.mode, before Python 3.8 'N/A' is also returned if there is more than one most
+    common value, from 3.8 the first value counted is returned.
+
+    Keyword arguments:
+        counts -- A Counter of the number of times each value appears.
+    """
+    top = counts.most_common(2)
+    if not top:
+        return 'N/A'
+    if len(top) == 2 and top[0][1] == top[1][1] and sys.version_info < (3, 8):
+        return 'N/A'
+    return top[0][0]
+
+
+def convert_counts(counts, convert):
+    """Returns a frequency table of the values given by convert for each value in counts,
+    adding together the counts of values that convert to the same value. Values which convert
+    returns None for or raises ValueError on are left out. If counts is a SpaceSaving summary a
+    summary of the converted values kept is returned, with the same distinct count.
+
+    Keyword arguments:
+        counts -- A Counter of the number of times each value appears.
+
+        convert -- Function returning the converted value of a value, or None.
+    """
+    if isinstance(counts, SpaceSaving):
+        summary = SpaceSaving(counts.capacity)
+        summary.n = counts.n
+        summary.distinct = counts.distinct
+        errors = convert_counts(Counter(counts.errors), convert)
+        for value, occurrences in convert_counts(Counter(counts.counts), convert).items():
+            summary.counts[value] = occurrences
+            summary.errors[value] = errors.get(value, 0)
+            summary.push(value)
+        return summary
+    converted = Counter()
+    for value, occurrences in counts.items():
+        try:
+            new_value = convert(value)
+        except ValueError:
+            continue
+        if new_value is None:
+            continue
+        if new_value != new_value:
+            # Each NaN is a different value when counted, as it is not equal to itself
+            for i in range(occurrences):
+                converted[float('nan')] = 1
+        else:
+            converted[new_value] += occurrences
+    return converted
+
+
+def counted(values, counts):
+    """Returns (value, occurrences) for each distinct value in counts, or for each value in
+    values if counts is a SpaceSaving summary which only keeps the most common.
+
+    Keyword arguments:
+        values -- A list of values.
+
+        counts -- A Counter or SpaceSaving of the number of times each value appears.
+    """
+    if isinstance(counts, SpaceSaving):
+        return ((value, 1) for value in values)
+    return counts.items()
+
+
+def quantiles(ranked, length):
+    """Returns the median, lower quartile and upper quartile of a set of numbers.
+
+    Keyword arguments:
+        ranked -- Function returning the number at a position of the numbers once sorted.
+
+        length -- The amount of numbers.
+    """
+    median_index = (length+1)/2 - 1
+    qlow_index = (length+1)/4 - 1
+    qup_index = 3*(length+1)/4 - 1
+    if median_index % 1 == 0:
+        median = ranked(int(median_index))
+    else:
+        median = (ranked(floor(median_index))+ranked(ceil(median_index)))/2
+    if qlow_index % 1 == 0:
+        quartile_low = ranked(int(qlow_index))
+        quartile_up = ranked(int(qup_index))
+    else:
+        quartile_low = (ranked(floor(qlow_index)) + ranked(ceil(qlow_index))) / 2
+        quartile_up = (ranked(floor(qup_index)) + ranked(ceil(qup_index))) / 2
+    return median, quartile_low, quartile_up
+
+
+def describe(vector, spread, limit=None, quantile_sketch=0):
+    """Returns the statistics of the numbers in a NumericVector as a dictionary with the keys
+    min, max, mean, stdev, median, quartile_low, quartile_up, outlier_rows, outlier_count and
+    moments, the Moments of the numbers, and quantile_error, the bound on the rank error of the
+    quartiles as a fraction of the count or None if they are exact.
+    Outliers are numbers more than spread times the interquartile range outside the quartiles,
+    outlier_count is the number of them and outlier_rows an array of the positions in the
+    vector of the limit furthest outside, ordered by value. Uses numpy when it is installed,
+    otherwise Python, both give the same results once rounded. Returns None if there are no
+    numbers.
+
+    Keyword arguments:
+        vector -- A NumericVector of the values of a column.
+
+        spread -- Number of interquartile ranges outside the quartiles a number must be to
+        be an outlier.
+
+        limit -- The most outlier positions to keep, default max_Outliers.
+
+        quantile_sketch -- If not 0 the quartiles are estimated with a KLL sketch of this
+        size, see describe_sketch, instead of selected exactly.
+    """
+    if limit is None:
+        limit = max_Outliers
+    if vector.count(INT) + vector.count(FLOAT) == 0:
+        return None
+    if quantile_sketch:
+        return describe_sketch(vector, spread, limit, quantile_sketch)
+    if numpy is not None and not vector.exact:
+        stats = describe_numpy(vector, spread, limit)
+        if stats is not None:
+            return stats
+    return describe_values(vector, spread, limit)
+
+
+def describe_values(vector, spread, limit):
+    """Returns the statistics of the numbers in a NumericVector as describe does, using Python."""
+    values = vector.numbers()
+    length = len(values)
+    minimum = values[0]
+    maximum = values[1] if length > 1 else values[0]
+    for x in values:
+        if x < minimum:
+            minimum = x
+        if x > maximum:
+            maximum = x
+    moments = Moments.of(values)
+    mean = moments.mean
+    stdev = moments.stdev()
+    median, quartile_low, quartile_up = quantiles(sorted(values).__getitem__, length)
+    IQR = quartile_up - quartile_low
+    low = quartile_low - spread * IQR
+    up = quartile_up + spread * IQR
+    positions = (x for x, kind in enumerate(vector.kinds) if kind == INT or kind == FLOAT)
+    outliers = [(low - value if value < low else value - up, x, value)
+                for x, value in zip(positions, values) if value < low or value > up]
+    # Keep the furthest outside, the first row on ties, then show them in order of value
+    extreme = heapq.nsmallest(limit, outliers, key=lambda outlier: (-outlier[0], outlier[1]))
+    extreme.sort(key=lambda outlier: (outlier[2], outlier[1]))
+    return {'min': minimum, 'max': maximum, 'mean': mean, 'stdev': stdev, 'median': median,
+            'quartile_low': quartile_low, 'quartile_up': quartile_up,
+            'outlier_rows': array('Q', [outlier[1] for outlier in extreme]),
+            'outlier_count': len(outliers), 'moments': moments, 'quantile_error': None}
+
+
+def describe_sketch(vector, spread, limit, k):
+    """Returns the statistics of the numbers in a NumericVector as describe does, reading the
+    numbers a chunk at a time into mergeable summaries so memory does not grow with the size of
+    the column: the quartiles and median come from a KLL sketch holding O(k) numbers and the
+    outliers are kept in a heap of at most limit.
+    """
+    moments = Moments()
+    quantiles = KLL(k)
+    minimum = maximum = None
+    for positions, numbers in vector.chunks(sketch_chunk_size):
+        if not numbers:
+            continue
+        low, high = min(numbers), max(numbers)
+        if minimum is None or low < minimum:
+            minimum = low
+        if maximum is None or high > maximum:
+            maximum = high
+        moments.update(numbers)
+        quantiles.update(numbers)
+    median = quantiles.quantile(0.5)
+    quartile_low = quantiles.quantile(0.25)
+    quartile_up = quantiles.quantile(0.75)
+    IQR = quartile_up - quartile_low
+    low = quartile_low - spread * IQR
+    up = quartile_up + spread * IQR
+    extreme = []
+    outlier_count = 0
+    for positions, numbers in vector.chunks(sketch_chunk_size):
+        for x, value in zip(positions, numbers):
+            if value < low or value > up:
+                outlier_count += 1
+                # Smallest first so the nearest, or the later row on ties, is dropped
+                outlier = (low - value if value < low else value - up, -x, value)
+                if len(extreme) < limit:
+                    heapq.heappush(extreme, outlier)
+                elif outlier > extreme[0]:
+                    heapq.heapreplace(extreme, outlier)
+    extreme.sort(key=lambda outlier: (outlier[2], -outlier[1]))
+    return {'min': minimum, 'max': maximum, 'mean': moments.mean, 'stdev': moments.stdev(),
+            'median': median, 'quartile_low': quartile_low, 'quartile_up': quartile_up,
+            'outlier_rows': array('Q', [-outlier[1] for outlier in extreme]),
+            'outlier_count': outlier_count, 'moments': moments,
+            'quantile_error': quantiles.rank_error()}
+
+
+def describe_numpy(vector, spread, limit):
+    """Returns the statistics of the numbers in a NumericVector as describe does, using numpy.
+    Quartiles are selected with numpy.partition rather than sorting all the numbers. Returns
+    None if any number is not finite, as numpy orders these differently to Python.
+    """
+    kinds = numpy.frombuffer(vector.kinds, dtype=numpy.uint8)
+    is_number = (kinds == INT) | (kinds == FLOAT)
+    numbers = numpy.frombuffer(vector.floats, dtype=numpy.float64)[is_number]
+    if not numpy.isfinite(numbers).all():
+        return None
+    is_int = kinds[is_number] == INT
+    all_int = bool(is_int.all())
+    mixed = not all_int and bool(is_int.any())
+    length = len(numbers)
+
+    def number(i):
+        # Integers are returned as int so they are rounded and shown as Python shows them
+        if is_int[i]:
+            return int(numbers[i])
+        return float(numbers[i])
+
+    positions = set()
+    for index in ((length+1)/2 - 1, (length+1)/4 - 1, 3*(length+1)/4 - 1):
+        positions.update(k for k in (floor(index), ceil(index)) if k < length)
+    ordered = numpy.partition(numbers, sorted(positions))
+
+    def ranked(k):
+        value = ordered[k]
+        if all_int:
+            return int(value)
+        if not mixed and value != 0:
+            return float(value)
+        # Equal numbers may differ in type or sign of zero, a stable sort puts them in their
+        # original order so find which one is at k
+        before = int(numpy.count_nonzero(numbers < value))
+        return number(numpy.flatnonzero(numbers == value)[k - before])
+
+    # The same operations as Moments.of, fsum is correctly rounded so the results match
+    mean = fsum(numbers) / length
+    deviations = numbers - mean
+    squares = deviations * deviations
+    moments = Moments(length, mean, fsum(squares), fsum(squares * deviations), fsum(squares * squares))
+    stdev = moments.stdev()
+    median, quartile_low, quartile_up = quantiles(ranked, length)
+    IQR = quartile_up - quartile_low
+    low = quartile_low - spread * IQR
+    up = quartile_up + spread * IQR
+    outliers = numpy.flatnonzero((numbers < low) | (numbers > up))
+    outlier_count = len(outliers)
+    if outlier_count > limit:
+        # Keep the furthest outside, the first row on ties
+        distance = numpy.maximum(low - numbers[outliers], numbers[outliers] - up)
+        outliers = outliers[numpy.lexsort((outliers, -distance))[:limit]]
+    outliers = outliers[numpy.lexsort((outliers, numbers[outliers]))]
+    outlier_rows = array('Q', numpy.flatnonzero(is_number)[outliers].astype(numpy.uint64).tobytes())
+    # As describe_values, the maximum starts from the second number when there is one
+    maximum = int(numpy.argmax(numbers))
+    if length > 1 and numbers[1] == numbers[maximum]:
+        maximum = 1
+    return {'min': number(int(numpy.argmin(numbers))), 'max': number(maximum),
+            'mean': mean, 'stdev': stdev, 'median': median, 'quartile_low': quartile_low,
+            'quartile_up': quartile_up, 'outlier_rows': outlier_rows, 'outlier_count': outlier_count,
+            'moments': moments, 'quantile_error': None}
+
+
 class Analyser(object):
     """
     Base analysis class object. Initiate the object, and assigns the statistical mode, if any.
     
     Global variables:        
-        max_Outliers -- the maximum amount of outliers that will be found.
+        max_Outliers -- the maximum amount of outliers that will be listed, the most extreme
+        are kept.
+
+        sketch_chunk_size -- Number of values read at a time when quartiles are estimated with
+        a quantile sketch.
         
         standardDeviations -- The number of standard deviations away from the mean a value is
         allowed to be before it is an error, default 3.  
@@ -52,6 +339,18 @@ class Analyser(object):
         mode -- Returns the mode of the column analysed.
         
         unique -- The count of unique values in the column.
+
+        unique_exact -- Whether unique is exact, False if it is estimated.
+
+    Analysers take an optional counts keyword argument, a Counter of the number of times each
+    value appears in values, which is used instead of counting the values again, or a
+    SpaceSaving summary of the most common values for columns with too many distinct values to
+    count exactly. Numerical and scientific notation analysers also take a vector keyword
+    argument, a NumericVector of the values parsed with the parse method of the analyser, so
+    values are not parsed again, a row_number keyword argument, a function returning the row
+    number to report for the position of a value in the column, and a quantile_sketch keyword
+    argument, the size of the KLL sketch used to estimate the quartiles or 0 to find them
+    exactly.
     
     Child classes and associated variables:
         StringAnalyser -- String column analysis.
@@ -73,13 +372,25 @@ class Analyser(object):
             
             upper quartile -- Upper quartile for column values.
             
-            normDist -- String Yes/No if columns value is normally distributed.
+            normDist -- String Yes/No if columns value is normally distributed by the
+            Jarque-Bera test, N/A if all values are the same.
+
+            moments -- Moments of the column values, which can be merged with those of other
+            columns or files.
+
+            quantile_error -- Bound on the rank error of the quartiles and median as a fraction
+            of the count when they are estimated with a quantile sketch, None if exact.
             
             stdev -- Standard deviation for column values, N/A if not normally distributed to
             within 95.5% confidence.
                     
-            stDevOutliers -- List of values outside a certain number of standard deviations
-            from the mean.
+            stDevOutliers -- List of the row and value of the outliers furthest outside the
+            quartiles, at most max_Outliers, followed by the number of outliers if there are
+            more.
+
+            outlier_rows -- Array of the positions in the column of the outliers listed.
+
+            outlier_count -- The total number of outliers.
                         
         CurrencyAnalyser -- Child class of NumericalAnalyser
     
@@ -99,22 +410,28 @@ class Analyser(object):
             uniqueCount -- Returns the count of unique values in a list.
     """
     def uniqueCount(self, values):
-        """Return the amount of unique values in the values list.
+        """Return the amount of unique values in the values list. Counted exactly up to
+        sketch.distinct_limit values and estimated with a HyperLogLog past it, unique_exact is
+        set to whether the count is exact.
         
         Keyword arguments:
             values -- A list of values.
         """
-        valSet = set()
-        for vals in values:
-            valSet.add(vals)
-        return len(valSet)
-
-    def __init__(self, values):
-        try:
-            self.mode = mode(values)
-        except StatisticsError:
-            self.mode = 'N/A'
-        self.unique = self.uniqueCount(values)
+        distinct = DistinctCount()
+        distinct.update(values)
+        self.unique_exact = distinct.exact
+        return distinct.count()
+
+    def __init__(self, values, counts=None):
+        if counts is None:
+            counts = Counter(values)
+        self.mode = mode_of(counts)
+        if isinstance(counts, SpaceSaving):
+            self.unique = counts.distinct.count()
+            self.unique_exact = counts.distinct.exact
+        else:
+            self.unique = len(counts)
+            self.unique_exact = True
 
 class EmailAnalyser(Analyser):
     """Run email analysis, currently only using Analyser super class methods.
@@ -122,8 +439,8 @@ class EmailAnalyser(Analyser):
     Keyword arguments:
         Analyser -- An analyser object.
     """
-    def __init__(self, values):
-        super().__init__(values)
+    def __init__(self, values, counts=None):
+        super().__init__(values, counts)
         # TODO Something actually useful for emails.
         
 class NumericalAnalyser(Analyser):
@@ -132,74 +449,38 @@ class NumericalAnalyser(Analyser):
     Keyword arguments:
         Analyser -- An analyser object.    
     """
-    def __init__(self, values, stdDevs): 
-        new_values = []
+    def __init__(self, values, stdDevs, counts=None, vector=None, row_number=None,
+                 quantile_sketch=0):
+        if vector is None:
+            vector = NumericVector(values, self.parse, counts)
         isNumeric = True
-        for i in values:
-            if i != '':
-                try:
-                    if "." in i:
-                        new_values.append(float(i))
-                    else:
-                        new_values.append(int(i))
-                except ValueError:
-                    #assuming error cells are not passed to here
-                    isNumeric = False
-                    try:
-                        print("Can't convert: ",i)
-                    except UnicodeEncodeError:
-                        # Character not recognised in python
-                        pass
-        values = [i for i in new_values]
-        super().__init__(values)
-        if isNumeric:
-            self.stDevOutliers = []
-            #standardDeviations = Decimal(stdDevs)
-            length = len(values)
-            if values:
-                self.min = values[0]
-                self.max = values[1]
-            self.mean = 0
-            for x in values:
-                if x < self.min:
-                    self.min = x
-                if x > self.max:
-                    self.max = x
-                self.mean += x
-            self.mean = self.mean /length
-            self.stdev = 0
-            for x in values:
-                self.stdev += pow(x-self.mean, 2)
-            self.stdev = pow(self.stdev/length, 1/2)
-            values.sort()
-            median_index = (length+1)/2 - 1
-            qlow_index = (length+1)/4 - 1
-            qup_index = 3*(length+1)/4 - 1
-            if median_index % 1 == 0:
-                self.median = values[int(median_index)]
-            else:
-                self.median = (values[floor(median_index)]+values[ceil(median_index)])/2
-            if qlow_index % 1 == 0:
-                self.quartile_low = values[int(qlow_index)]
-                self.quartile_up = values[int(qup_index)]
-            else:
-                self.quartile_low = (values[floor(qlow_index)] + values[ceil(qlow_index)]) / 2
-                self.quartile_up = (values[floor(qup_index)] + values[ceil(qup_index)]) / 2
-            IQR = self.quartile_up - self.quartile_low
-            outlier_count = 0
-            for x, value in enumerate(values):
-                if value < (self.quartile_low - stdDevs/2 * IQR) or value > (self.quartile_up + stdDevs/2 * IQR):
-                    self.stDevOutliers.append("Row: %d Value: %s" % (x, value))
-                    outlier_count += 1
-            #if outlier_count > max_Outliers:
-                #self.stDevOutliers = "%d outliers" % outlier_count
-            self.max = self.round_significant(self.max)
-            self.min = self.round_significant(self.min)
-            self.mean = self.round_significant(self.mean)
-            self.quartile_low = self.round_significant(self.quartile_low)
-            self.quartile_up = self.round_significant(self.quartile_up)
-            self.median = self.round_significant(self.median)
-            self.stdev = self.round_significant(self.stdev)
+        for x in vector.positions(BAD):
+            #assuming error cells are not passed to here
+            isNumeric = False
+            try:
+                print("Can't convert: ", values[x])
+            except UnicodeEncodeError:
+                # Character not recognised in python
+                pass
+        if counts is None:
+            counts = Counter(values)
+        super().__init__(values, convert_counts(counts, self.parse))
+        stats = describe(vector, stdDevs/2, quantile_sketch=quantile_sketch) if isNumeric else None
+        if stats is not None:
+            self.outlier_rows = stats['outlier_rows']
+            self.outlier_count = stats['outlier_count']
+            self.moments = stats['moments']
+            self.quantile_error = stats['quantile_error']
+            self.normDist = normal_description(self.moments)
+            self.stDevOutliers = self.format_outliers(vector, self.outlier_rows, self.outlier_count,
+                                                      row_number)
+            self.max = self.round_significant(stats['max'])
+            self.min = self.round_significant(stats['min'])
+            self.mean = self.round_significant(stats['mean'])
+            self.quartile_low = self.round_significant(stats['quartile_low'])
+            self.quartile_up = self.round_significant(stats['quartile_up'])
+            self.median = self.round_significant(stats['median'])
+            self.stdev = self.round_significant(stats['stdev'])
         else:
             print("WARNING: Type error, cannot convert column to numerical value")
             self.min = 'N/A'
@@ -211,6 +492,42 @@ class NumericalAnalyser(Analyser):
             self.stdev = 'N/A'
             self.normDist = 'N/A'
             self.stDevOutliers = 'N/A'
+            self.outlier_rows = array('Q')
+            self.outlier_count = 'N/A'
+            self.moments = Moments()
+            self.quantile_error = None
+
+    @staticmethod
+    def parse(value):
+        """Returns a value as an int, or a float if it has a decimal point, None if it is empty.
+        Raises ValueError if the value is not a number."""
+        if value == '':
+            return None
+        if "." in value:
+            return float(value)
+        return int(value)
+
+    @staticmethod
+    def format_outliers(vector, rows, count, row_number=None):
+        """Returns a list of the row and value of each outlier, followed by the number of
+        outliers if there are more than are listed.
+
+        Keyword arguments:
+            vector -- The NumericVector the outliers were found in.
+
+            rows -- Array of the positions of the outliers in the vector.
+
+            count -- The total number of outliers.
+
+            row_number -- Function returning the row number to show for a position in the
+            vector, default the position counted from 1.
+        """
+        if row_number is None:
+            row_number = lambda x: x + 1
+        outliers = ["Row: %d Value: %s" % (row_number(x), vector.value(x)) for x in rows]
+        if count > len(rows):
+            outliers.append("%d outliers, showing the %d furthest from the quartiles" % (count, len(rows)))
+        return outliers
 
     @staticmethod
     def round_significant(x):
@@ -238,18 +555,16 @@ class NumericalAnalyser(Analyser):
         else:
             return str(base) + "e-" + str(power)
 
-    @staticmethod
-    def is_compatable(values):
-        bad_values = 0
-        for i in values:
-            if i != '':
-                try:
-                    if "." in i:
-                        float(i)
-                    else:
-                        int(i)
-                except:
-                    bad_values += 1
+    @classmethod
+    def is_compatable(cls, values):
+        """Returns whether few enough values are not numbers for the column to be analysed.
+
+        Keyword arguments:
+            values -- The values of the column, or a NumericVector of them.
+        """
+        if not isinstance(values, NumericVector):
+            values = NumericVector(values, cls.parse)
+        bad_values = values.count(BAD)
         if bad_values / len(values) >= threshold:
             return False
         return True
@@ -262,25 +577,23 @@ class CurrencyAnalyser(NumericalAnalyser):
     Keyword arguments:
         NumericalAnalyser -- A NumericalAnalyser object.
     """
-    def __init__(self, values, stdDevs):
-        temp_values = [i for i in values]
-        for x, value in enumerate(temp_values):
-                    temp_values[x] = re.sub('(\$)|(€)|(£)', '', value)
-                    temp_values[x] = temp_values[x].replace('(','-')#negatives
-                    temp_values[x] = temp_values[x].replace(')','')
-                    temp_values[x] = temp_values[x].replace(',','') #long numbers
-        super().__init__(temp_values, stdDevs)
+    def __init__(self, values, stdDevs, counts=None, vector=None, row_number=None,
+                 quantile_sketch=0):
+        super().__init__(values, stdDevs, counts, vector, row_number, quantile_sketch)
 
+    @staticmethod
+    def strip_symbols(value):
+        """Returns a currency value without currency symbols, brackets or commas"""
+        value = re.sub('(\$)|(€)|(£)', '', value)
+        value = value.replace('(','-')#negatives
+        value = value.replace(')','')
+        return value.replace(',','') #long numbers
 
     @staticmethod
-    def is_compatable(values):
-        temp_values = [i for i in values]
-        for x, value in enumerate(temp_values):
-                    temp_values[x] = re.sub('(\$)|(€)|(£)', '', value)
-                    temp_values[x] = temp_values[x].replace('(','-')#negatives
-                    temp_values[x] = temp_values[x].replace(')','')
-                    temp_values[x] = temp_values[x].replace(',','') #long numbers
-        return super(CurrencyAnalyser, CurrencyAnalyser).is_compatable(temp_values)
+    def parse(value):
+        """Returns a currency value as a number once currency symbols are removed, None if it
+        is empty. Raises ValueError if the value is not a number."""
+        return NumericalAnalyser.parse(CurrencyAnalyser.strip_symbols(value))
 
 
 
@@ -290,8 +603,8 @@ class StringAnalyser(Analyser):
     Keyword arguments:
         Analyser -- An analyser object.
     """
-    def __init__(self, values):
-        super().__init__(values)
+    def __init__(self, values, counts=None):
+        super().__init__(values, counts)
         #  TODO Implement some string exclusive statistics.
 
 class IdentifierAnalyser(Analyser):
@@ -300,8 +613,8 @@ class IdentifierAnalyser(Analyser):
     Keyword arguments:
         Analyser -- An analyser object.
     """
-    def __init__(self, values):
-        super().__init__(values)
+    def __init__(self, values, counts=None):
+        super().__init__(values, counts)
         # TODO Implement some identifier exclusive statistics.
         
 class EnumAnalyser(Analyser):
@@ -310,8 +623,8 @@ class EnumAnalyser(Analyser):
     Keyword arguments:
         Analyser -- An analyser object.
     """
-    def __init__(self, values):
-        super().__init__(values)
+    def __init__(self, values, counts=None):
+        super().__init__(values, counts)
         #  TODO Implement some enum exclusive statistics.
                              
 class BooleanAnalyser(Analyser):
@@ -320,8 +633,8 @@ class BooleanAnalyser(Analyser):
     Keyword arguments:
         Analyser -- An analyser object.
     """
-    def __init__(self, values):
-        super().__init__(values)
+    def __init__(self, values, counts=None):
+        super().__init__(values, counts)
 
 class SciNotationAnalyser(Analyser):
     """Run scientific notation analysis.
@@ -332,66 +645,34 @@ class SciNotationAnalyser(Analyser):
     Class Methods:
         int_to_sci -- Converts a a given number into a string in scientific notation form. 
     """
-    def __init__(self, values, stdDevs):
+    def __init__(self, values, stdDevs, counts=None, vector=None, row_number=None,
+                 quantile_sketch=0):
         standardDeviations = stdDevs 
-        new_values = []
+        if vector is None:
+            vector = NumericVector(values, self.parse, counts)
         isNumeric = True
-        for i in values:
-            if i != '':
-                try:
-                    new_values.append(float(i))
-                except:
-                    isNumeric = False
-                    print("Can't convert: ", i)
-        values = [i for i in new_values]
-        super().__init__(values)
-        if isNumeric:
-            length = len(values)
-            self.stDevOutliers = []
-            if values:
-                self.min = values[0]
-                self.max = values[1]
-            self.mean = 0
-            for x in values:
-                if x < self.min:
-                    self.min = x
-                if x > self.max:
-                    self.max = x
-                self.mean += x
-            self.min = NumericalAnalyser.int_to_sci(self.min)
-            self.max = NumericalAnalyser.int_to_sci(self.max)
-            self.mean = self.mean /length
-            self.stdev = 0
-            for x in values:
-                self.stdev += pow(x-self.mean, 2)
-            self.stdev = pow(self.stdev/length, 1/2)
-            values.sort()
-            median_index = (length + 1) / 2 - 1
-            qlow_index = (length + 1) / 4 - 1
-            qup_index = 3 * (length + 1) / 4 - 1
-            if median_index % 1 == 0:
-                self.median = values[int(median_index)]
-            else:
-                self.median = (values[floor(median_index)] + values[ceil(median_index)]) / 2
-            if qlow_index % 1 == 0:
-                self.quartile_low = values[int(qlow_index)]
-                self.quartile_up = values[int(qup_index)]
-            else:
-                self.quartile_low = (values[floor(qlow_index)] + values[ceil(qlow_index)]) / 2
-                self.quartile_up = (values[floor(qup_index)] + values[ceil(qup_index)]) / 2
-            IQR = self.quartile_up - self.quartile_low
-            outlier_count = 0
-            for x, value in enumerate(values):
-                if value < (self.quartile_low - 1.5 * IQR) or value > (self.quartile_up + 1.5 * IQR):
-                    self.stDevOutliers.append("Row: %d Value: %s" % (x, value))
-                    outlier_count += 1
-            #if outlier_count > max_Outliers:
-                #self.stDevOutliers = "%d outliers" % outlier_count
-            self.mean = NumericalAnalyser.round_significant(self.mean)
-            self.quartile_low = NumericalAnalyser.round_significant(self.quartile_low)
-            self.quartile_up = NumericalAnalyser.round_significant(self.quartile_up)
-            self.median = NumericalAnalyser.round_significant(self.median)
-            self.stdev = NumericalAnalyser.round_significant(self.stdev)
+        for x in vector.positions(BAD):
+            isNumeric = False
+            print("Can't convert: ", values[x])
+        if counts is None:
+            counts = Counter(values)
+        super().__init__(values, convert_counts(counts, self.parse))
+        stats = describe(vector, 1.5, quantile_sketch=quantile_sketch) if isNumeric else None
+        if stats is not None:
+            self.outlier_rows = stats['outlier_rows']
+            self.outlier_count = stats['outlier_count']
+            self.moments = stats['moments']
+            self.quantile_error = stats['quantile_error']
+            self.normDist = normal_description(self.moments)
+            self.stDevOutliers = NumericalAnalyser.format_outliers(vector, self.outlier_rows,
+                                                                   self.outlier_count, row_number)
+            self.min = NumericalAnalyser.int_to_sci(stats['min'])
+            self.max = NumericalAnalyser.int_to_sci(stats['max'])
+            self.mean = NumericalAnalyser.round_significant(stats['mean'])
+            self.quartile_low = NumericalAnalyser.round_significant(stats['quartile_low'])
+            self.quartile_up = NumericalAnalyser.round_significant(stats['quartile_up'])
+            self.median = NumericalAnalyser.round_significant(stats['median'])
+            self.stdev = NumericalAnalyser.round_significant(stats['stdev'])
             if self.mode != 'N/A':
                 self.mode = NumericalAnalyser.int_to_sci(self.mode)
 
@@ -406,16 +687,29 @@ class SciNotationAnalyser(Analyser):
             self.stdev = 'N/A'
             self.normDist = 'N/A'
             self.stDevOutliers = 'N/A'
+            self.outlier_rows = array('Q')
+            self.outlier_count = 'N/A'
+            self.moments = Moments()
+            self.quantile_error = None
 
     @staticmethod
-    def is_compatable(values):
-        bad_values = 0
-        for i in values:
-            if i != '':
-                try:
-                    float(i)
-                except:
-                    bad_values += 1
+    def parse(value):
+        """Returns a value as a float, None if it is empty. Raises ValueError if the value is
+        not a number."""
+        if value == '':
+            return None
+        return float(value)
+
+    @classmethod
+    def is_compatable(cls, values):
+        """Returns whether few enough values are not numbers for the column to be analysed.
+
+        Keyword arguments:
+            values -- The values of the column, or a NumericVector of them.
+        """
+        if not isinstance(values, NumericVector):
+            values = NumericVector(values, cls.parse)
+        bad_values = values.count(BAD)
         if bad_values / len(values) >= threshold:
             return False
         return True
@@ -428,24 +722,26 @@ class DateAnalyser(Analyser):
         
 
     """
-    def __init__(self, values):
-        super().__init__(values)
+    def __init__(self, values, counts=None):
+        if counts is None:
+            counts = Counter(values)
+        super().__init__(values, counts)
 
         DFcount = 0
         MMcount = 0
         JAcount = 0
         SNcount = 0
 
-        for value in values:
+        for value, occurrences in counted(values, counts):
             if re_date.search(value):
                 if re_dateDF.search(value):
-                    DFcount += 1
+                    DFcount += occurrences
                 if re_dateMM.search(value):
-                    MMcount += 1
+                    MMcount += occurrences
                 if re_dateJA.search(value):
-                    JAcount += 1
+                    JAcount += occurrences
                 if re_dateSN.search(value):
-                    SNcount += 1
+                    SNcount += occurrences
         self.dateDF = DFcount
         self.dateMM = MMcount
         self.dateJA = JAcount
@@ -458,7 +754,7 @@ class TimeAnalyser(Analyser):
     Keyword arguments:
         Analyser -- An analyser object.
     """
-    def __init__(self, values):
+    def __init__(self, values, counts=None):
 
         hourcount = []
 
@@ -467,15 +763,17 @@ class TimeAnalyser(Analyser):
             hourcount[x].append(x)
             hourcount[x].append(0)
         
-        super().__init__(values)
-        for value in values:
+        if counts is None:
+            counts = Counter(values)
+        super().__init__(values, counts)
+        for value, occurrences in counted(values, counts):
             if re_time.search(value):
                 temp=int(re_timehr.search(value).group(0))
                 if re_timePM.search(value) and temp != 12:
                     temp += 12
                 elif re_timeAM.search(value) and temp == 12:
                     temp = 0
-                hourcount[temp][1]+= 1
+                hourcount[temp][1]+= occurrences
 
         hoursort= sorted(hourcount,key=lambda l:l[1], reverse=True)
         self.hourCS = hoursort
@@ -487,8 +785,8 @@ class CharAnalyser(Analyser):
     Keyword arguments:
         Analyser -- An analyser object.
     """
-    def __init__(self, values):
-        super().__init__(values)
+    def __init__(self, values, counts=None):
+        super().__init__(values, counts)
         
 class DayAnalyser(Analyser):
     """Run day analysis, currently only using Analyser super class methods.
@@ -496,8 +794,8 @@ class DayAnalyser(Analyser):
     Keyword arguments:
         Analyser -- An analyser object.
     """
-    def __init__(self, values):
-        super().__init__(values)
+    def __init__(self, values, counts=None):
+        super().__init__(values, counts)
 
 class HyperAnalyser(Analyser):
     """Run hyperlink analysis, currently only using Analyser super class methods.
@@ -505,27 +803,34 @@ class HyperAnalyser(Analyser):
     Keyword arguments:
         Analyser -- An analyser object.
     """
-    def __init__(self, values):
-        super().__init__(values)
+    def __init__(self, values, counts=None):
+        super().__init__(values, counts)
         # TODO Implement some hyperlink unique stats, e.g. domain frequency.
 
 class DatetimeAnalyser(Analyser):
     """Run datetime analysis, currenytly only using Analyser super class methods.
     """
-    def __init__(self, values):
-        super().__init__(values)
+    def __init__(self, values, counts=None):
+        super().__init__(values, counts)
         # TODO implement datetime unique stats
 
 def normaltest(values):
-    """Normality test of values based on Jarque-Bera Test"""
-    """xbar = mean(values)
-    n = len(values)
-    s_top = sum([pow(x-xbar, 3) for x in values])/n
-    std = sum([pow(x-xbar,2) for x in values])/n
-    s_bot = pow(std, 3/2)
-    S = s_top/s_bot
-    c_top = sum([pow(x-xbar, 4) for x in values])/n
-    c_bot = pow(std , 2)
-    C = c_top/c_bot
-    JB = (n /6) * (pow(S,2) + 0.25 * pow(C-3, 2))
-    print("JB: ", JB)"""
\ No newline at end of file
+    """Normality test of values based on Jarque-Bera Test. Returns False if the values are not
+    normally distributed at sketch.normal_confidence, True otherwise and None if they are all
+    the same.
+
+    Keyword arguments:
+        values -- A list of numbers, or the Moments of them.
+    """
+    if not isinstance(values, Moments):
+        values = Moments.of(values)
+    return values.normaltest()
+
+
+def normal_description(moments):
+    """Returns Yes or No if the numbers summarised by moments are normally distributed, N/A if
+    they are all the same."""
+    normal = normaltest(moments)
+    if normal is None:
+        return 'N/A'
+    return 'Yes' if normal else 'No'
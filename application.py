@@ -8,18 +8,26 @@ Last Updated: 28/02/2017
 import argparse
 import webbrowser
 import textwrap
-import xlrd
 from tkinter import *
 from tkinter import filedialog, ttk
 from threading import Thread
+from multiprocessing import Manager, freeze_support
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from queue import Empty
 try:
     from .data import *
     from .report import *
     from .template_reader import *
+    from . import sketch
+    from .storage import error_sink, column_error_limit
+    from .sources import compressions, output_name, is_excel, sheet_names
 except:
     from data import *
     from report import *
     from template_reader import *
+    import sketch
+    from storage import error_sink, column_error_limit
+    from sources import compressions, output_name, is_excel, sheet_names
 
 terminal = False
 
@@ -40,12 +48,14 @@ class DisplayWindow:
         process_export -- Runs program and creates a file containing analysis of all files processed
         removefile -- Removes file from being processed after being selected in output window
         reset -- Resets the program removing all files from the process queue and sets progress bar back to the start
+        sample_size -- Returns the number of rows to sample from each file if Quick preview is ticked
         templateaskopenfile -- Asks for a template to use during processing and displays it in the output window
 
     Variables:
         datafiles -- list of datafiles to be processed
         display -- output window Frame object
         template -- template to use in process if applicable
+        preview -- whether to profile only a random sample of the rows of each file
     """
     def __init__(self):
         root = Tk()
@@ -64,6 +74,9 @@ class DisplayWindow:
         Button(mainwindow, text="Browse Files...", command=  self.dataaskopenfile).grid(row=0, column=1, padx=5, sticky='ew')
         Button(mainwindow, text='Browse Folders...', command=  self.dataaskopenfolder).grid(row=0, column=2, padx=5)
         Button(mainwindow, text="Browse Templates...", command=self.templateaskopenfile).grid(row=1, column=1, padx=5)
+        self.preview = IntVar()
+        Checkbutton(mainwindow, text="Quick preview (%d row sample)" % sketch.sample_size,
+                    variable=self.preview).grid(row=3, column=1, columnspan=2, sticky=W)
         Button(mainwindow, text="View Report", command=self.process_report).grid(row=4, column=1,sticky='ew', padx=5)
         Button(mainwindow, text="Export", command=self.process_export).grid(row=4, column=2, sticky='ew')
         Button(mainwindow, text="Reset", command=self.reset).grid(row=6, column=1, sticky='ew')
@@ -89,6 +102,7 @@ class DisplayWindow:
         if self.template:
             Label(self.display, text=str("Template Selected: " + self.template[0]), anchor='w').pack(fill=X)
         self.datafiles = filedialog.askopenfiles(mode='r', filetypes=[('All Files', '.*'),('Csv Files','*.csv'),
+                                                 ('Compressed Csv Files', '*.csv.gz *.csv.bz2 *.csv.xz'),
                                                  ('Excel Workbook', '*.xlsx'), ('Excel 97-2003 Workbook', '.xls')],
                                                  defaultextension="*.csv")
         if self.datafiles is not None:
@@ -131,7 +145,8 @@ class DisplayWindow:
         """Runs program and generates report at the end"""
         self.progress["value"] = 0
         self.setstatus("Processing Files...")
-        Thread(target=process_files, args=(self.datafiles, self.template), kwargs={'window':self}).start()
+        Thread(target=process_files, args=(self.datafiles, self.template),
+               kwargs={'window':self, 'sample': self.sample_size()}).start()
 
     def process_export(self):
         """Runs program and exports results to file"""
@@ -143,12 +158,17 @@ class DisplayWindow:
                                                                                                  ('All Files', '.*')])
             exportfile.close()
             Thread(target=process_files, args=(self.datafiles, self.template),
-                   kwargs={'exportfile': exportfile.name, 'window': self}).start()
+                   kwargs={'exportfile': exportfile.name, 'window': self,
+                           'sample': self.sample_size()}).start()
         except PermissionError:
             # Occurs if export file is open
             self.setstatus("ERROR: Permission Denied, ensure export file is not open in another program")
 
 
+    def sample_size(self):
+        """Returns the number of rows to sample from each file, 0 to process every row"""
+        return sketch.sample_size if self.preview.get() else 0
+
     def removefile(self, file, label):
         """Removes file from process list and removes label"""
         print("Removing: ", file)
@@ -193,7 +213,9 @@ class Exporter(object):
 
     Methods:
         write_stats -- writes summary of a single data object
+        write_record -- writes a summary made by summarise, adding it to the totals
         write_summary -- writes summary of all files to be run after processing all files
+        summarise -- returns the summary of a single data object that write_stats writes
 
     Variables:
         filename -- file name to save export file as
@@ -213,25 +235,43 @@ class Exporter(object):
             with open(self.filename, 'w') as fp:
                 pass
 
+    @staticmethod
+    def summarise(data):
+        """Returns a dictionary of the statistics written for a single data object"""
+        return {
+            'filename': data.filename if data.sheet is None else data.filename + " - " + data.sheet,
+            'invalid': len(data.invalid_rows),
+            'empty': len([column.header for column in data.columns if column.empty]),
+            'errors': data.errors.total,
+            'columns': len(data.columns),
+            'delimiter': data.delimiter_type,
+        }
+
     def write_stats(self, data):
         """Writes statistics of a single data object"""
+        self.write_record(self.summarise(data))
+
+    def write_record(self, record):
+        """Writes statistics of a single file from its summary and adds them to the totals"""
+        if record.get('error'):
+            self.write_error(record)
+            return
         with open(self.filename, 'r+') as fp:
             fp.seek(0,2)
-            fp.write("Analysis of " + os.path.split(data.filename)[1] + '\n')
+            fp.write("Analysis of " + os.path.split(record['filename'])[1] + '\n')
             self.total_files += 1
-            fp.write("Number of Invalid rows:  " + str(len(data.invalid_rows)) + '\n')
-            self.total_invalid += len(data.invalid_rows)
-            empty_columns = [column.header for column in data.columns if column.empty]
-            fp.write("Number of Empty Columns:  " + str(len(empty_columns)) + '\n')
-            self.total_empty = len(empty_columns)
-            fp.write("Number of Error Cells:  " + str(len(data.errors)) + '\n')
-            self.total_errors = len(data.errors)
-            fp.write("Number of Valid Columns: " + str(len(data.columns)) + '\n')
-            self.total_col = str(len(data.columns))
-            if data.delimiter_type == ',':
+            fp.write("Number of Invalid rows:  " + str(record['invalid']) + '\n')
+            self.total_invalid += record['invalid']
+            fp.write("Number of Empty Columns:  " + str(record['empty']) + '\n')
+            self.total_empty += record['empty']
+            fp.write("Number of Error Cells:  " + str(record['errors']) + '\n')
+            self.total_errors += record['errors']
+            fp.write("Number of Valid Columns: " + str(record['columns']) + '\n')
+            self.total_col += record['columns']
+            if record['delimiter'] == ',':
                 fp.write("Delimiter: comma\n")
             else:
-                fp.write("Delimiter:  " + data.delimiter_type + '\n')
+                fp.write("Delimiter:  " + record['delimiter'] + '\n')
             fp.write("\n")
 
     def write_summary(self):
@@ -251,12 +291,133 @@ class Exporter(object):
         os.rename(temp_file, self.filename)
 
     def write_error(self, data):
-        """Writes error message for files not processed fully"""
+        """Writes error message for files not processed fully, given the data object or
+        its summary"""
+        if isinstance(data, dict):
+            filename = data['filename']
+        else:
+            filename = data.filename
         with open(self.filename, 'r+') as fp:
             fp.seek(0,2)
-            fp.write("Analysis of " + os.path.split(data.filename)[1] + '\n')
+            fp.write("Analysis of " + os.path.split(filename)[1] + '\n')
             fp.write("ERROR: Unable to read file, no readable data detected.\n\n")
 
+
+class SummaryCollector(object):
+    """Takes the place of an Exporter in a worker process, keeping the summary of the file
+    so the parent process can write it to the export file in order.
+
+    Variables:
+        record -- summary of the file processed, None until written
+    """
+    def __init__(self):
+        self.record = None
+
+    def write_stats(self, data):
+        """Keeps the statistics of a single data object"""
+        self.record = Exporter.summarise(data)
+
+    def write_error(self, data):
+        """Keeps a note that the file could not be processed"""
+        self.record = {'filename': data.filename, 'error': True}
+
+
+class ProgressQueue(object):
+    """Takes the place of the DisplayWindow in a worker process, passing progress updates
+    back to the parent process through a queue.
+
+    Variables:
+        queue -- Manager queue read by the parent process
+    """
+    def __init__(self, queue):
+        self.queue = queue
+
+    def step_progress(self):
+        self.queue.put(('step', None))
+
+    def setstatus(self, msg):
+        self.queue.put(('status', msg))
+
+
+def run_job(job):
+    """Runs main on a single file in a worker process. Returns the summary for the Exporter
+    if exporting, otherwise the filename of the html report.
+
+    Keyword arguments:
+        job -- tuple of (filename, sheet of a workbook or None, template filename or None,
+        whether exporting, progress queue, quantile sketch size or None, number of rows to
+        sample, error file format or None, whether to generate the html report)
+    """
+    filename, sheet, template, exporting, queue, quantile_sketch, sample, errors, report = job
+    args = (filename,) if template is None else (filename, template)
+    exporter = SummaryCollector() if exporting else None
+    window = ProgressQueue(queue) if queue is not None else None
+    html = main(*args, exporter=exporter, window=window, browser=False, quantile_sketch=quantile_sketch,
+                sample=sample, errors=errors, report=report, threaded_input=True, sheet=sheet)
+    if exporter is not None:
+        if exporter.record is None:
+            return {'filename': filename, 'error': True}
+        return exporter.record
+    return html
+
+
+def run_jobs(jobs, export, window, num_jobs, quantile_sketch=None, sample=0, errors=None, report=True):
+    """Runs main on each file in a pool of worker processes. Progress from the workers is
+    passed on to the window, and summaries are written to the Exporter in the order of the
+    files given.
+
+    Keyword arguments:
+        jobs -- list of (filename, sheet of a workbook or None, template filename or None) to
+        process
+        export -- Exporter object if applicable
+        window -- DisplayWindow object if applicable
+        num_jobs -- number of worker processes
+        quantile_sketch -- size of the quantile sketch for numeric columns, None to use the template
+        sample -- number of rows to sample from each file, 0 to process every row
+        errors -- format of the file each file's errors are written to, 'csv' or 'ndjson', None
+        for no file
+        report -- whether to generate html reports
+    """
+    manager = Manager() if window is not None else None
+    queue = manager.Queue() if manager is not None else None
+    results = {}
+    next_record = 0
+    with ProcessPoolExecutor(max_workers=num_jobs) as executor:
+        futures = {}
+        for i, (name, sheet, template) in enumerate(jobs):
+            job = (name, sheet, template, export is not None, queue, quantile_sketch, sample, errors,
+                   report)
+            futures[executor.submit(run_job, job)] = i
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            while queue is not None:
+                try:
+                    kind, msg = queue.get_nowait()
+                except Empty:
+                    break
+                if kind == 'step':
+                    window.step_progress()
+                else:
+                    window.setstatus(msg)
+            for future in done:
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    print("ERROR: Unable to process file: " + jobs[i][0], e)
+                    results[i] = {'filename': jobs[i][0], 'error': True}
+                print("Finished %d/%d files" % (len(results), len(jobs)))
+                if export is None and isinstance(results[i], str):
+                    webbrowser.open("file://" + results[i], new=2)
+            # Write summaries once every file before them has finished
+            while export is not None and next_record in results:
+                export.write_record(results.pop(next_record))
+                next_record += 1
+    if manager is not None:
+        manager.shutdown()
+
+
 def main(*args, **kwargs):
     """
     Create Data and Report objects, providing necessary information for them 
@@ -265,28 +426,60 @@ def main(*args, **kwargs):
         Keyword Arguments:
             args -- Arguments provided to the program at runtime.
             exporter -- Exporter object if applicable
+            workers -- Number of processes used to parse the file
+            browser -- Whether to open the html report in the browser, default True
+            quantile_sketch -- Size of the quantile sketch for numeric columns, None to use
+            the template
+            sample -- Number of rows to sample from the file for a quick preview, 0 to
+            process every row
+            errors -- Format of the file the errors found are written to as they are found,
+            'csv' or 'ndjson', None for no file. Written beside the file as name_errors.csv
+            report -- Whether to generate the html report, default True
+            threaded_input -- Whether a compressed file is decompressed in a separate thread
+            as it is parsed, default False
+            sheet -- The sheet read if the file is an Excel workbook, None for the first sheet
+
+        Returns the filename of the html report if one is generated.
     """
     exporter = kwargs.pop('exporter', None)
     window = kwargs.pop('window', None)
+    workers = kwargs.pop('workers', 1)
+    browser = kwargs.pop('browser', True)
+    quantile_sketch = kwargs.pop('quantile_sketch', None)
+    sample = kwargs.pop('sample', 0)
+    errors = kwargs.pop('errors', None)
+    report = kwargs.pop('report', True)
+    threaded_input = kwargs.pop('threaded_input', False)
+    sheet = kwargs.pop('sheet', None)
     filename = args[0]
-    print("[Step 1/7] Processing file: ",filename)
+    if sheet is not None:
+        print("[Step 1/7] Processing file: ", filename, "sheet:", sheet)
+    else:
+        print("[Step 1/7] Processing file: ",filename)
     print("[Step 2/7] Reading data")
     if window is not None:
         window.step_progress()
         window.setstatus("Processing " + filename + "...")
+    sink = None
+    if errors:
+        sink = error_sink(output_name(filename, sheet) + "_errors." + errors)
     if len(args) > 1:
         temp = Template(args[1])
-        data = Data(filename, temp)
+        data = Data(filename, temp, stream=True, workers=workers, quantile_sketch=quantile_sketch,
+                    sample=sample, error_sink=sink, threaded_input=threaded_input, sheet=sheet)
     else:
-        data = Data(filename)
+        data = Data(filename, stream=True, workers=workers, quantile_sketch=quantile_sketch,
+                    sample=sample, error_sink=sink, threaded_input=threaded_input, sheet=sheet)
     if not data.raw_data:
+        if sink is not None:
+            sink.close()
         print("ERROR: Unable to read file: " + filename)
-        window.setstatus("ERROR: Unable to read file: " + filename)
+        if window is not None:
+            window.setstatus("ERROR: Unable to read file: " + filename)
         if exporter is not None:
             exporter.write_error(data)
         return None
-    data.remove_invalid()
-    data.create_columns()
+    data.load()
     data.clean()
 
     print("[Step 3/7] Running pre-analysis")
@@ -297,12 +490,21 @@ def main(*args, **kwargs):
     if window is not None:
         window.step_progress()
     data.find_errors()
+    if sink is not None:
+        sink.close()
+        print("Errors written to: ", sink.filename)
     print("[Step 5/7] Running Analysis")
     if window is not None:
         window.step_progress()
         window.setstatus("Running Analysis on " + filename + "...")
     data.analysis()
-    if exporter is None:
+    html = None
+    if exporter is None and not report:
+        print("[Step 6/7] Skipping report")
+        print("Completed analysis for: ", filename)
+        if window is not None:
+            window.step_progress()
+    elif exporter is None:
         print("[Step 6/7] Generating report")
         report = Report(data)
         str_report = report.html_report()
@@ -312,7 +514,8 @@ def main(*args, **kwargs):
         print("Completed analysis for: ",filename)
         if window is not None:
             window.step_progress()
-        webbrowser.open("file://"+html,new=2)
+        if browser:
+            webbrowser.open("file://"+html,new=2)
     else:
         print("[Step 6/7] Generating report")
         exporter.write_stats(data)
@@ -322,6 +525,8 @@ def main(*args, **kwargs):
         print("Completed analysis for: ", filename)
     if window is not None:
         window.setstatus("Completed Analysis for " + filename)
+    if exporter is None:
+        return html
 
 
 def get_file_dir(location):
@@ -333,50 +538,47 @@ def get_file_dir(location):
     return location.rpartition('\\')
 
 
-def process_files(files, templates, exportfile='', window=None):
-    """Process files and templates and runs the program over them. Converts excel files
-    and applies template to each file
+def process_files(files, templates, exportfile='', window=None, workers=1, jobs=1,
+                  quantile_sketch=None, sample=0, errors=None, report=True):
+    """Process files and templates and runs the program over them. Reads each sheet of
+    excel files as a file and applies template to each file
 
     Keyword arguments:
         files -- files to be processed
         templates -- files to use as templates in processing
         exportfile -- file to export analysis to if applicable
+        workers -- number of processes used to parse each file
+        jobs -- number of files processed at once in separate processes
+        quantile_sketch -- size of the quantile sketch for numeric columns, None to use the template
+        sample -- number of rows to sample from each file for a quick preview, 0 to process
+        every row
+        errors -- format of the file each file's errors are written to, 'csv' or 'ndjson', None
+        for no file
+        report -- whether to generate html reports
     """
     filenames = []
-    excel = []
     for file in files:
         name_ext = os.path.splitext(file)
         # TODO handle empty sheets
-        if name_ext[1] == '.xls' or name_ext[1] == '.xlsx':
-            print("[Step 0/7] Converting to csv file")
-            wb = xlrd.open_workbook(file)
-            sheet_names = wb.sheet_names()
-            if len(sheet_names) == 1:
-                sh = wb.sheet_by_name(sheet_names[0])
-                new_name = os.path.splitext(file)[0] + ".csv"
-                with open(new_name, 'w', newline='') as fp:
-                    wr = csv.writer(fp)
-                    for rownum in range(sh.nrows):
-                        wr.writerow(sh.row_values(rownum))
-                filenames.append(new_name)
-                excel.append(new_name)
+        if is_excel(file):
+            # Each sheet is read straight from the workbook by its own job
+            try:
+                sheets = sheet_names(file)
+            except Exception as e:
+                print("ERROR: Unable to read workbook: " + file, e)
+                if window is not None:
+                    window.setstatus("ERROR: Unable to read workbook " + file)
+                continue
+            if len(sheets) == 1:
+                filenames.append((file, None))
             else:
-                for sheet in sheet_names:
-                    sh = wb.sheet_by_name(sheet)
-                    new_name = os.path.join(os.path.splitext(file)[0] + "_" + sheet + ".csv")
-                    try:
-                        with open(new_name, 'w', newline='') as fp:
-                            wr = csv.writer(fp)
-                            for rownum in range(sh.nrows):
-                                wr.writerow(sh.row_values(rownum))
-                    except PermissionError:
-                        # If created csv file already exists and is open
-                        window.setstatus("ERROR: Permission Denied, ensure "  + new_name + " is not open in another program")
-                        return None
-                    filenames.append(new_name)
-                    excel.append(new_name)
+                for sheet in sheets:
+                    filenames.append((file, sheet))
         elif name_ext[1] == '.csv':
-            filenames.append(file)
+            filenames.append((file, None))
+        elif name_ext[1].lower() in compressions and os.path.splitext(name_ext[0])[1] == '.csv':
+            # Compressed csv files are decompressed as they are read
+            filenames.append((file, None))
         else:
             print("ERROR: Unsupported file type: " + file)
             if window is not None:
@@ -387,34 +589,45 @@ def process_files(files, templates, exportfile='', window=None):
         export = None
     if window is not None:
         window.setmaxprogress(len(filenames) * 5.0 + 0.01)
+    file_jobs = []
     if templates != None or templates:
         if len(templates) == 1:
-            for name in filenames:
-                main(name, templates[0], exporter=export, window=window)
+            for name, sheet in filenames:
+                file_jobs.append((name, sheet, templates[0]))
         else:
             num_templates = len(templates)
             print(num_templates)
             num_files = len(filenames)
             if num_templates == num_files:
                 for i in range(0, num_files):
-                    main(filenames[i], templates[i], exporter=export, window=window)
+                    file_jobs.append(filenames[i] + (templates[i],))
             else:
                 # TODO keep functionality when excel files have multiple sheets
                 print("Error, different number of files and templates")
     else:
-        for name in filenames:
-            main(name, exporter=export, window=window)
+        for name, sheet in filenames:
+            file_jobs.append((name, sheet, None))
+    if jobs > 1 and len(file_jobs) > 1:
+        # Worker processes can not start their own pool, so each file is parsed in one process
+        run_jobs(file_jobs, export, window, jobs, quantile_sketch, sample, errors, report)
+    else:
+        for name, sheet, template in file_jobs:
+            if template is None:
+                main(name, exporter=export, window=window, workers=workers, quantile_sketch=quantile_sketch,
+                     sample=sample, errors=errors, report=report, sheet=sheet)
+            else:
+                main(name, template, exporter=export, window=window, workers=workers,
+                     quantile_sketch=quantile_sketch, sample=sample, errors=errors, report=report,
+                     sheet=sheet)
     if export != None:
         export.write_summary()
-    if excel:
-        for file in excel:
-            os.remove(file)
     
 if __name__ == '__main__':
     """If the program is run with application.py as the argument to the command line
     execution begins here. This will process all the command line arguments before 
     proceeding.
     """
+    freeze_support()
     files = []
     templates = []
     if len(sys.argv) > 1:
@@ -432,8 +645,26 @@ if __name__ == '__main__':
         parser.add_argument('filenames', nargs='+',\
             help='one or more filenames for the processor to analyse')
         parser.add_argument('-t', nargs='+', metavar='template', help='a template for the given files')
+        parser.add_argument('-w', '--workers', type=int, default=1, metavar='N',
+            help='number of processes used to parse each large csv file')
+        parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+            help='number of files to process at once in separate processes')
+        parser.add_argument('-q', '--quantile-sketch', type=int, nargs='?', const=sketch.quantile_k,
+            metavar='K', help='estimate quartiles of numeric columns with a quantile sketch of '
+            'size K (default %d) using fixed memory, 0 to find them exactly' % sketch.quantile_k)
+        parser.add_argument('-s', '--sample', type=int, nargs='?', const=sketch.sample_size, default=0,
+            metavar='N', help='quick preview profiling a random sample of N rows (default %d) of '
+            'each file, read in a single pass' % sketch.sample_size)
+        parser.add_argument('-e', '--errors', choices=('csv', 'ndjson'),
+            help='write the errors found in each file to name_errors.csv or name_errors.ndjson '
+            'beside it as they are found, keeping only the first %d of each column in memory'
+            % column_error_limit)
+        parser.add_argument('--no-report', dest='report', action='store_false',
+            help='do not generate the html reports, such as when only the errors are needed')
         args = parser.parse_args()
-        process_files(args.filenames, args.t)
+        process_files(args.filenames, args.t, workers=args.workers, jobs=args.jobs,
+                      quantile_sketch=args.quantile_sketch, sample=args.sample, errors=args.errors,
+                      report=args.report)
     else:
         DisplayWindow()
 
@@ -26,8 +26,6 @@ Global Variables:
 
     re_sci_notation -- Regular expression for scientific notation type.
 
-    re_separation -- Regular expression for the different types of delimiters in files.
-
     re_date -- Regular expression for date type.
 
     re_time -- Regular expression for time type.
@@ -38,14 +36,49 @@ Global Variables:
 
     re_hyper -- Regular expression for hyperlink type.
 
+    type_counts -- Names of the counts kept for each type when finding the type of a column.
+
+    type_order -- The types a column may be found to be in the order they are chosen from,
+    with the names of the counts in type_counts of the values of each type.
+
+    type_sample_limit -- Number of distinct values in a column past which its type is found
+    from values drawn at random, and the most values drawn. Default 10000.
+
+    typed_storage -- Whether the values of a column held in memory are moved to typed storage
+    once its type is known, see Column.encode_values. Default True.
+
+    dictionary_limit -- Most distinct values a column may have to be held as codes into a
+    dictionary of its values. Default 65536.
+
+    boolean_counts -- Counts added to by each boolean value, keyed by the upper case value.
+
+    day_first -- Characters a day of the week may start with, checked before re_day.
+
+    frequency_limit -- Number of distinct values in a column counted exactly, past which only
+    the most common values are counted with a SpaceSaving summary. Default 100000.
+
 """
+import heapq
 import re, os, random, string, sys, stat
 from collections import Counter
 from email.utils import parseaddr
+from itertools import islice
+from operator import itemgetter
+
+try:
+    from .sketch import DistinctCount, SpaceSaving, SPRT
+    from .storage import ColumnStore, NumericVector, INT, FLOAT, empty_reason, DictionaryColumn, NumericColumn
+except:
+    from sketch import DistinctCount, SpaceSaving, SPRT
+    from storage import ColumnStore, NumericVector, INT, FLOAT, empty_reason, DictionaryColumn, NumericColumn
 
 
 threshold = 0.9
 enum_threshold = 1
+frequency_limit = 100000
+type_sample_limit = 10000
+typed_storage = True
+dictionary_limit = 65536
 
 #  Config
 invalid_values = ['-', '*', '_', '$']
@@ -62,6 +95,76 @@ re_char = re.compile('^\D$')
 re_day = re.compile('^(?i)(monday|tuesday|wednesday|thursday|friday|saturday|sunday)$')
 re_hyper = re.compile('^(?i)(https?:\/\/).+$')
 
+type_counts = ('float', 'int', 'email', 'currency', 'boolean', 'sci_not', 'date', 'time', 'char',
+               'day', 'hyper', 'datetime', 'true', 'false', 'yes', 'no')
+boolean_counts = {'TRUE': ('boolean', 'true'), 'T': ('boolean', 'true', 'char'),
+                  'FALSE': ('boolean', 'false'), 'F': ('boolean', 'false', 'char'),
+                  'YES': ('boolean', 'yes'), 'Y': ('boolean', 'yes', 'char'),
+                  'NO': ('boolean', 'no'), 'N': ('boolean', 'no', 'char')}
+type_order = (('Float', ('float',)), ('Integer', ('int',)), ('Sci_Notation', ('sci_not',)),
+              ('Numeric', ('float', 'int', 'sci_not')), ('Email', ('email',)),
+              ('Currency', ('currency',)), ('Boolean', ('boolean',)), ('Date', ('date',)),
+              ('Time', ('time',)), ('Char', ('char',)), ('Day', ('day',)),
+              ('Hyperlink', ('hyper',)), ('Datetime', ('datetime',)))
+day_first = 'mtwfsMTWFS\u017f'
+
+
+def classify(value):
+    """Returns a tuple of the names of the counts in type_counts that a value adds to when
+    finding the type of a column. Checks the types in the same order as they are chosen from,
+    only running the regular expression of a type when the first character and characters
+    in the value allow it to match.
+
+    Keyword arguments:
+        value -- The value to be classified.
+    """
+    if not value:
+        return ()
+    first = value[0]
+    digit = first.isdigit()
+    space = first.isspace()
+    if (digit or first == '-' or first == '.') and re_float.match(value):
+        number = float(value)
+        if abs(number) < 0.00001 or number > 100000:
+            return ('sci_not',)
+        return ('float',)
+    if (digit or space or first == '-') and re_int.match(value):
+        if value == '1':
+            return ('boolean', 'true', 'int')
+        if value == '0':
+            return ('boolean', 'false', 'int')
+        if abs(int(value)) > 1000000:
+            return ('sci_not',)
+        return ('int',)
+    if '@' in value:
+        if parseaddr(value)[1] != '':
+            return ('email',)
+        return ()
+    if ('$' in value or '€' in value or '£' in value) and re_currency.search(value):
+        return ('currency',)
+    if (space or first in 'tTfFyYnN01') and re_boolean.search(value):
+        return boolean_counts.get(value.strip().upper(), ('boolean',))
+    if (digit or space or first in '+-.') and re_sci_notation.fullmatch(value):
+        return ('sci_not',)
+    if digit:
+        if re_date.search(value) or re_daterev.search(value):
+            return ('date',)
+        if ':' in value and re_time.search(value):
+            return ('time',)
+    if len(value) <= 2 and re_char.search(value):
+        return ('char',)
+    if first in day_first and re_day.search(value):
+        return ('day',)
+    if (first == 'h' or first == 'H') and re_hyper.search(value):
+        return ('hyper',)
+    if ' ' in value:
+        split_value = value.split(' ',1)
+        date_value = split_value[0].strip(' \t')
+        if date_value[:1].isdigit() and (re_date.search(date_value) or re_daterev.search(date_value)) \
+                and re_time.search(split_value[1].strip(' \t')):
+            return ('datetime',)
+    return ()
+
 class Column(object):
     """Object to hold data from each column within the provided CSV file.
 
@@ -77,9 +180,19 @@ class Column(object):
         define_type -- Sets object variable to type (e.g., String) according
         to column values.
 
+        sample_types -- Classifies values drawn at random until the type of a large column
+        is decided.
+
         define_errors -- Defines a list that contains the row and column of possibly
         incorrect values.
 
+        check_value -- Checks a single value against the type of the column, returning the
+        reasons it is an error.
+
+        parsed_float -- Returns a value as a float, reusing the numeric values of the column.
+
+        add_error -- Adds a cell of the column to the list of errors.
+
         check_empty -- Checks whether a provided cell in a column is empty or not.
 
         set_type -- Sets type of column for use with templates
@@ -95,6 +208,18 @@ class Column(object):
 
         set_Identifier_size -- Sets the size of the data for identifier type.
 
+        frequencies -- Returns a Counter of the number of times each value appears in the
+        column, None if it has too many distinct values to count exactly.
+
+        set_parse -- Sets the function used to convert values of a numeric column to numbers.
+
+        numeric_values -- Returns a NumericVector of the values of a numeric column.
+
+        values_changed -- Drops the frequency table and numeric values kept for the column.
+
+        encode_values -- Moves the values of a column held in memory to typed storage for
+        its type.
+
         updateCell -- Changes the value of a given cell with one provided.
 
 
@@ -116,6 +241,20 @@ class Column(object):
 
         unique -- Integer representing the amount of unique values in this column.
 
+        unique_exact -- Whether unique is exact, False if it is estimated.
+
+        counts -- Counter of the number of times each value appears in the column, None until
+        built by frequencies and whenever the values have changed since.
+
+        heavy -- SpaceSaving summary of the most common values, built by frequencies in place
+        of counts when the column has more than frequency_limit distinct values.
+
+        parse -- Function converting a value of a numeric column to a number, set with the
+        type of the column from the parse method of its analyser.
+
+        vector -- NumericVector of the values parsed with parse, None until built by
+        numeric_values and whenever the values have changed since.
+
         total_true -- The amount of 'true' booleans in this column.
 
         total_false -- The amount of 'false' booleans in this column.
@@ -140,6 +279,7 @@ class Column(object):
         self.type = ''
         self.analysis = None
         self.unique = -1
+        self.unique_exact = True
         self.total_true = 0
         self.total_false = 0
         self.total_yes = 0
@@ -150,17 +290,21 @@ class Column(object):
         self.offline = offline
         self.pos = None
         self.ignore_NA = False
+        self.counts = None
+        self.heavy = None
+        self.parse = None
+        self.vector = None
         if self.offline:
             self.mvalues = []
         else:
             filepath = os.path.join(os.getcwd(),'temp')
-            self.valuefilename = os.path.join(filepath, self.randomString(50)+'.csv')
+            self.valuefilename = os.path.join(filepath, self.randomString(50)+'.col')
             while os.path.isfile(self.valuefilename):
                 # Gets a different random filename if the generated one already exists
-                self.valuefilename = os.path.join(filepath, self.randomString(50) + '.csv')
+                self.valuefilename = os.path.join(filepath, self.randomString(50) + '.col')
             if not os.path.exists(filepath):
                 os.makedirs(filepath)
-            self.valuefile = open(self.valuefilename, 'w+')
+            self.store = ColumnStore(self.valuefilename)
             os.chmod(self.valuefilename, stat.S_IWRITE) #Windows
             #os.chmod(self.valuefilename, 0o775) #Linux
 
@@ -192,14 +336,13 @@ class Column(object):
     @property
     def values(self):
         """
-            Stores values in a temporary file
+            Stores values in a temporary file, returned as a ColumnStore which is indexed
+            and iterated as a list would be
             :return value:
         """
         if self.offline:
             return self.mvalues
-        with open(self.valuefilename, 'r') as fp:
-            values = fp.read().split(',')
-            return values
+        return self.store
 
 
     def change_misc_values(self):
@@ -216,168 +359,162 @@ class Column(object):
         #  Todo: Implement method to handle (strip?) '<', '>'.
 
     def uniqueCount(self, values):
-        """Return the amount of unique values in the values list.
+        """Return the amount of unique values in the values list. Counted exactly up to
+        sketch.distinct_limit values and estimated with a HyperLogLog past it, unique_exact is
+        set to whether the count is exact.
 
         Keyword arguments:
             values -- A list of values.
         """
-        valSet = set()
-        for vals in values:
-            valSet.add(vals)
-        return len(valSet)
+        distinct = DistinctCount()
+        distinct.update(values)
+        self.unique_exact = distinct.exact
+        return distinct.count()
 
     def define_most_least_common(self):
         """Set 15 most common results to class variable, and set object variable
-        empty if appropriate.
+        empty if appropriate. The least common are the 15 with the lowest counts in the
+        frequency table. If the column has too many distinct values to count exactly the most
+        common are estimated and no least common are given.
         """
         self.most_common.clear()
         self.least_common.clear()
-        colValues = self.values
-        self.unique = self.uniqueCount(colValues)
-        temp_list = Counter(colValues).most_common()
-        for i, e in list(enumerate(temp_list)):
-            if i < 15:
-                self.most_common.append(e)
-        for i, e in reversed(list(enumerate(temp_list))):
-            if i < 15:
-                self.least_common.append(e)
+        counts = self.frequencies()
+        num_values = len(self.values)
+        repeated = True
+        if counts is None:
+            self.unique = self.heavy.distinct.count()
+            self.unique_exact = self.heavy.distinct.exact
+            self.most_common.extend(self.heavy.most_common(15))
+            # Counts of values which are not certainly repeated are only noise
+            repeated = bool(self.most_common) and self.heavy.guaranteed(self.most_common[0][0]) > 1
+        else:
+            self.unique = len(counts)
+            self.unique_exact = True
+            self.most_common.extend(counts.most_common(15))
+            self.least_common.extend(heapq.nsmallest(15, counts.items(), key=itemgetter(1)))
         if not self.most_common \
-                or (self.most_common[0][0] == "" and self.most_common[0][1] / len(colValues) >= threshold):
+                or (self.most_common[0][0] == "" and self.most_common[0][1] / num_values >= threshold):
             self.empty = True
-        if self.unique == len(colValues) or self.unique == 1:
+        if self.unique == num_values or self.unique == 1 or not repeated:
             self.least_common = []
             self.most_common = []
 
     def define_type(self):
         """Run column data against regex filters and assign object variable type
-        as appropriate.
+        as appropriate. A column with at most type_sample_limit distinct values has each
+        distinct value classified once. A larger column is typed from values drawn from it at
+        random, with a sequential test of each type stopping the draws once the first type
+        which may reach threshold is certainly over or under it, so no more than
+        type_sample_limit values are classified whatever the size of the column. Values that
+        are never classified are still checked against the type by define_errors.
         """
-        float_count = 0
-        int_count = 0
-        email_count = 0
-        currency_count = 0
-        boolean_count = 0
-        sci_not_count = 0
-        date_count = 0
-        time_count = 0
-        char_count = 0
-        day_count = 0
-        hyper_count = 0
-        datetime_count = 0
-
+        counts = dict.fromkeys(type_counts, 0)
         colValues = self.values
-        edited = False
-        for x, value in enumerate(colValues):
-            if re_float.match(value):
-                if abs(float(value)) < 0.00001 or abs(float(value) > 100000):
-                    sci_not_count += 1
-                else:
-                    float_count += 1
-            elif re_int.match(value) or value == '0':
-                if value == '1' or value == '0':
-                    boolean_count += 1
-                    if value == '1':
-                        self.total_true += 1
-                    else:
-                        self.total_false += 1
-                if abs(int(value)) > 1000000:
-                    sci_not_count += 1
-                else:
-                    int_count += 1
-                    colValues[x] = value.strip()
-                    edited = True
-            elif re_email.search(value):
-                if parseaddr(value)[1] != '':
-                    email_count += 1
-            elif re_currency.search(value):
-                self.values[x].replace('"', '')
-                edited = True
-                currency_count += 1
-            elif re_boolean.search(value):
-                boolean_count += 1
-                temp_value = str(value.strip().upper())
-                if temp_value == 'TRUE' or temp_value == 'T':
-                    self.total_true += 1
-                if temp_value == 'FALSE' or temp_value == 'F':
-                    self.total_false += 1
-                if temp_value == 'YES' or temp_value == 'Y':
-                    self.total_yes += 1
-                if temp_value == 'NO' or temp_value == 'N':
-                    self.total_no += 1
-                # These are also chars
-                if temp_value == 'T' or temp_value == 'F' or temp_value == 'Y' or temp_value == 'N':
-                    char_count += 1
-            elif re_sci_notation.fullmatch(value):
-                sci_not_count += 1
-            elif re_date.search(value) or re_daterev.search(value):
-                date_count += 1
-            elif re_time.search(value):
-                time_count += 1
-            elif re_char.search(value):
-                char_count += 1
-            elif re_day.search(value):
-                day_count += 1
-            elif re_hyper.search(value):
-                hyper_count += 1
-            else:
-                split_value = value.split(' ',1)
-                if len(split_value) == 2 and (re_date.search(split_value[0].strip(' \t'))\
-                    or re_daterev.search(split_value[0].strip(' \t'))) and re_time.search(split_value[1].strip(' \t')):
-                    datetime_count += 1
-        if edited:
-            self.values = colValues
         num_values = len(colValues)
+        stripped = {}
+        tests = []
+        frequencies = self.frequencies()
+        sampled = frequencies is None or len(frequencies) > type_sample_limit
+        if not sampled:
+            # Each distinct value is classified once, adding its number of occurrences to the counts
+            for value, occurrences in frequencies.items():
+                kinds = classify(value)
+                for kind in kinds:
+                    counts[kind] += occurrences
+                if kinds == ('int',) and value != value.strip():
+                    stripped[value] = value.strip()
+        elif not self.empty:
+            tests = self.sample_types(colValues, counts, stripped)
+        if stripped:
+            for x, value in enumerate(colValues):
+                if value in stripped:
+                    colValues[x] = stripped[value]
+            self.values = colValues
         if self.empty:
             self.type = 'Ignored'
-        elif float_count / len(colValues) >= threshold:
-            self.type = 'Float'
-        elif int_count / len(colValues) >= threshold:
-            self.type = 'Integer'
-        elif float_count / num_values >= threshold:
-            self.type = 'Float'
-        elif sci_not_count / num_values >= threshold:
-            self.type = 'Sci_Notation'
-        elif (float_count + int_count + sci_not_count) / num_values >= threshold:
-            self.type = 'Numeric'
-        elif email_count / num_values >= threshold:
-            self.type = 'Email'
-        elif currency_count / num_values >= threshold:
-            self.type = 'Currency'
-        elif boolean_count / num_values >= threshold:
-            self.type = 'Boolean'
-        elif date_count / num_values >= threshold:
-            self.type = 'Date'
-        elif time_count / num_values >= threshold:
-            self.type = 'Time'
-        elif char_count / num_values >= threshold:
-            self.type = 'Char'
-        elif day_count / num_values >= threshold:
-            self.type = 'Day'
-        elif hyper_count / num_values >= threshold:
-            self.type = 'Hyperlink'
-        elif datetime_count / num_values >= threshold:
-            self.type = 'Datetime'
-        elif len(self.most_common) < 10 and len(self.most_common) != 0:
-            self.type = 'Enum'
         else:
-            self.type = 'String'
-            if datetime_count > 0:
-                print(self.header, " Datetime count ", datetime_count)
+            for i, (name, kinds) in enumerate(type_order):
+                if sampled:
+                    found = tests[i].decision
+                    if found is None:
+                        found = sum(counts[kind] for kind in kinds) / tests[i].n >= threshold
+                else:
+                    found = sum(counts[kind] for kind in kinds) / num_values >= threshold
+                if found:
+                    self.type = name
+                    break
+            else:
+                if len(self.most_common) < 10 and len(self.most_common) != 0:
+                    self.type = 'Enum'
+                else:
+                    self.type = 'String'
+                    if counts['datetime'] > 0:
+                        print(self.header, " Datetime count ", counts['datetime'])
+        if sampled:
+            # Counts of a sample are not totals, only a boolean column has its values counted
+            for kind in ('true', 'false', 'yes', 'no'):
+                counts[kind] = 0
+            if self.type == 'Boolean':
+                if frequencies is not None:
+                    frequencies = frequencies.items()
+                else:
+                    frequencies = ((value, 1) for value in colValues)
+                for value, occurrences in frequencies:
+                    for kind in classify(value):
+                        counts[kind] += occurrences
+        self.total_true += counts['true']
+        self.total_false += counts['false']
+        self.total_yes += counts['yes']
+        self.total_no += counts['no']
+
+    def sample_types(self, colValues, counts, stripped):
+        """Classifies values drawn at random from the column until a sequential test of the
+        rate of each type in type_order has decided the type of the column, or
+        type_sample_limit values have been drawn. Returns the tests in the order of
+        type_order, the decision of any test left undecided is made from the values drawn.
+
+        Keyword arguments:
+            colValues -- The values of the column.
+
+            counts -- Dictionary of the count of each name in type_counts, added to for each
+            value drawn.
 
-    def define_errors(self, columnNumber, errors, formatted_errors, invalid_rows_pos, range_list2, set_to_ignore,
-                      data_start):
-        """Define all the rows/columns with invalid values and append to errors, and
-        formatted_errors once formatted properly.
+            stripped -- Dictionary of integer values drawn with surrounding white space to the
+            value stripped of it.
+        """
+        rng = random.Random(0)
+        tests = [SPRT(threshold) for name, kinds in type_order]
+        classified = {}
+        num_values = len(colValues)
+        for draw in range(type_sample_limit):
+            value = colValues[rng.randrange(num_values)]
+            kinds = classified.get(value)
+            if kinds is None:
+                kinds = classified[value] = classify(value)
+                if kinds == ('int',) and value != value.strip():
+                    stripped[value] = value.strip()
+            for kind in kinds:
+                counts[kind] += 1
+            for (name, wanted), test in zip(type_order, tests):
+                test.add(any(kind in wanted for kind in kinds))
+            # The type is known once every test before the first not rejected is decided
+            for test in tests:
+                if test.decision is not False:
+                    break
+            if test.decision is not None:
+                break
+        return tests
+
+    def define_errors(self, columnNumber, errors, invalid_rows_pos, range_list2, set_to_ignore, data_start):
+        """Define all the rows/columns with invalid values and append to errors.
 
         Keyword arguments:
             columnNumber -- The number of the current column being iterated over, numbered
             from 0.
 
-            errors -- A list of errors to be edited of the form (row number, column number,
-            error value) which is numbered from 0.
-
-            formatted_errors -- A list of errors to be edited of the form (row number, column
-            number, error value) which is numbered from 1.
+            errors -- An ErrorStore, or list, of errors to be added to of the form (row number,
+            column number, error value, reason, position) which is numbered from 0.
 
             invalid_rows_pos -- An array containing a number matching the amount of invalid
             rows that have been removed from analysis by the time that row is accessed. i.e.
@@ -393,307 +530,202 @@ class Column(object):
 
             data_start -- Integer representing the row actual data (not headers) starts on.
         """
-        tup = ()
         edited = False
         colValues = self.values
         # Column previously set to ignore, pass
         if self.type == 'Ignored':
-            pass
-        # What follows is each individual type with their error checking
-        elif self.type == 'Float':
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif not re_float.match(value) and not value == '0':
-                    if self.ignore_NA and (value.lower() == 'n/a' or value.lower() == 'na'):
-                        pass
-                    else:
-                        reason = 'not a decimal number'
-                        tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                        errors.append(tup)
-                        formatted_errors.append(
-                            "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
+            return
+        elif self.type == 'Enum':
+            self.define_most_least_common()
+            rare = {}
+            for value, count in self.least_common:
+                if count <= 1:
+                    rare[value] = []
+            if rare:
+                for index, cell in enumerate(colValues):
+                    if cell in rare:
+                        rare[cell].append(index)
+            for value, count in self.least_common:
+                if value in rare:
+                    reason = 'Low frequency of enum value: (%s)' % count
+                    for index in rare[value]:
+                        self.add_error(index, value, reason, columnNumber, errors, invalid_rows_pos,
+                                       data_start)
+            return
+        if self.type == 'Identifier':
+            if self.data_size != -1:
+                size = self.data_size
+            else:
+                size = len(colValues[0])
+        else:
+            size = -1
+        # Each distinct value is checked once, only the rows of values with errors are visited
+        self.numeric_values()
+        empty = False
+        failed = {}
+        distinct = self.frequencies()
+        if distinct is None:
+            distinct = colValues
+        for value in distinct:
+            if value == '' or value == ' ':
+                empty = True
+                continue
+            reasons, clear = self.check_value(value, range_list2, size)
+            if reasons or clear:
+                failed[value] = (reasons, clear)
+        if empty and (self.ignore_empty or columnNumber in set_to_ignore):
+            empty = False
+        if not failed and not empty:
+            return
+        cleared = []
+        for x, value in enumerate(colValues):
+            if self.check_empty(x, value, columnNumber, errors, invalid_rows_pos, set_to_ignore, data_start):
+                continue
+            elif value in failed:
+                reasons, clear = failed[value]
+                for reason in reasons:
+                    self.add_error(x, value, reason, columnNumber, errors, invalid_rows_pos, data_start)
+                if clear:
                     colValues[x] = ''
+                    cleared.append(x)
                     edited = True
+        if edited:
+            vector = self.vector
+            self.values = colValues
+            if vector is not None:
+                # Removed values are marked empty rather than parsing the column again
+                for x in cleared:
+                    vector.set_empty(x)
+                self.vector = vector
 
-                elif len(range_list2) > 0:
-                    if float(value) < range_list2[0] or float(value) > range_list2[1]:
-                        reason = 'out of template range'
-                        tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                        errors.append(tup)
-                        formatted_errors.append(
-                            "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-                        colValues[x] = ''
-                        edited = True
+    def check_value(self, value, range_list2, size=-1):
+        """Checks a single non empty value against the type of the column. Returns a tuple of
+        the reasons the value is an error, and whether the value should be removed from the
+        column.
 
-        elif self.type == 'Integer':
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif not re_int.match(value):
-                    if self.ignore_NA and (value.lower() == 'n/a' or value.lower() == 'na'):
-                        pass
-                    else:
-                        reason = 'not an integer'
-                        if not invalid_rows_pos:
-                            print('Invalid Rows Empty')
-                        tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                        errors.append(tup)
-                        formatted_errors.append(
-                            "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-                    colValues[x] = ''
-                    edited = True
+        Keyword arguments:
+            value -- The value to be checked.
 
-                if len(range_list2) > 0:
-                    if float(value) < range_list2[0] or float(value) > range_list2[1]:
-                        reason = 'out of template range'
-                        tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                        errors.append(tup)
-                        formatted_errors.append(
-                            "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-                        colValues[x] = ''
-                        edited = True
-
-        elif self.type == 'Numeric':
-            edited = False
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif not re_int.match(value) and not re_float.match(value) and not re_sci_notation.match(
-                        value) and not value == '0':
-                    if self.ignore_NA and (value.lower() == 'n/a' or value.lower() == 'na'):
-                        colValues[x] = ''
-                    else:
-                        reason = 'not a number'
-                        tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                        errors.append(tup)
-                        formatted_errors.append(
-                            "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-                        colValues[x] = ''
-                    edited = True
-                    continue
+            range_list2 -- A list with two values (min, max) respectively, if supplied in a
+            template all values numeric values must fall between these two values or are an
+            error.
+
+            size -- The length of values for the 'Identifier' data type.
+        """
+        reasons = []
+        clear = False
+        not_applicable = self.ignore_NA and (value.lower() == 'n/a' or value.lower() == 'na')
+        if self.type == 'Float':
+            if not re_float.match(value) and not value == '0':
+                if not not_applicable:
+                    reasons.append('not a decimal number')
+                clear = True
+            elif len(range_list2) > 0:
+                number = self.parsed_float(value)
+                if number < range_list2[0] or number > range_list2[1]:
+                    reasons.append('out of template range')
+                    clear = True
+
+        elif self.type == 'Integer':
+            if not re_int.match(value):
+                if not not_applicable:
+                    reasons.append('not an integer')
+                clear = True
+            if len(range_list2) > 0:
                 try:
-                    if (abs(float(value)) < 6.00E-58 or 6.00E+58 < abs(float(value))) and not value == '0':
-                        reason = 'too large or too small'
-                        tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                        errors.append(tup)
-                        formatted_errors.append(
-                            "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-                        colValues[x] = ''
-                        edited = True
-                except:
-                    reason = 'not a number'
-                    tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                    errors.append(tup)
-                    formatted_errors.append(
-                        "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-                    colValues[x] = ''
-                    edited = True
+                    number = self.parsed_float(value)
+                except ValueError:
+                    number = None
+                if number is not None and (number < range_list2[0] or number > range_list2[1]):
+                    reasons.append('out of template range')
+                    clear = True
+
+        elif self.type == 'Numeric' or self.type == 'Sci_Notation':
+            if self.type == 'Numeric':
+                valid = re_int.match(value) or re_float.match(value) or re_sci_notation.match(value) \
+                        or value == '0'
+                reason = 'not a number'
+                smallest, largest = 6.00E-58, 6.00E+58
+            else:
+                valid = re_sci_notation.match(value)
+                reason = 'not scientific notation'
+                smallest, largest = 6.00E-76, 6.00E+76
+            if not valid:
+                if not not_applicable:
+                    reasons.append(reason)
+                return reasons, True
+            try:
+                number = self.parsed_float(value)
+            except ValueError:
+                reasons.append('not a number')
+                return reasons, True
+            if (abs(number) < smallest or largest < abs(number)) and \
+                    not (self.type == 'Numeric' and value == '0'):
+                reasons.append('too large or too small')
+                clear = True
+            if self.type == 'Numeric' and len(range_list2) > 0:
+                if number < range_list2[0] or number > range_list2[1]:
+                    reasons.append('out of template range')
+                    clear = True
 
-                if len(range_list2) > 0:
-                    if float(value) < range_list2[0] or float(value) > range_list2[1]:
-                        reason = 'out of template range'
-                        tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                        errors.append(tup)
-                        formatted_errors.append(
-                            "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-                        colValues[x] = ''
-                        edited = True
         elif self.type == 'Email':
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif not re_email.search(value):
-                    if parseaddr(value)[1] == '':
-                        reason = 'not an email'
-                        tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                        errors.append(tup)
-                        formatted_errors.append(
-                            "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
+            if not re_email.search(value) and parseaddr(value)[1] == '':
+                reasons.append('not an email')
 
         elif self.type == 'Boolean':
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif not re_boolean.match(value):
-                    reason = 'not a recognised yes/no type'
-                    tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                    errors.append(tup)
-                    formatted_errors.append(
-                        "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
+            if not re_boolean.match(value):
+                reasons.append('not a recognised yes/no type')
 
         elif self.type == 'Currency':
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif not re_currency.match(value):
-                    reason = 'not a recognised currency'
-                    tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                    errors.append(tup)
-                    formatted_errors.append(
-                        "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-                    colValues[x] = ''
-                    edited = True
-
-        elif self.type == 'String':
-            for x, value in enumerate(colValues):
-                self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                 data_start)
-
-        elif self.type == 'Enum':
-            self.define_most_least_common()
-            for x, value in enumerate(self.least_common):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif self.least_common[x][1] <= 1:
-                    freq = 0
-                    for index, cell in enumerate(colValues):
-                        if cell == value[0]:
-                            reason = 'Low frequency of enum value: (%s)' % self.least_common[x][1]
-                            tup = (index + invalid_rows_pos[index] + data_start, columnNumber, value[0], reason, index)
-                            errors.append(tup)
-                            formatted_errors.append(
-                                "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-                            freq += 1
-
-        elif self.type == 'Sci_Notation':
-            colValues = colValues
-            edited = False
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif not re_sci_notation.match(value):
-                    if self.ignore_NA and (value.lower() == 'n/a' or value.lower() == 'na'):
-                        colValues[x] = ''
-                    else:
-                        reason = 'not scientific notation'
-                        tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                        errors.append(tup)
-                        formatted_errors.append(
-                            "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-                        colValues[x] = ''
-                    edited = True
-                    continue
-                try:
-                    if abs(float(value)) < 6.00E-76 or 6.00E+76 < abs(float(value)):
-                        reason = 'too large or too small'
-                        tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                        errors.append(tup)
-                        formatted_errors.append(
-                            "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-                        colValues[x] = ''
-                        edited = True
-                except:
-                    reason = 'not a number'
-                    tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                    errors.append(tup)
-                    formatted_errors.append(
-                        "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-                    colValues[x] = ''
-                    edited = True
+            if not re_currency.match(value):
+                reasons.append('not a recognised currency')
+                clear = True
 
         elif self.type == 'Identifier':
-            if self.data_size != -1:
-                size = self.data_size
-            else:
-                size = len(colValues[0])
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif len(value) != int(size):
-                    reason = 'Identifier has length ' + str(len(value)) + ' instead of ' + size
-                    tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                    errors.append(tup)
-                    formatted_errors.append(
-                        "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
+            if len(value) != int(size):
+                reasons.append('Identifier has length ' + str(len(value)) + ' instead of ' + str(size))
+
         elif self.type == 'Date':
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif not re_date.match(value) and not re_daterev.match(value):
-                    reason = 'not a recognised date'
-                    tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                    errors.append(tup)
-                    formatted_errors.append(
-                        "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
+            if not re_date.match(value) and not re_daterev.match(value):
+                reasons.append('not a recognised date')
 
         elif self.type == 'Time':
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif not re_time.match(value):
-                    reason = 'not a recognised time'
-                    tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                    errors.append(tup)
-                    formatted_errors.append(
-                        "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
+            if not re_time.match(value):
+                reasons.append('not a recognised time')
 
         elif self.type == 'Char':
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif not re_char.match(value):
-                    reason = 'not a recognised character'
-                    tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                    errors.append(tup)
-                    formatted_errors.append(
-                        "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
+            if not re_char.match(value):
+                reasons.append('not a recognised character')
 
         elif self.type == 'Day':
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif not re_day.match(value):
-                    reason = 'not a recognised day'
-                    tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                    errors.append(tup)
-                    formatted_errors.append(
-                        "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
+            if not re_day.match(value):
+                reasons.append('not a recognised day')
 
         elif self.type == 'Hyperlink':
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                elif not re_hyper.match(value):
-                    reason = 'not a recognised hyperlink'
-                    tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                    errors.append(tup)
-                    formatted_errors.append(
-                        "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-        elif self.type == 'Datetime':
-            for x, value in enumerate(colValues):
-                if self.check_empty(x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                                    data_start):
-                    continue
-                else:
-                    split_value = value.split(' ',1)
-                    if not len(split_value) == 2 or not ((re_date.match(split_value[0].strip(' \t')) or
-                            re_daterev.match(split_value[0].strip(' \t'))) and re_time.match(split_value[1].strip(' \t'))):
-                        reason = 'not a recognised date time format'
-                        tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-                        errors.append(tup)
-                        formatted_errors.append(
-                            "Row: %d Column: %d Value: %s - %s" % (tup[0] + 1, tup[1] + 1, tup[2], reason))
-        if edited:
-            self.values = colValues
-
+            if not re_hyper.match(value):
+                reasons.append('not a recognised hyperlink')
 
-    def check_empty(self, x, value, columnNumber, errors, formatted_errors, invalid_rows_pos, set_to_ignore,
-                    data_start):
+        elif self.type == 'Datetime':
+            split_value = value.split(' ',1)
+            if not len(split_value) == 2 or not ((re_date.match(split_value[0].strip(' \t')) or
+                    re_daterev.match(split_value[0].strip(' \t'))) and re_time.match(split_value[1].strip(' \t'))):
+                reasons.append('not a recognised date time format')
+        return reasons, clear
+
+    def parsed_float(self, value):
+        """Returns a value as a float, taken from the numeric values of the column if it has
+        already been parsed. Raises ValueError if the value is not a number."""
+        if self.vector is not None and value in self.vector.parsed:
+            kind, number, exact = self.vector.parsed[value]
+            if kind == INT or kind == FLOAT:
+                return number
+        return float(value)
+
+    def add_error(self, x, value, reason, columnNumber, errors, invalid_rows_pos, data_start):
+        """Adds the cell at position x of the column to the errors with the given reason"""
+        errors.append((x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x))
+
+    def check_empty(self, x, value, columnNumber, errors, invalid_rows_pos, set_to_ignore, data_start):
         """Checks an individual cell of a column to see if it is empty. If it is set to ignore
         empty cells for this column returns True. If it is not set to ignore, return True and add
         cell to the list of errors. If it is not empty, return False.
@@ -705,13 +737,10 @@ class Column(object):
 
             columnNumber -- Number of column that cell is in.
 
-            errors -- List of errors. Numbered from 0. Contains row number (formatted for data
-            with incorrect columns removed), column number, cell value, reason for error (empty
-            cell) and row number (formatted for data with incorrect columns still present).
-
-            formatted_errors -- List of formatted errors, a human readable version of errors.
-            Contains a string listing the row and column in human readable form of the empty cell
-            and it's reason for being an error (empty cell).
+            errors -- ErrorStore, or list, of errors. Numbered from 0. Contains row number
+            (formatted for data with incorrect columns removed), column number, cell value,
+            reason for error (empty cell) and row number (formatted for data with incorrect
+            columns still present).
 
             invalid_rows_pos -- An array containing a number matching the amount of invalid
             rows that have been removed from analysis by the time that row is accessed. i.e.
@@ -728,10 +757,7 @@ class Column(object):
                 ((value == '' or value == ' ') and columnNumber in set_to_ignore):
             return True
         elif value == '' or value == ' ':
-            reason = 'empty cell'
-            tup = (x + invalid_rows_pos[x] + data_start, columnNumber, value, reason, x)
-            errors.append(tup)
-            formatted_errors.append("Row: %d Column: %d  - %s" % (tup[0] + 1, tup[1] + 1, reason))
+            errors.append((x + invalid_rows_pos[x] + data_start, columnNumber, value, empty_reason, x))
             return True
         else:
             return False
@@ -767,153 +793,141 @@ class Column(object):
             self.data_size = size
         return self.data_size
 
+    def frequencies(self):
+        """Returns a Counter of the number of times each value appears in the column, only
+        counting the values again if they have changed since last counted. Returns None if the
+        column has more than frequency_limit distinct values, heavy then holds a SpaceSaving
+        summary of the most common values instead.
+        """
+        if self.counts is None and self.heavy is None:
+            counts = Counter()
+            values = iter(self.values)
+            chunk = list(islice(values, frequency_limit))
+            while chunk:
+                counts.update(chunk)
+                if len(counts) > frequency_limit:
+                    counts = None
+                    self.heavy = SpaceSaving()
+                    self.heavy.update(self.values)
+                    break
+                chunk = list(islice(values, frequency_limit))
+            self.counts = counts
+        return self.counts
+
+    def set_parse(self, parse):
+        """Sets the function used to convert values of the column to numbers"""
+        if parse is not self.parse:
+            self.parse = parse
+            self.vector = None
+
+    def numeric_values(self):
+        """Returns a NumericVector of the values of the column parsed with parse, only parsing
+        the values again if they have changed since last parsed. Returns None if the column has
+        no parse function.
+        """
+        if self.parse is None:
+            return None
+        if self.vector is None:
+            self.vector = NumericVector(self.values, self.parse, self.frequencies())
+        return self.vector
+
+    def encode_values(self):
+        """Moves the values of a column held in memory from a list of strings to storage
+        for the type of the column, once the type is known. Integer columns are held as an
+        array of integers and Float and Numeric columns as an array of floats, each with a
+        bitmap of the values that are numbers, if most values are numbers. Other columns with
+        few distinct values, such as Boolean and Enum columns, are held as codes into a
+        dictionary of the values. Values that can not be held as numbers are kept as strings,
+        so the values read back are always the original strings.
+        """
+        if not typed_storage or not self.offline or not isinstance(self.mvalues, list):
+            return
+        values = self.mvalues
+        if self.type == 'Integer' or self.type == 'Float' or self.type == 'Numeric':
+            encoded = NumericColumn(values, integer=self.type == 'Integer')
+            if len(encoded.exceptions) * 2 > len(values):
+                return
+        else:
+            counts = self.frequencies()
+            if counts is None or len(counts) > dictionary_limit or len(counts) * 2 > len(values):
+                return
+            encoded = DictionaryColumn(values)
+        # The values are the same, so the frequencies and numbers kept still hold
+        self.mvalues = encoded
+
+    def values_changed(self):
+        """Drops the frequency table and numeric values kept for the column, to be called
+        whenever the values of the column change."""
+        self.counts = None
+        self.heavy = None
+        self.vector = None
+
     @values.setter
     def values(self, values):
+        self.values_changed()
         if self.offline:
             self.mvalues = values
+        elif values is self.store:
+            # Values edited in place, drop the records replaced by the edits
+            self.store.compact()
         else:
-            with open(self.valuefilename, 'w+') as fp:
-                fp.seek(0)
-                fp.truncate()
-                if values:
-                    fp.write(values[0])
-                    for value in values[1:]:
-                        fp.write(',' + value)
+            self.store.replace(values)
 
     @values.deleter
     def values(self):
         self.deleted = True
+        self.values_changed()
         if self.offline:
             del self.mvalues
         else:
-            os.remove(self.valuefilename)
+            self.store.remove()
 
     def add_value(self, value):
         """Adds value to column, call save values when finished adding values"""
+        self.values_changed()
         if self.offline:
             self.mvalues.append(value)
         else:
-            if self.valuefile.tell() != 0:
-                self.valuefile.write((','))
-            try:
-                self.valuefile.write(value)
-            except UnicodeEncodeError:
-                print("Encoding Error, cannot evaluate")
+            self.store.append(value)
+
+    def add_values(self, values):
+        """Adds a sequence of values to column in one go, call save values when finished
+        adding values"""
+        self.values_changed()
+        if self.offline:
+            self.mvalues.extend(values)
+        else:
+            self.store.extend(values)
 
     def save_file(self):
         if not self.offline:
-            self.valuefile.close()
-            del(self.valuefile)
+            self.store.flush()
 
 
     def get_values(self, position, number):
-        if self.offline:
-            if position + number /2 > len(self.mvalues):
-                return self.mvalues[-number:], position + number - len(self.mvalues)
-            elif position - number / 2 < 0:
-                return self.mvalues[:number], position
-            return self.mvalues[int(position-number/2):int(position+number/2)], number/2
-        line = ""
-        count = 0
-        nextC = ' '
-        if position - number/2 < 0:
-            pos = number
-        else:
-            pos = position + number/2
-        with open(self.valuefilename, 'r') as fp:
-            while count <= pos and nextC != '':
-                nextC = fp.read(5)
-                count += nextC.count(',')
-                line += nextC
-        if nextC == '':
-            line = line.split(',')
-            line_size = len(line)
-            if line_size < number:
-                return line, position
-            return line[-number:], position + number - line_size
-        line = line[:line.rfind(',')]
-        line = line.split(',')
-        if position - number/2 < 0:
-            return line[:number], position
-        return line[int(position-number/2):int(position+number/2)], number/2
+        values = self.values
+        if position + number /2 > len(values):
+            return values[-number:], position + number - len(values)
+        elif position - number / 2 < 0:
+            return values[:number], position
+        return values[int(position-number/2):int(position+number/2)], number/2
 
     def get_value(self, position):
-        if self.offline:
-            return self.mvalues[position]
-        value = ''
-        with open(self.valuefilename, 'r') as fp:
-            values = ''
-            nextC = fp.read(1)
-            while nextC != ',' and nextC != '':
-                values += nextC
-                nextC = fp.read(1)
-            if nextC == '':
-                raise EOFError("No values found in column")
-            values += fp.read(len(value) * position)
-            count = values.count(',')
-            while count <= position and nextC != '':
-                nextC = fp.read(5)
-                count += nextC.count(',')
-                values += nextC
-            if nextC == '' and count <= position:
-                raise IndexError("Position: " + position + " outside range of values in column")
-            values = values.split(',')
-        return values[position]
+        return self.values[position]
 
     def edit_value(self, position, value):
-        if self.offline:
-            self.mvalues[position] = value
         if value != None:
-            with open(self.valuefilename, 'r+') as fp:
-                values = ''
-                nextC = fp.read(1)
-                while nextC != ',' and nextC != '':
-                    values += nextC
-                    nextC = fp.read(1)
-                if nextC == '':
-                    raise EOFError("No values found in column")
-                values += nextC
-                values += fp.read(len(value) * position)
-                count = values.count(',')
-                if count > position: #progress to next comma
-                    nextC = ' '
-                    while nextC != ',' and nextC != '':
-                        nextC = fp.read(1)
-                        values += nextC
-                while count <= position and nextC != '':
-                    nextC = fp.read(1)
-                    count += nextC.count(',')
-                    values += nextC
-                values = values.split(',')
-                if values and values[position] != value: #only rewrite values if they have changed
-                    values[position] = value
-                    remainder = fp.read()
-                    fp.seek(0)
-                    fp.truncate()
-                    fp.write(values[0])
-                    for oldvalue in values[1:]:
-                        fp.write(',' + oldvalue)
-                    if len(remainder) > 0:
-                        fp.write(remainder)
+            self.values_changed()
+            self.values[position] = value
 
     def iterate_next(self):
         if self.pos == None:
             self.pos = 0
-        if self.offline:
-            self.pos += 1
-            return self.mvalue[self.pos-1]
-        with open(self.valuefilename, 'r') as fp:
-            fp.seek(self.pos)
-            value = ''
-            nextC = fp.read(1)
-            while nextC != ',' and nextC != '':
-                value += nextC
-                nextC = fp.read(1)
-            if nextC == '':
-                self.pos = None
-            else:
-                self.pos = fp.tell()
-            return value
+        value = self.values[self.pos]
+        self.pos += 1
+        if self.pos >= len(self.values):
+            self.pos = None
+        return value
 
 
 
@@ -5,24 +5,242 @@ runs analysis on said data.
 """
 
 import csv
+import io
+from itertools import islice
+from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
 
 try:
     from .analyser import *
     from .column import *
+    from .sketch import reservoir, wilson_interval
+    from .storage import ErrorStore, RowMap
+    from .sources import open_text, compression, output_name, is_excel, sheet_rows, RowSource, cursor_header, \
+        cursor_rows
 except:
     from analyser import *
     from column import *
+    from sketch import reservoir, wilson_interval
+    from storage import ErrorStore, RowMap
+    from sources import open_text, compression, output_name, is_excel, sheet_rows, RowSource, cursor_header, \
+        cursor_rows
 
 
 num_headers = 1
-re_separation = re.compile('[\|\\\;\s\t-]+')
+chunk_size = 10000
+range_size = 32 * 1024 * 1024
+sniff_size = 64 * 1024
+delimiters = ('\t', ';', '|', ' ', '-', '\\')
+delimiter_names = {' ': 'Space', '\t': 'Tab'}
+
+
+def reader_format(delimiter):
+    """Returns the csv.reader format parameters for a delimiter or delimiter type, where
+    runs of spaces count as a single delimiter.
+
+    Keyword arguments:
+        delimiter -- The delimiter character or its name, i.e. 'Space' or 'Tab'.
+    """
+    for char, name in delimiter_names.items():
+        if delimiter == name:
+            delimiter = char
+    return {'delimiter': delimiter, 'skipinitialspace': delimiter == ' '}
+
+
+def sniff_dialect(csv_file):
+    """Finds the delimiter and quoting of a CSV file once from up to sniff_size characters
+    at its start. A file is comma separated if most rows of the sample have more than one
+    field when split on commas, otherwise the delimiter is the one of delimiters that splits
+    the most rows into the same number of fields, earlier delimiters winning ties. The quote
+    character is taken from csv.Sniffer. Returns the csv.reader format parameters, with a
+    comma if no delimiter splits the rows.
+
+    Keyword arguments:
+        csv_file -- The filename of the file to be opened.
+    """
+    with open_text(csv_file) as csvfile:
+        sample = csvfile.read(sniff_size)
+        if csvfile.read(1) and '\n' in sample:
+            # Leave out the last line, it was cut short
+            sample = sample[:sample.rindex('\n') + 1]
+    best = None
+    best_score = 0
+    for delimiter in (',',) + delimiters:
+        params = reader_format(delimiter)
+        try:
+            counts = [len(row) for row in csv.reader(io.StringIO(sample, newline=''), **params)
+                      if row]
+        except csv.Error:
+            continue
+        if not counts:
+            break
+        fields = max(set(counts), key=counts.count)
+        score = counts.count(fields) / len(counts) if fields > 1 else 0
+        if delimiter == ',' and score > 0.5 or score > best_score:
+            best = params
+            best_score = score
+            if delimiter == ',':
+                break
+    if best is None:
+        best = reader_format(',')
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=best['delimiter'])
+        best['quotechar'] = dialect.quotechar
+    except csv.Error:
+        pass
+    return best
+
+
+def trim_row(row, empty_col):
+    """Trims the cells of row in the empty header columns if they are empty.
+
+    Keyword arguments:
+        row -- A row of the file.
+
+        empty_col -- List of the columns with no header.
+    """
+    new_row = []
+    for i, cell in enumerate(row):
+        if cell != "" or i not in empty_col:
+            new_row.append(cell)
+    return new_row
+
+
+def projection(numbers):
+    """Returns a function taking a row to a tuple of the values of the columns it keeps, or
+    None if every column is kept.
+
+    Keyword arguments:
+        numbers -- List of the numbers of the columns kept, counted from 0, or None to keep
+        every column.
+    """
+    if numbers is None:
+        return None
+    if not numbers:
+        return lambda row: ()
+    if len(numbers) == 1:
+        number = numbers[0]
+        return lambda row: (row[number],)
+    return itemgetter(*numbers)
+
+
+def count_quotes(task):
+    """Counts the quote characters in a byte range of a file. Run in a worker process by
+    Data.load_parallel().
+
+    Keyword arguments:
+        task -- Tuple of (filename, start, end, quote) of the byte range, where quote is the
+        quote character of the file as a byte string.
+    """
+    filename, start, end, quote = task
+    count = 0
+    with open(filename, 'rb') as fp:
+        fp.seek(start)
+        while start < end:
+            block = fp.read(min(1024 * 1024, end - start))
+            if not block:
+                break
+            count += block.count(quote)
+            start += len(block)
+    return count
+
+
+def parse_range(task):
+    """Parses the rows of a byte range of a file and sorts them into valid and invalid rows.
+    Run in a worker process by Data.load_parallel().
+
+    Keyword arguments:
+        task -- Tuple of (filename, start, end, dialect, empty_col, row_length, numbers) where
+        dialect is the csv.reader format parameters found by read_rows() and numbers the
+        columns kept, None for every column.
+
+    Returns a tuple of the number of rows read, a list of (index, row) for the invalid rows,
+    a RowMap of the number of invalid rows before each valid row and the valid values as a
+    tuple per column.
+    """
+    filename, start, end, dialect, empty_col, row_length, numbers = task
+    project = projection(numbers)
+    with open(filename, 'rb') as fp:
+        fp.seek(start)
+        text = fp.read(end - start).decode('ISO-8859-1')
+    lines = csv.reader(io.StringIO(text, newline=''), **dialect)
+    del text
+    invalid = []
+    invalid_pos = RowMap()
+    valid = []
+    index = 0
+    for row in lines:
+        row = trim_row(row, empty_col)
+        if len(row) != row_length:
+            invalid.append((index, row))
+        else:
+            valid.append(row if project is None else project(row))
+            invalid_pos.append(len(invalid))
+        index += 1
+    return index, invalid, invalid_pos, list(zip(*valid))
+
+
+def record_boundary(fp, pos, in_quotes, quote=b'"'):
+    """Returns the position after the first newline at or after pos that is not inside a
+    quoted field, or the end of the file.
+
+    Keyword arguments:
+        fp -- File opened in binary mode.
+
+        pos -- Position to start searching from.
+
+        in_quotes -- Whether pos is inside a quoted field.
+
+        quote -- The quote character of the file as a byte string. Default b'"'.
+    """
+    fp.seek(pos)
+    while True:
+        block = fp.read(64 * 1024)
+        if not block:
+            return pos
+        i = 0
+        while True:
+            found = block.find(quote, i)
+            if in_quotes:
+                if found == -1:
+                    break
+                in_quotes = False
+            else:
+                newline = block.find(b'\n', i)
+                if newline != -1 and (found == -1 or newline < found):
+                    return pos + newline + 1
+                if found == -1:
+                    break
+                in_quotes = True
+            i = found + 1
+        pos += len(block)
+
 
 class Data(object):
     """Main store for CSV data, reading the data from the CSV file and then 
     assigning out to relevant variables.
     
     Methods:
+        from_rows -- Creates a Data object from a header and an iterable of rows in place of
+        a file.
+
+        from_cursor -- Creates a Data object from the result of a query on a DB-API cursor.
+
         read -- Reads the CSV file and outputs to raw_data variable.
+
+        read_rows -- Generator yielding the rows of the CSV file one at a time.
+
+        read_preamble -- Reads only the rows before the data starts into raw_data.
+
+        load -- Streams the rows after the preamble straight into the columns,
+        equivalent to remove_invalid followed by create_columns.
+
+        load_parallel -- Splits the file into byte ranges and parses them in worker
+        processes, used by load when workers is more than 1.
+
+        excluded_columns -- Returns the columns the template leaves out of the data.
+
+        projection -- Returns a function taking a row to the values of the columns kept.
         
         remove_invalid -- Reads from raw_data variable and assigns rows to 
         valid_rows or invalid_rows according to their length.
@@ -52,6 +270,12 @@ class Data(object):
         row number,. column number and its value.
         
         getRowErrors -- Returns a list of all row errors
+
+        row_number -- Returns the row number reported for the position of a value in the
+        columns.
+
+        error_rates -- Returns the rate of invalid rows and of errors in each column of a
+        sample with their confidence intervals.
         
         getColumns -- Returns a list of all columns
         
@@ -83,6 +307,10 @@ class Data(object):
     	Filename -- String of path to file containing data
     	
         columns -- List of column objects.
+
+        column_numbers -- The number of each column in the header row counted from 0, which
+        the template settings and the errors refer to. Columns the template deletes, hides or
+        does not display are never read into columns, so their numbers are left out.
         
         invalid_rows -- List of invalid rows (i.e., more or less columns than
         number of headers). Copied from raw_data
@@ -91,17 +319,20 @@ class Data(object):
 
         formatted_invalid_rows -- List of invalid rows for report.
         
-        invalid_rows_pos -- List of the amount of invalid rows in the raw data prior
+        invalid_rows_pos -- RowMap of the amount of invalid rows in the raw data prior
         to each valid row (i.e. the nth element contains number of invalid rows
-        prior to the nth valid row)
+        prior to the nth valid row). When sampling the rows left out of the sample
+        are counted as well, so row numbers are those of the file. Only the rows
+        where the amount changes are stored.
         
-        errors -- list of errors in file; errors[n][0] is row of error, errors[n][1]
+        errors -- ErrorStore of errors in file; errors[n][0] is row of error, errors[n][1]
         is column of error, errors[n][2] is the value of in that location, 
         errors[n][3] is the reason for the error & error[4] is the index for the
-        value in columns[n1].values.
+        value in columns[n1].values. errors.total is the number of errors found, more
+        than are kept if they are written to an error sink.
         
-        formatted_errors -- List of errors in file, each error contains: row, column 
-        and value of the error.
+        formatted_errors -- Text of the errors in file, each error contains: row, column 
+        and value of the error. Made from errors as each is read.
         
         raw_data -- List of raw CSV data as rows. After remove_invalid() has run
         this only contains rows from the CSV file prior to the start of the data.
@@ -141,7 +372,23 @@ class Data(object):
 
         delete_set -- List of columns to be deleted
 
-        deleted_col -- List of columns that have been deleted, for writing to template
+        deleted_col -- List of columns that have been deleted or left out by the template,
+        for writing to template
+
+        stream -- A boolean stating whether the file is streamed into the columns with load()
+        instead of being read whole into raw_data.
+
+        chunk_size -- The number of rows load() buffers before handing them to the columns.
+
+        workers -- The number of worker processes load() parses the file with.
+
+        quantile_sketch -- Size of the quantile sketch used to estimate the quartiles of numeric
+        columns, 0 to find them exactly.
+
+        sample -- The number of rows load() keeps in a random sample of the data rows, 0 to
+        load every row.
+
+        sample_total -- The number of data rows in the file when sampling, 0 otherwise.
         """
     analysers = {
         'String': StringAnalyser,
@@ -181,18 +428,61 @@ class Data(object):
             ('Ignored', 'Ignored / not detected')
         )
     
-    def __init__(self, *args):
+    def __init__(self, *args, **kwargs):
         """Can take up to two arguments, 
             first argument -- filename
-            second argument -- template"""
+            second argument -- template
+
+        Keyword arguments:
+            stream -- If True only the preamble is read, load() must then be called in
+            place of remove_invalid() and create_columns(). Default False.
+
+            chunk_size -- Number of rows buffered at a time while streaming.
+
+            workers -- Number of worker processes used to parse the file when streaming.
+            Default 1.
+
+            quantile_sketch -- Size of the quantile sketch used to estimate the quartiles of
+            numeric columns, 0 to find them exactly. Overrides the template if given.
+
+            sample -- Number of rows load() keeps in a random sample of the data rows for a
+            quick preview of a large file, 0 to load every row. Default 0.
+
+            error_sink -- Error sink, such as a storage.CSVErrorSink, every error found is
+            written to as it is found. Only the first storage.column_error_limit errors of each
+            column are then kept in errors. The caller closes the sink.
+
+            threaded_input -- If True a compressed file is decompressed in a separate thread
+            as it is parsed. Default False.
+
+            sheet -- The name of the sheet read if the file is an Excel workbook, None for the
+            first sheet.
+
+            source -- A sources.RowSource the rows are read from in place of the file, the
+            filename then only names the data. See from_rows().
+        """
         self.filename = args[0]
+        self.stream = kwargs.pop('stream', False)
+        self.chunk_size = kwargs.pop('chunk_size', chunk_size)
+        self.workers = kwargs.pop('workers', 1)
+        quantile_sketch = kwargs.pop('quantile_sketch', None)
+        self.sample = kwargs.pop('sample', 0) or 0
+        error_sink = kwargs.pop('error_sink', None)
+        self.threaded_input = kwargs.pop('threaded_input', False)
+        self.sheet = kwargs.pop('sheet', None)
+        self.source = kwargs.pop('source', None)
+        if self.source is not None and not self.stream:
+            # Every row is read into raw_data, keep them so load() can read them again
+            self.source.keep = None
+        self.sample_total = 0
         self.columns = []
+        self.column_numbers = []
         self.invalid_rows = []
         self.invalid_rows_indexes = []
         self.formatted_invalid_rows = []
-        self.invalid_rows_pos = []
-        self.errors = []     
-        self.formatted_errors = []
+        self.invalid_rows_pos = RowMap()
+        self.errors = ErrorStore(error_sink)
+        self.formatted_errors = self.errors.formatted
         self.raw_data = []
         self.can_edit_rows = False
         self.data_in_columns = False
@@ -202,6 +492,7 @@ class Data(object):
         #Template settings
         self.template = None
         self.delimiter_type = ''
+        self.dialect = None
         self.header_row = 0
         self.data_start = 1
         self.data_size = {}
@@ -214,6 +505,7 @@ class Data(object):
         self.deleted_col = []
         self.display = []
         self.hide = []
+        self.quantile_sketch = 0
         if len(args) > 1:  
             self.template = args[1]
             self.delimiter_type = self.template.delimiter_type
@@ -230,8 +522,62 @@ class Data(object):
             self.delete_set = self.template.delete_set
             self.display = self.template.display
             self.hide = self.template.hide
+            self.quantile_sketch = self.template.quantile_sketch
+        if quantile_sketch is not None:
+            self.quantile_sketch = quantile_sketch
         #Process data
-        self.read(self.filename)
+        if self.stream:
+            self.read_preamble(self.filename)
+        else:
+            self.read(self.filename)
+
+    @classmethod
+    def from_rows(cls, header, rows, template=None, **kwargs):
+        """Creates a Data object from a header and an iterable of rows in place of a file,
+        feeding the same pipeline without writing a CSV file. Values that are not strings
+        are converted to text, None to an empty value. The rows are read once, so with
+        stream=True they are read as load() adds them to the columns and load() can only be
+        run once. Without stream=True every row is read and kept when the Data is created, as
+        the rows of a file are.
+
+        Keyword arguments:
+            header -- The names of the columns.
+
+            rows -- An iterable of the rows of values, such as a list of tuples or a
+            generator.
+
+            template -- The template containing various settings, None for no template.
+
+            name -- The name of the data, used in place of the filename in the report and to
+            name the files written for it. Default 'rows'.
+
+            Other keyword arguments are passed on to Data, i.e. stream=True.
+        """
+        name = kwargs.pop('name', 'rows')
+        kwargs['source'] = RowSource(header, rows)
+        if template is None:
+            return cls(name, **kwargs)
+        return cls(name, template, **kwargs)
+
+    @classmethod
+    def from_cursor(cls, cursor, template=None, **kwargs):
+        """Creates a Data object from the result of a query on a DB-API cursor, such as a
+        sqlite3.Cursor, as from_rows() does. The header is the column names of the result
+        and the rows are fetched in batches with fetchmany(). With stream=True the cursor
+        must stay open until load() has run, otherwise every row is fetched when the Data is
+        created.
+
+        Keyword arguments:
+            cursor -- A cursor a query has been executed on.
+
+            template -- The template containing various settings, None for no template.
+
+            size -- Number of rows fetched at a time, see sources.cursor_rows().
+
+            Other keyword arguments are passed on to from_rows().
+        """
+        rows = cursor_rows(cursor, kwargs.pop('size', None))
+        return cls.from_rows(cursor_header(cursor), rows, template, **kwargs)
 
     def __sizeof__(self):
         total = 0
@@ -245,44 +591,8 @@ class Data(object):
         Keyword arguments:
             csv_file -- The filename of the file to be opened.
         """
-        #separation of comma, semicolon, dash, tab delimited csv files
-        try:
-            if self.delimiter_type == '':
-                with open(csv_file,'rU', newline='', encoding='ISO-8859-1') as csvfile:
-                    try:
-                        f = csv.reader(csvfile)
-                        for line in f:
-                            n_col = len(line)
-                            if n_col == 1:
-                                result = re.split(re_separation, line[0])
-                                self.raw_data.append(result)
-                                delimiter_search = re.search(re_separation, line[0]).group(0)   #NEW
-                                if delimiter_search == ' ':
-                                    self.delimiter_type = 'Space'
-                                elif delimiter_search == '\t':
-                                    self.delimiter_type = 'Tab'
-                                else:
-                                    self.delimiter_type = delimiter_search   #NEW
-                            else:
-                                self.raw_data.append(line)
-                                self.delimiter_type = ','   #NEW
-
-                    except:
-                        print("Delimiter Warning: could not determine delimiter, consider",
-                        "specifying using template. Continuing using comma")
-                        csvfile.seek(0)
-                        f = csv.reader(csvfile, delimiter=',')
-                        self.delimiter_type = ','
-                        for row in f:
-                            self.raw_data.append(row)
-            else:
-                # template specified delimiter
-                with open(csv_file, 'rU', encoding='ISO-8859-1') as csvfile:
-                    f = csv.reader(csvfile, delimiter=self.delimiter_type)
-                    for row in f:
-                        self.raw_data.append(row)
-        except: # Most likely a read error from a badly formatted file
-            pass
+        for row in self.read_rows(csv_file):
+            self.raw_data.append(row)
         # Set header row as first non-empty row and data-start as row after that
         header = False
         for i, row in enumerate(self.raw_data):
@@ -292,6 +602,61 @@ class Data(object):
             elif row:
                 self.data_start = i
                 break
+
+    def read_preamble(self, csv_file):
+        """Reads the rows of the CSV file up to the first row of data into raw_data,
+        leaving the rest of the file to be streamed by load().
+
+        Keyword arguments:
+            csv_file -- The filename of the file to be opened.
+        """
+        rows = self.read_rows(csv_file)
+        header = False
+        for i, row in enumerate(rows):
+            if not header and row:
+                self.header_row = i
+                header = True
+            elif row:
+                self.data_start = i
+                break
+            self.raw_data.append(row)
+        rows.close()
+
+    def read_rows(self, csv_file):
+        """Generator yielding the rows of the CSV file one at a time. The delimiter is the
+        template delimiter or is found once from the start of the file by sniff_dialect(),
+        setting dialect and delimiter_type. Compressed files are decompressed as they are
+        read, and the rows of Excel workbooks are read from the sheet straight into the rows.
+        If the data has a row source its rows are yielded in place of the file's.
+
+        Keyword arguments:
+            csv_file -- The filename of the file to be opened.
+        """
+        if self.source is not None:
+            # Errors of the source, such as a database error, are not read errors of a file
+            self.dialect = None
+            self.delimiter_type = ''
+            for row in self.source.rows():
+                yield row
+            return
+        try:
+            if is_excel(csv_file):
+                self.dialect = None
+                self.delimiter_type = 'Excel'
+                for row in sheet_rows(csv_file, self.sheet):
+                    yield row
+                return
+            if self.template is not None and self.template.delimiter_type != '':
+                self.dialect = reader_format(self.template.delimiter_type)
+            else:
+                self.dialect = sniff_dialect(csv_file)
+            delimiter = self.dialect['delimiter']
+            self.delimiter_type = delimiter_names.get(delimiter, delimiter)
+            with open_text(csv_file, self.threaded_input) as csvfile:
+                for row in csv.reader(csvfile, **self.dialect):
+                    yield row
+        except Exception: # Most likely a read error from a badly formatted file
+            pass
                 
     def remove_invalid(self):
         """For each row in raw_data variable, checks row length and appends to 
@@ -301,12 +666,7 @@ class Data(object):
         """
         count = 0
         preamble = []
-        self.invalid_rows.clear()
-        self.invalid_rows_pos.clear()
-        self.invalid_rows_indexes.clear()
-        self.formatted_invalid_rows.clear()
-        self.valid_rows.clear()
-        self.invalid_rows_pos.clear()
+        self.clear_rows()
         if self.data_start != 0:
             for row in range(0, self.data_start):
                 preamble.append(self.raw_data.pop(0))
@@ -314,19 +674,189 @@ class Data(object):
         row_length = len(preamble[self.header_row])
         for index, row in enumerate(self.raw_data):
             row = self.trim_row(row, empty_col)
-            if len(row) != row_length:
-                self.invalid_rows_indexes.append( index)
-                self.formatted_invalid_rows.append(["%s: %d" % ("Row", index + 1)])
-                self.invalid_rows.append(row)
-                self.raw_data[index].clear()
-                count += 1
-            else:
+            if self.sort_row(index, row, row_length, count):
                 self.valid_rows.append(row)
-                self.invalid_rows_pos.append(count)
-                self.raw_data[index].clear()
+            else:
+                count += 1
+            self.raw_data[index].clear()
         self.raw_data = preamble
         self.can_edit_rows = True
 
+    def clear_rows(self):
+        """Empties the row lists filled by remove_invalid() and load()."""
+        self.invalid_rows.clear()
+        self.invalid_rows_pos.clear()
+        self.invalid_rows_indexes.clear()
+        self.formatted_invalid_rows.clear()
+        self.valid_rows.clear()
+
+    def sort_row(self, index, row, row_length, count):
+        """Records row as invalid if its length differs from the header, otherwise records
+        the number of invalid rows before it. Returns True if the row is valid.
+
+        Keyword arguments:
+            index -- Index of the row counted from the start of the data.
+
+            row -- The trimmed row.
+
+            row_length -- The number of columns in the header.
+
+            count -- The number of rows before this row which are not in the columns, the
+            invalid rows and any rows left out of a sample.
+        """
+        if len(row) != row_length:
+            self.invalid_rows_indexes.append(index)
+            self.formatted_invalid_rows.append(["%s: %d" % ("Row", index + 1)])
+            self.invalid_rows.append(row)
+            return False
+        self.invalid_rows_pos.append(count)
+        return True
+
+    def load(self, offline=True):
+        """Streams the rows after the preamble into the columns chunk_size rows at a time,
+        sorting invalid rows out as they are read. Does the work of remove_invalid() and
+        create_columns() in a single pass without building raw_data or valid_rows. With
+        offline False the column values are spilled to disk as each chunk is added, so memory
+        use is bounded by chunk_size rather than the size of the file.
+
+        If sample is set the data rows are read in a single pass keeping a random sample of
+        sample rows, and only the sample is loaded into the columns.
+
+        Keyword arguments:
+            offline -- Passed on to the Column objects, False stores values in temporary files.
+        """
+        if self.workers > 1 and not self.sample and self.source is None and self.load_parallel(offline):
+            return
+        rows = self.read_rows(self.filename)
+        preamble = list(islice(rows, self.data_start))
+        if not preamble:
+            return
+        self.clear_rows()
+        preamble[self.header_row], empty_col = self.trim_header(preamble[self.header_row])
+        self.raw_data = preamble
+        self.make_columns(offline)
+        row_length = len(preamble[self.header_row])
+        project = self.projection()
+        if self.sample:
+            sample, self.sample_total = reservoir(rows, self.sample)
+            rows.close()
+            chunks = iter([sample])
+        else:
+            numbered = enumerate(rows)
+            chunks = iter(lambda: list(islice(numbered, self.chunk_size)), [])
+        loaded = 0
+        for chunk in chunks:
+            valid = []
+            for index, row in chunk:
+                row = self.trim_row(row, empty_col)
+                if self.sort_row(index, row, row_length, index - loaded):
+                    valid.append(row if project is None else project(row))
+                    loaded += 1
+            if valid:
+                for column, values in zip(self.columns, zip(*valid)):
+                    column.add_values(values)
+            del chunk, valid
+        self.finish_columns()
+
+    def load_parallel(self, offline=True):
+        """Splits the data rows of the file into byte ranges ending on a newline outside of
+        quoted fields and parses them in a pool of worker processes. The per column values
+        each worker returns are added to the columns in file order. Returns False without
+        loading anything if the file cannot be split, in which case load() reads it in a
+        single process.
+
+        Keyword arguments:
+            offline -- Passed on to the Column objects, False stores values in temporary files.
+        """
+        size = os.path.getsize(self.filename)
+        if size <= range_size or compression(self.filename) is not None or is_excel(self.filename):
+            # Compressed files and workbooks can not be split into byte ranges
+            return False
+        rows = self.read_rows(self.filename)
+        preamble = list(islice(rows, self.data_start))
+        rows.close()
+        if not preamble:
+            return False
+        # Ranges are split on the quote character the rows are parsed with
+        quote = self.dialect.get('quotechar', '"').encode('ISO-8859-1')
+        # Find where the data starts in bytes, counting rows as lines outside of quotes
+        start = 0
+        records = 0
+        quotes = 0
+        with open(self.filename, 'rb') as fp:
+            for line in fp:
+                quotes += line.count(quote)
+                start += len(line)
+                if quotes % 2 == 0:
+                    records += 1
+                    if records == self.data_start:
+                        break
+        if records != self.data_start or start >= size:
+            return False
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            edges = list(range(start, size, range_size)) + [size]
+            counts = executor.map(count_quotes, [(self.filename, edges[i], edges[i + 1], quote)
+                                                 for i in range(len(edges) - 1)])
+            in_quotes = []
+            quotes = 0
+            for count in counts:
+                quotes += count
+                in_quotes.append(quotes % 2 == 1)
+            if in_quotes[-1]:
+                # Unbalanced quotes, ranges can not be found reliably
+                return False
+            bounds = [start]
+            with open(self.filename, 'rb') as fp:
+                for edge, quoted in zip(edges[1:-1], in_quotes):
+                    bound = record_boundary(fp, edge, quoted, quote)
+                    if bound > bounds[-1]:
+                        bounds.append(bound)
+            if bounds[-1] < size:
+                bounds.append(size)
+            self.clear_rows()
+            preamble[self.header_row], empty_col = self.trim_header(preamble[self.header_row])
+            self.raw_data = preamble
+            self.make_columns(offline)
+            row_length = len(preamble[self.header_row])
+            numbers = self.column_numbers if self.projection() is not None else None
+            tasks = [(self.filename, bounds[i], bounds[i + 1], self.dialect, empty_col, row_length,
+                      numbers) for i in range(len(bounds) - 1)]
+
+            def results():
+                # Keep only a few ranges in flight so parsed values do not pile up in memory
+                pending = []
+                for task in tasks:
+                    pending.append(executor.submit(parse_range, task))
+                    if len(pending) > self.workers * 2:
+                        yield pending.pop(0).result()
+                for future in pending:
+                    yield future.result()
+
+            count = 0
+            index = 0
+            try:
+                for n_rows, invalid, invalid_pos, values in results():
+                    for row_index, row in invalid:
+                        self.invalid_rows_indexes.append(index + row_index)
+                        self.formatted_invalid_rows.append(["%s: %d" % ("Row", index + row_index + 1)])
+                        self.invalid_rows.append(row)
+                    self.invalid_rows_pos.extend_map(invalid_pos, count)
+                    for column, column_values in zip(self.columns, values):
+                        column.add_values(column_values)
+                    count += len(invalid)
+                    index += n_rows
+            except Exception:
+                # e.g. a badly formatted row, read_rows() handles this
+                print("Parallel read failed, reading in a single process")
+                for col in self.columns:
+                    col.save_file()
+                    del col.values
+                self.columns.clear()
+                self.raw_data = []
+                return False
+        self.finish_columns()
+        return True
+
     def trim_header(self, row):
         """
         Trims empty cells from both ends of the header row
@@ -348,11 +878,7 @@ class Data(object):
         :param row:
         :return trimmed row:
         """
-        new_row = []
-        for i, cell in enumerate(row):
-            if cell != "" or i not in empty_col:
-                new_row.append(cell)
-        return new_row
+        return trim_row(row, empty_col)
 
     def create_columns(self, offline=True):
         """For each row in raw_data variable, assigns the first value to the 
@@ -360,12 +886,40 @@ class Data(object):
         Then removes header row from valid_rows. Then for each row in valid_rows,
         populates relevant column object with row data.
         """
+        self.make_columns(offline)
+        project = self.projection()
+        length = len(self.valid_rows)
+        for row_num in range(0, length):
+            row = self.valid_rows[row_num]
+            if project is not None:
+                row = project(row)
+            for column, value in zip(self.columns, row):
+                column.add_value(value)
+            self.valid_rows[row_num].clear()
+        self.valid_rows.clear()
+        self.finish_columns()
+
+    def make_columns(self, offline=True):
+        """Creates an empty Column object for each value in the header row, except for the
+        columns the template leaves out, setting column_numbers.
+
+        Keyword arguments:
+            offline -- Passed on to the Column objects, False stores values in temporary files.
+        """
         if self.columns:
             self.columns.clear()
+        self.column_numbers = []
         #os.chmod(os.path.join(os.getcwd(),'temp'), stat.S_IRUSR )
         if self.header_row >=0:
+            excluded = self.excluded_columns(len(self.raw_data[self.header_row]))
             i = 1
             for value in self.raw_data[self.header_row]:
+                if i - 1 in excluded:
+                    if i - 1 not in self.deleted_col:
+                        self.deleted_col.append(i - 1)
+                    i += 1
+                    continue
+                self.column_numbers.append(i - 1)
                 tmp_list = []
                 tmp_list.append(value)
                 tmp_list.append(" (Column ")
@@ -374,35 +928,46 @@ class Data(object):
                 s = ''.join(tmp_list)
                 i += 1
                 self.columns.append(Column(header=s, offline=offline))
-        length = len(self.valid_rows)
-        for row_num in range(0, length):
-            for index, value in enumerate(self.valid_rows[row_num]):
-                self.columns[index].add_value(value)
-            self.valid_rows[row_num].clear()
-        self.valid_rows.clear()
+
+    def excluded_columns(self, count):
+        """Returns the set of the numbers of the columns, counted from 0, the template leaves
+        out of the data: the deleted and hidden columns and, if only some columns are to be
+        displayed, every other column.
+
+        Keyword arguments:
+            count -- The number of columns in the header row.
+        """
+        excluded = set(self.delete_set) | set(self.hide)
+        if self.display:
+            excluded |= set(range(count)) - set(self.display)
+        return excluded
+
+    def projection(self):
+        """Returns a function taking a row to a tuple of the values of the columns kept, or
+        None if every column of the header row is kept.
+        """
+        if self.header_row < 0 or len(self.column_numbers) == len(self.raw_data[self.header_row]):
+            return None
+        return projection(self.column_numbers)
+
+    def finish_columns(self):
+        """Saves the columns once all values are added and applies the column settings
+        of the template.
+        """
         for col in self.columns:
             col.save_file()
-        if self.delete_set:
-            for colNo in self.delete_set:
-                self.columns[colNo].delete_col()
-                self.deleted_col.append(colNo)
-            self.delete_set.clear() #only do once
         #self.invalid_rows = [] #dont for reversibility but uses more memory
         #self.invalid_rows_indexes = []
         self.can_edit_rows = False
         self.data_in_columns = True
         if self.ignore_na:
             if isinstance(self.ignore_na, list):
-                for col in self.ignore_na:
-                    self.columns[col].ignore_NA = True
+                for col, number in zip(self.columns, self.column_numbers):
+                    if number in self.ignore_na:
+                        col.ignore_NA = True
             else:
                 for col in self.columns:
                     col.ignore_NA = True
-        for i in range(0,len(self.columns)):
-            if self.display and not i in self.display:
-                del(col)
-            elif self.hide and i in self.hide:
-                del(col)
 
         
         
@@ -420,20 +985,28 @@ class Data(object):
         for colNo, column in enumerate(self.columns):
             if not column.empty and column.type in self.analysers:
                 column.define_most_least_common()
+                counts = column.frequencies()
+                if counts is None:
+                    counts = column.heavy
                 if( column.type == 'Integer' or column.type == 'Float' \
                     or column.type == 'Currency' or column.type == 'Sci_Notation' \
                     or column.type == 'Numeric'):
-                    column.analysis = self.analysers[column.type](column.values, self.std_devs_val)
+                    column.set_parse(self.analysers[column.type].parse)
+                    column.analysis = self.analysers[column.type](column.values, self.std_devs_val,
+                                                                  counts=counts,
+                                                                  vector=column.numeric_values(),
+                                                                  row_number=self.row_number,
+                                                                  quantile_sketch=self.quantile_sketch)
                 else:
-                    column.analysis = self.analysers[column.type](column.values)
+                    column.analysis = self.analysers[column.type](column.values, counts=counts)
 
     def find_errors(self):
         """Iterates through each column and finds any errors according to pre-determined
         conditions.
         """
-        for colNo, column in enumerate(self.columns):
+        for colNo, column in zip(self.column_numbers, self.columns):
              if not column.empty and not column.type == 'Ignored':
-                column.define_errors(colNo, self.errors, self.formatted_errors, self.invalid_rows_pos, self.range_list, self.set_ignore, self.data_start)
+                column.define_errors(colNo, self.errors, self.invalid_rows_pos, self.range_list, self.set_ignore, self.data_start)
 
 
     def pre_analysis(self):
@@ -442,7 +1015,7 @@ class Data(object):
         column is not empty defines its type, and if it's a special data type sets the columns
         size to me no more than data_size.
         """             
-        for colNo, column in enumerate(self.columns):
+        for colNo, column in zip(self.column_numbers, self.columns):
             column.define_most_least_common()
             if self.template != None and colNo in self.template.columns:
                 column.set_type(self.template.columns[colNo])
@@ -455,9 +1028,12 @@ class Data(object):
             elif column.type == 'Integer' or column.type == 'Float' \
                         or column.type == 'Currency' or column.type == 'Sci_Notation' \
                         or column.type == 'Numeric':
-                column.compatible = self.analysers[column.type].is_compatable(column.values)
+                # Values are parsed once here and the numbers reused by find_errors and analysis
+                column.set_parse(self.analysers[column.type].parse)
+                column.compatible = self.analysers[column.type].is_compatable(column.numeric_values())
             if self.ignore_empty:
                 column.ignore_empty = True
+            column.encode_values()
         self.datatypes_are_defined = True
 
     def check_compatible(self):
@@ -468,7 +1044,8 @@ class Data(object):
             if column.type == 'Integer' or column.type == 'Float' \
                     or column.type == 'Currency' or column.type == 'Sci_Notation' \
                     or column.type == 'Numeric':
-                column.compatible = self.analysers[column.type].is_compatable(column.values)
+                column.set_parse(self.analysers[column.type].parse)
+                column.compatible = self.analysers[column.type].is_compatable(column.numeric_values())
             else:
                 column.compatible = True
         
@@ -495,7 +1072,7 @@ class Data(object):
                 new_values - list of values row is to be changed to
         """
         for colNo, column in enumerate(self.columns):
-            column.values[row_num] = new_values[colNo - 1]
+            column.edit_value(row_num, new_values[colNo - 1])
         
     def gen_file(self, filePath=""):
         """
@@ -505,7 +1082,7 @@ class Data(object):
             
                 filePath -- Name of file to be generated.   
         """
-        fileLocation = os.path.join( filePath, os.path.splitext(self.filename)[0]) + "_corrected.csv"
+        fileLocation = os.path.join( filePath, output_name(self.filename, self.sheet)) + "_corrected.csv"
         new_file = open(fileLocation, "w")
         #Write header rows
         for rowNo in range(0, self.data_start):
@@ -550,6 +1127,29 @@ class Data(object):
             Returns a list of all row errors
         """
         return self.invalid_rows
+
+    def row_number(self, position):
+        """
+            Returns the row number reported for the position of a value in the columns,
+            counting from 1 and including the rows before the data and invalid rows.
+        """
+        return position + self.invalid_rows_pos[position] + self.data_start + 1
+
+    def error_rates(self):
+        """
+            Returns the rate of invalid rows in a sample of the file followed by the rate of
+            cells with an error in each column, as a list of (name, count, rate, low, high) where
+            low and high are the bounds of the confidence interval of the rate in the file.
+        """
+        loaded = len(self.invalid_rows_pos)
+        sampled = loaded + len(self.invalid_rows)
+        rates = [("Invalid rows", len(self.invalid_rows), sampled)]
+        column_errors = self.errors.cell_counts()
+        for colNo, column in zip(self.column_numbers, self.columns):
+            if not column.empty and not column.type == 'Ignored':
+                rates.append((column.header, column_errors.get(colNo, 0), loaded))
+        return [(name, count, count / total if total else 0.0) + wilson_interval(count, total)
+                for name, count, total in rates]
         
     def getColumns(self):
         """
@@ -585,7 +1185,6 @@ class Data(object):
     	    Wipes recorded errors to allow find_errors() to be rerun
     	"""
     	self.errors.clear()
-    	self.formatted_errors.clear()
     	#self.invalid_rows = []              
         
     def rebuild_raw_data(self):
@@ -640,8 +1239,7 @@ class Data(object):
         if self.can_edit_rows == True:
             row_index = self.invalid_rows_indexes[invalid_row_index]
             next_valid = row_index - invalid_row_index #Index of first valid row after removed invalid row in invalid_rows_pos
-            for i in range(next_valid,len(self.invalid_rows_pos)):
-                self.invalid_rows_pos[i] = self.invalid_rows_pos[i] - 1
+            self.invalid_rows_pos.shift(next_valid, -1)
 
             self.invalid_rows_indexes.pop(invalid_row_index)
             self.formatted_invalid_rows.pop(invalid_row_index)
@@ -650,7 +1248,7 @@ class Data(object):
             raise RuntimeWarning('function Data.rebuild_raw_data() called after create_columns() or before remove_invalid()')
 
     def delete_column(self, colNo):
-        self.deleted_col.append(colNo)
+        self.deleted_col.append(self.column_numbers[colNo])
         self.columns[colNo].deleted = True
         del(self.columns[colNo].values)
 
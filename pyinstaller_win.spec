@@ -10,8 +10,8 @@ a = Analysis(['application.py'],
              hookspath=[],
              runtime_hooks=[],
              excludes=['matplotlib','IPython','sphinx','sqlalchemy','Cython','OpenSSL','PIL','asyncio', 'babel','backports',
-              'boto','bottleneck', 'cffi', 'cloudpickle', 'Crypto','PyQt5','bs4','colorama','concurrent','future','gevent',
-              'ipykernel','jinja2','jupyter_client','jupyter_core','lib2to3','libfuturize','markupsafe','multiprocessing',
+              'boto','bottleneck', 'cffi', 'cloudpickle', 'Crypto','PyQt5','bs4','colorama','future','gevent',
+              'ipykernel','jinja2','jupyter_client','jupyter_core','lib2to3','libfuturize','markupsafe',
               'numpy','nose', 'numexpr', 'openpyxl','pandas', 'past', 'patsy', 'pygments', 'pywin', 'setuptools', 'sqlite3',
                'scipy','statsmodels', 'tables', 'tornado', 'xlswriter', 'xlwt', 'xlwt'],
              win_no_prefer_redirects=False,
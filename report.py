@@ -6,9 +6,14 @@ Classes:
 """
 try:
 	from .template import *
+	from .sketch import interval_z
+	from .sources import output_name
 except:
 	from template import *
+	from sketch import interval_z
+	from sources import output_name
 
+from math import erf, sqrt
 from os import path
 
 class Report(object):
@@ -18,6 +23,8 @@ class Report(object):
     Methods:
         __init__ -- Initialise the object and create required local variables.
     
+        display_name -- Return the name of the file shown in the report.
+    
         empty_columns -- Return empty columns in the data object.
     
         html_report -- Create HTML report and output to file.
@@ -43,6 +50,11 @@ class Report(object):
         day_analysis -- Return day based statistics on input.
         
         hyper_analysis -- Return hyperlink based analyis on input.
+
+        sample_note -- Return a note that the report is of a sample, with the estimated error
+        rates of the file.
+
+        error_list -- Return the anomaly cells shown in the report as a HTML list.
         
         list_creator -- Provided a list, returns an unordered html list of values in the list.
         
@@ -53,6 +65,8 @@ class Report(object):
         
         initial_show_items -- Returns the number of items to show initially for each type in the 
         report before hiding them under a 'show more' button.
+
+        error_limit -- Returns the maximum number of anomaly cells listed in the report.
     
     Variables:
         GRAPH_LIMIT -- How many rows before the graphs will stop displaying every value, but just show a summary
@@ -108,6 +122,18 @@ class Report(object):
         """Return the maximum number of items to display if 'show more' is disabled (offline)"""
         return 30
 
+    @staticmethod
+    def error_limit():
+        """Return the maximum number of anomaly cells listed, only these have their text made"""
+        return 1000
+
+    def display_name(self):
+        """Return the name of the file, with the sheet read if it is a workbook."""
+        name = path.split(self.file_name)[1]
+        if self.data.sheet is not None:
+            name += " - " + self.data.sheet
+        return name
+
     def empty_columns(self):
         """Return a list of empty columns in the data object."""
         return [column.header for column in self.data.columns if column.empty]
@@ -119,13 +145,14 @@ class Report(object):
         if self.offline:
             self.chart_data = '[];'
         html = base_template.format(
-            filename = path.split(self.file_name)[1],
+            filename = self.display_name(),
+            sample_note = self.sample_note(),
             len_invalid_rows=len(self.data.formatted_invalid_rows),
             invalid_rows=self.list_creator(self.data.formatted_invalid_rows), 
             empty_columns=self.list_creator(self.empty_columns()),
             len_empty_columns=len(self.empty_columns()),
-            error_columns=self.list_creator(self.data.formatted_errors),
-            len_error_columns=len(self.data.errors),
+            error_columns=self.error_list(),
+            len_error_columns=self.data.errors.total,
             len_columns=len(self.data.columns[0].values),
             delimiter_type = self.data.delimiter_type,
             num_columns=len(self.data.columns),
@@ -150,6 +177,33 @@ class Report(object):
         return str(html) 
 
 
+    def sample_note(self):
+        """Return HTML noting the report is based on a random sample of the rows of the
+        file, with the rate of invalid rows and errors in each column and their confidence
+        intervals. Empty if every row was analysed.
+        """
+        if not self.data.sample:
+            return ''
+        sampled = len(self.data.invalid_rows_pos) + len(self.data.invalid_rows)
+        rates = ["%s: %d (%.2f%%, %.2f%% to %.2f%%)" % (name, count, 100 * rate, 100 * low, 100 * high)
+                 for name, count, rate, low, high in self.data.error_rates()]
+        return ('\n    <div class="alert alert-warning"><p><b>Sampled preview:</b> based on a random sample of ' +
+                str(sampled) + ' of the ' + str(self.data.sample_total) + ' rows in the file. Counts are '
+                'of the sampled rows, estimated rates for the whole file are given with a ' +
+                str(round(100 * erf(interval_z / sqrt(2)))) + '% confidence interval.</p>' +
+                self.list_creator(rates) + '</div>')
+
+    def error_list(self):
+        """Return the first error_limit anomaly cells kept as a HTML list, noting how many of
+        the anomaly cells are shown if not all of them.
+        """
+        shown = self.data.formatted_errors[:Report.error_limit()]
+        html_list = self.list_creator(shown)
+        if len(shown) < self.data.errors.total:
+            html_list = "<p>Showing " + str(len(shown)) + " of " + str(self.data.errors.total) + \
+                        " anomaly cells.</p>" + html_list
+        return html_list
+
     def list_creator(self, list_items, height=500):
         """Return provided list as an unordered HTML list.
         
@@ -232,6 +286,7 @@ class Report(object):
                         most_common[i] = (round(tup1[0], 4),tup1[1])
                     except TypeError:
                         pass #non numeric
+                for i in range(0,len(least_common)):
                     try:
                         tup1 = least_common[i]
                         tup1 = (self.str_to_num(tup1[0]), tup1[1])
@@ -242,12 +297,12 @@ class Report(object):
                 math_stats = [self.shorten(header[0],15) + "<br>" + header[1] + " " + header[2] + "<br>" + self.types[column.type]]
                 math_stats.append(self.list_stack(most_common))
                 math_stats.append(self.list_stack(least_common))
-                math_stats.append(column.analysis.unique)
+                math_stats.append(self.unique_text(column.analysis))
                 math_stats.append("Min: " + str(column.analysis.min) + "<br>Max: " + str(column.analysis.max))
                 math_stats.append("Average:<br>" + str(column.analysis.mean) + "<br>Standard Deviation:<br>" +
                                   str(column.analysis.stdev))
                 math_stats.append("Lower: " + str(column.analysis.quartile_low) + "<br>Median: " + str(column.analysis.median) +
-                                  "<br>Upper: " + str(column.analysis.quartile_up))
+                                  "<br>Upper: " + str(column.analysis.quartile_up) + self.quantile_note(column.analysis))
                 math_stats.append(column.analysis.stDevOutliers)
                 if not self.offline:
                     self.chart_data = ''.join([self.chart_data, "["])
@@ -283,7 +338,7 @@ class Report(object):
                        self.flag_errors(column.analysis.mode),
                        self.flag_errors(column.most_common[:5]),
                        self.flag_errors(column.least_common[:5]),
-                       column.analysis.unique]
+                       self.unique_text(column.analysis)]
                 rowNo+=1;
                 rows += self.row_creator(row, rowNo, 'S')
                 if not self.offline:
@@ -311,7 +366,7 @@ class Report(object):
                        self.flag_errors(column.analysis.mode),
                        self.flag_errors(column.most_common[:5]),
                        self.flag_errors(column.least_common[:5]),
-                       column.analysis.unique]
+                       self.unique_text(column.analysis)]
                 rowNo += 1;
                 rows += self.row_creator(row, rowNo, 'E')
                 if not self.offline:
@@ -339,7 +394,7 @@ class Report(object):
                        self.flag_errors(column.analysis.mode),
                        self.flag_errors(column.most_common[:5]),
                        self.flag_errors(column.least_common[:5]),
-                       column.analysis.unique]
+                       self.unique_text(column.analysis)]
                 rowNo+=1;
                 rows += self.row_creator(row, rowNo, 'Em')
                 if not self.offline:
@@ -367,7 +422,7 @@ class Report(object):
                        column.analysis.mode,
                        self.flag_errors(column.most_common[:5]),
                        self.flag_errors(column.least_common[:5]),
-                       column.analysis.unique,
+                       self.unique_text(column.analysis),
                        column.total_true,
                        column.total_false,
                        column.total_yes,
@@ -403,12 +458,12 @@ class Report(object):
                        column.analysis.mean,
                        column.analysis.quartile_low,
                        column.analysis.median,
-                       column.analysis.quartile_up,
+                       str(column.analysis.quartile_up) + self.quantile_note(column.analysis),
                        column.analysis.stdev,
                        column.analysis.stDevOutliers,
                        column.most_common[:5],
                        column.least_common[:5],
-                       column.analysis.unique]
+                       self.unique_text(column.analysis)]
                 rowNo += 1;
                 rows += self.row_creator(row, rowNo, 'C')
                 if not self.offline:
@@ -453,7 +508,7 @@ class Report(object):
                        column.analysis.mode,
                        self.flag_errors(column.most_common[:5]),
                        self.flag_errors(column.least_common[:5]),
-                       column.analysis.unique,
+                       self.unique_text(column.analysis),
                        column.analysis.dateDF,
                        column.analysis.dateMM,
                        column.analysis.dateJA,
@@ -485,7 +540,7 @@ class Report(object):
                        self.flag_errors(column.analysis.mode),
                        self.flag_errors(column.most_common[:5]),
                        self.flag_errors(column.least_common[:5]),
-                       column.analysis.unique,
+                       self.unique_text(column.analysis),
                        column.analysis.hourCS[:5],
                        column.analysis.hourCS[-5:]]
                 rowNo+=1;
@@ -515,7 +570,7 @@ class Report(object):
                        column.analysis.mode,
                        self.flag_errors(column.most_common[:5]),
                        self.flag_errors(column.least_common[:5]),
-                       column.analysis.unique]
+                       self.unique_text(column.analysis)]
                 rowNo+=1;
                 self.chart_data = ''.join([self.chart_data,"["])
                 self.chart_data = ''.join([self.chart_data,"['Row ','Value'],"])
@@ -542,7 +597,7 @@ class Report(object):
                        self.flag_errors(column.analysis.mode),
                        self.flag_errors(column.most_common[:5]),
                        self.flag_errors(column.least_common[:5]),
-                       column.analysis.unique]
+                       self.unique_text(column.analysis)]
                 rowNo+=1;
                 rows += self.row_creator(row, rowNo, 'Dy')
                 if not self.offline:
@@ -570,7 +625,7 @@ class Report(object):
                        self.flag_errors(column.analysis.mode),
                        self.flag_errors(column.most_common[:5]),
                        self.flag_errors(column.least_common[:5]),
-                       column.analysis.unique]
+                       self.unique_text(column.analysis)]
                 rowNo+=1;
                 rows += self.row_creator(row, rowNo, 'H')
                 if not self.offline:
@@ -599,7 +654,7 @@ class Report(object):
                        self.flag_errors(column.analysis.mode),
                        self.flag_errors(column.most_common[:5]),
                        self.flag_errors(column.least_common[:5]),
-                       column.analysis.unique]
+                       self.unique_text(column.analysis)]
                 rowNo+=1;
                 rows += self.row_creator(row, rowNo, 'I')
                 if not self.offline:
@@ -627,7 +682,7 @@ class Report(object):
                        self.flag_errors(column.analysis.mode),
                        self.flag_errors(column.most_common[:5]),
                        self.flag_errors(column.least_common[:5]),
-                       column.analysis.unique]
+                       self.unique_text(column.analysis)]
                 rowNo += 1;
                 #self.chart_data = ''.join([self.chart_data, "["])
                 #self.chart_data = ''.join([self.chart_data, "['Row ','Value'],"])
@@ -642,7 +697,7 @@ class Report(object):
 
     def gen_html(self, html):
         """Generates html report for the file"""
-        filename = path.splitext(self.file_name)[0] + "_report.html"
+        filename = output_name(self.file_name, self.data.sheet) + "_report.html"
         html_file = open(filename, "w")
         html_file.write(html)
         html_file.close()
@@ -697,6 +752,28 @@ class Report(object):
                 result += line
         return result
 
+    def unique_text(self, analysis):
+        """
+        Returns the count of unique values of a column, marked as estimated if it is not exact.
+        :param analysis object of a column:
+        :return html ready line:
+        """
+        if getattr(analysis, 'unique_exact', True):
+            return analysis.unique
+        return "~" + str(analysis.unique) + "<br>(estimated)"
+
+    def quantile_note(self, analysis):
+        """
+        Returns a note of the rank error bound of quartiles estimated with a quantile sketch,
+        an empty string if the quartiles are exact.
+        :param analysis object of a numeric column:
+        :return html ready line:
+        """
+        error = getattr(analysis, 'quantile_error', None)
+        if error is None:
+            return ""
+        return "<br>(approx. &plusmn;%.2g%% rank)" % (error * 100)
+
     def list_stack(self, list):
         """
         Separates list items and puts them in their own html line. Also flags empty cells and NA cells in red font.
@@ -0,0 +1,774 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-15 -*-
+"""Summaries of the values of a column which are built in one pass, can be updated a chunk of
+values at a time and merged with the summaries of other chunks, processes or files.
+
+Global Variables:
+    normal_confidence -- Confidence at which values are taken to not be normally distributed
+    by the Jarque-Bera test, default 0.955 (95.5%).
+
+    quantile_k -- Default size of the largest compactor of a KLL quantile sketch, the rank
+    error falls roughly as 1/k and the memory used grows as k. Default 200, about a 1.3%
+    rank error in a few hundred numbers held.
+
+    distinct_precision -- Number of bits of the hash of a value used to choose its register in
+    a HyperLogLog, which has 2 ** distinct_precision registers and a standard error of about
+    1.04 / sqrt(2 ** distinct_precision). Default 14, 16KB and 0.8%.
+
+    distinct_limit -- Number of distinct values a DistinctCount counts exactly before it
+    switches to a HyperLogLog. Default 262144, around 16MB of hashes.
+
+    heavy_capacity -- Number of values a SpaceSaving summary keeps counts for, the count of
+    any value is overestimated by at most the number of values added divided by this.
+    Default 1000.
+
+    sample_size -- Default number of rows kept by a sampled preview of a file. Default 10000,
+    giving a rate to within about 1% either way.
+
+    interval_z -- Number of standard errors either side of a rate estimated from a sample
+    given as its confidence interval. Default 1.96, a 95% interval.
+
+    test_confidence -- Probability a sequential test of a rate gives the right answer when
+    the rate is outside its margin of the threshold. Default 0.999.
+
+    test_margin -- Distance either side of the threshold within which a sequential test of a
+    rate may give either answer. Default 0.02, so with a threshold of 90% a rate under 88% is
+    rejected and one over 92% accepted with test_confidence.
+"""
+import heapq
+import random
+from bisect import bisect_left
+from hashlib import blake2b
+from itertools import islice
+from math import ceil, exp, floor, fsum, log, pow, sqrt
+
+
+normal_confidence = 0.955
+quantile_k = 200
+distinct_precision = 14
+distinct_limit = 262144
+heavy_capacity = 1000
+sample_size = 10000
+interval_z = 1.96
+test_confidence = 0.999
+test_margin = 0.02
+
+
+def hash64(value):
+    """Returns a 64 bit hash of a value which is the same in every process and run, unlike the
+    built in hash of a string. Values that are not strings are hashed as their string
+    representation.
+
+    Keyword arguments:
+        value -- The value to be hashed.
+    """
+    if not isinstance(value, str):
+        value = str(value)
+    digest = blake2b(value.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class Moments(object):
+    """Count, mean and sums of the second, third and fourth powers of the deviations from the
+    mean of a set of numbers. Numbers are added one at a time using Welford's method, or as a
+    chunk, and moments merged exactly using the pairwise formulas of Chan and Pebay, so the
+    numbers do not need to be held.
+
+    Methods:
+        add -- Adds a number.
+
+        update -- Adds a chunk of numbers.
+
+        merge -- Adds the numbers summarised by another Moments.
+
+        variance -- Returns the population variance.
+
+        stdev -- Returns the population standard deviation.
+
+        skewness -- Returns the skewness.
+
+        kurtosis -- Returns the kurtosis, 3 for a normal distribution.
+
+        jarque_bera -- Returns the Jarque-Bera statistic of the numbers.
+
+        normaltest -- Returns whether the numbers may be normally distributed.
+
+    Class Methods:
+        of -- Returns the Moments of a chunk of numbers.
+
+    Variables:
+        n -- Count of the numbers.
+
+        mean -- Mean of the numbers.
+
+        m2, m3, m4 -- Sums of the second, third and fourth powers of the deviations of the
+        numbers from their mean.
+    """
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, m3=0.0, m4=0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.m3 = m3
+        self.m4 = m4
+
+    def __repr__(self):
+        return "Moments(%d, %r, %r, %r, %r)" % (self.n, self.mean, self.m2, self.m3, self.m4)
+
+    @classmethod
+    def of(cls, values):
+        """Returns the Moments of a chunk of numbers. The sums are taken with fsum so they are
+        correctly rounded whatever the order of the numbers.
+
+        Keyword arguments:
+            values -- A sequence of numbers.
+        """
+        n = len(values)
+        if n == 0:
+            return cls()
+        mean = fsum(values) / n
+        deviations = [x - mean for x in values]
+        squares = [d * d for d in deviations]
+        return cls(n, mean, fsum(squares), fsum([s * d for s, d in zip(squares, deviations)]),
+                   fsum([s * s for s in squares]))
+
+    def add(self, x):
+        """Adds a number to the moments"""
+        n1 = self.n
+        self.n += 1
+        n = self.n
+        delta = x - self.mean
+        delta_n = delta / n
+        delta_n2 = delta_n * delta_n
+        term = delta * delta_n * n1
+        self.mean += delta_n
+        self.m4 += term * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * self.m2 - 4 * delta_n * self.m3
+        self.m3 += term * delta_n * (n - 2) - 3 * delta_n * self.m2
+        self.m2 += term
+
+    def update(self, values):
+        """Adds a chunk of numbers to the moments"""
+        self.merge(Moments.of(values))
+
+    def merge(self, other):
+        """Adds the numbers summarised by another Moments to these moments, returns self"""
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.n, self.mean, self.m2, self.m3, self.m4 = other.n, other.mean, other.m2, other.m3, other.m4
+            return self
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        delta2 = delta * delta
+        m2 = self.m2 + other.m2 + delta2 * na * nb / n
+        m3 = (self.m3 + other.m3 + delta2 * delta * na * nb * (na - nb) / (n * n)
+              + 3 * delta * (na * other.m2 - nb * self.m2) / n)
+        m4 = (self.m4 + other.m4 + delta2 * delta2 * na * nb * (na * na - na * nb + nb * nb) / (n * n * n)
+              + 6 * delta2 * (na * na * other.m2 + nb * nb * self.m2) / (n * n)
+              + 4 * delta * (na * other.m3 - nb * self.m3) / n)
+        self.n = n
+        self.mean += delta * nb / n
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        return self
+
+    def variance(self):
+        """Returns the population variance of the numbers, None if there are none"""
+        if self.n == 0:
+            return None
+        return self.m2 / self.n
+
+    def stdev(self):
+        """Returns the population standard deviation of the numbers, None if there are none"""
+        if self.n == 0:
+            return None
+        return pow(self.m2 / self.n, 1/2)
+
+    def skewness(self):
+        """Returns the skewness of the numbers, None if they are all the same"""
+        if self.n == 0 or self.m2 <= 0:
+            return None
+        return (self.m3 / self.n) / pow(self.m2 / self.n, 3/2)
+
+    def kurtosis(self):
+        """Returns the kurtosis of the numbers, None if they are all the same"""
+        if self.n == 0 or self.m2 <= 0:
+            return None
+        return (self.m4 / self.n) / pow(self.m2 / self.n, 2)
+
+    def jarque_bera(self):
+        """Returns the Jarque-Bera statistic of the numbers, None if they are all the same"""
+        skewness = self.skewness()
+        if skewness is None:
+            return None
+        return (self.n / 6) * (pow(skewness, 2) + 0.25 * pow(self.kurtosis() - 3, 2))
+
+    def normaltest(self, confidence=None):
+        """Returns False if the numbers are not normally distributed at the given confidence by
+        the Jarque-Bera test, True otherwise, None if they are all the same. The statistic has
+        a chi-squared distribution with two degrees of freedom, so its p-value is exp(-JB/2).
+
+        Keyword arguments:
+            confidence -- Confidence required to reject normality, default normal_confidence.
+        """
+        if confidence is None:
+            confidence = normal_confidence
+        jb = self.jarque_bera()
+        if jb is None:
+            return None
+        return exp(-jb / 2) > 1 - confidence
+
+
+class KLL(object):
+    """Quantile sketch of Karnin, Lang and Liberty. Numbers are added to a compactor at level
+    0; when a level is full it is sorted and every other number, starting at random from the
+    first or second, moves up a level where each number stands for twice as many. Levels below
+    the top hold geometrically fewer numbers, so the sketch holds O(k) numbers however many are
+    added, and the rank of any number is known to within rank_error of the count with 99%
+    confidence. Sketches with the same k can be merged.
+
+    Methods:
+        add -- Adds a number.
+
+        update -- Adds a chunk of numbers.
+
+        merge -- Adds the numbers summarised by another KLL.
+
+        quantile -- Returns the number at a fraction of the way through the numbers in order.
+
+        rank_error -- Returns the bound on the error in the rank of a quantile as a fraction
+        of the count.
+
+    Variables:
+        k -- Size of the largest compactor.
+
+        n -- Count of the numbers added.
+
+        levels -- List of the compactors, each a list of numbers, a number at level h stands
+        for 2 ** h numbers added.
+    """
+
+    def __init__(self, k=None, seed=0):
+        """Keyword arguments:
+            k -- Size of the largest compactor, default quantile_k.
+
+            seed -- Seed of the random choices made when compacting, so a sketch of the same
+            numbers gives the same quantiles each run.
+        """
+        self.k = k if k else quantile_k
+        self.n = 0
+        self.levels = [[]]
+        self.random = random.Random(seed)
+        self.size = 0
+        self.max_size = self.capacity(0)
+
+    def capacity(self, level):
+        """Returns the number of numbers the compactor at the given level holds before it is
+        compacted"""
+        depth = len(self.levels) - level - 1
+        return max(int(ceil(self.k * pow(2/3, depth))), 2)
+
+    def grow(self):
+        """Adds a level to the top of the sketch"""
+        self.levels.append([])
+        self.max_size = sum(self.capacity(level) for level in range(len(self.levels)))
+
+    def compress(self):
+        """Compacts full levels until the sketch holds fewer numbers than its capacity"""
+        while self.size >= self.max_size:
+            for level in range(len(self.levels)):
+                if len(self.levels[level]) >= self.capacity(level):
+                    if level + 1 == len(self.levels):
+                        self.grow()
+                    items = sorted(self.levels[level])
+                    # An odd number out stays at this level
+                    odd = len(items) % 2
+                    self.levels[level] = items[:odd]
+                    self.levels[level + 1].extend(items[odd + self.random.randint(0, 1)::2])
+                    self.size = sum(len(compactor) for compactor in self.levels)
+                    if self.size < self.max_size:
+                        break
+
+    def add(self, x):
+        """Adds a number to the sketch"""
+        self.levels[0].append(x)
+        self.n += 1
+        self.size += 1
+        if self.size >= self.max_size:
+            self.compress()
+
+    def update(self, values):
+        """Adds a chunk of numbers to the sketch, compacting as often as adding them one at a
+        time would so memory stays bounded"""
+        start = 0
+        while start < len(values):
+            stop = start + max(self.max_size - self.size, 1)
+            chunk = values[start:stop]
+            self.levels[0].extend(chunk)
+            self.n += len(chunk)
+            self.size += len(chunk)
+            if self.size >= self.max_size:
+                self.compress()
+            start = stop
+
+    def merge(self, other):
+        """Adds the numbers summarised by another KLL to this sketch, returns self"""
+        while len(self.levels) < len(other.levels):
+            self.grow()
+        for level, compactor in enumerate(other.levels):
+            self.levels[level].extend(compactor)
+        self.n += other.n
+        self.size = sum(len(compactor) for compactor in self.levels)
+        self.compress()
+        return self
+
+    def quantile(self, q):
+        """Returns the number at the fraction q of the way through the numbers in order, None
+        if there are none.
+
+        Keyword arguments:
+            q -- Fraction between 0 and 1, 0.5 for the median.
+        """
+        if self.n == 0:
+            return None
+        weighted = sorted((x, 1 << level) for level, compactor in enumerate(self.levels)
+                          for x in compactor)
+        ranks = []
+        total = 0
+        for x, weight in weighted:
+            total += weight
+            ranks.append(total)
+        index = bisect_left(ranks, q * total)
+        return weighted[min(index, len(weighted) - 1)][0]
+
+    def rank_error(self):
+        """Returns the bound on the error in the rank of a quantile as a fraction of the count,
+        0 while no numbers have been compacted. The bound holds with 99% confidence and is the
+        empirical fit used by the Apache DataSketches implementation of KLL."""
+        if len(self.levels) == 1:
+            return 0.0
+        return 2.296 / pow(self.k, 0.9723)
+
+
+def sigma(x):
+    """Returns the sum used by the HyperLogLog estimator to correct for empty registers, x is
+    the fraction of registers which are empty and less than 1"""
+    y = 1
+    z = x
+    while True:
+        x = x * x
+        last = z
+        z += x * y
+        y += y
+        if z == last:
+            return z
+
+
+def tau(x):
+    """Returns the sum used by the HyperLogLog estimator to correct for full registers, x is
+    the fraction of registers which are not full"""
+    if x == 0 or x == 1:
+        return 0.0
+    y = 1.0
+    z = 1 - x
+    while True:
+        x = pow(x, 1/2)
+        last = z
+        y *= 0.5
+        z -= pow(1 - x, 2) * y
+        if z == last:
+            return z / 3
+
+
+class HyperLogLog(object):
+    """Estimates the number of distinct values added in a fixed amount of memory. The 64 bit
+    hash of each value chooses a register by its first precision bits, and the register keeps
+    the most leading zeros plus one seen in the rest of the hash. Uses the 64 bit hash of
+    HyperLogLog++, so no correction is needed for large counts, and in place of its empirical
+    bias tables the improved estimator of Ertl (2017), which is unbiased from small to large
+    counts using only the histogram of the registers. Sketches with the same precision can be
+    merged.
+
+    Methods:
+        add -- Adds a value.
+
+        add_hash -- Adds a value by its hash64.
+
+        update -- Adds each value in a sequence.
+
+        merge -- Adds the values counted by another HyperLogLog.
+
+        count -- Returns the estimated number of distinct values.
+
+    Variables:
+        precision -- Number of bits of the hash choosing the register.
+
+        registers -- Bytearray of the registers.
+    """
+
+    def __init__(self, precision=None):
+        self.precision = precision if precision else distinct_precision
+        self.registers = bytearray(1 << self.precision)
+
+    def add(self, value):
+        """Adds a value"""
+        self.add_hash(hash64(value))
+
+    def add_hash(self, hashed):
+        """Adds a value by its hash64"""
+        bits = 64 - self.precision
+        index = hashed >> bits
+        rank = bits - (hashed & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        """Adds each value in a sequence"""
+        for value in values:
+            self.add_hash(hash64(value))
+
+    def merge(self, other):
+        """Adds the values counted by another HyperLogLog of the same precision, returns self"""
+        if other.precision != self.precision:
+            raise ValueError("Can not merge HyperLogLogs of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Returns the estimated number of distinct values added"""
+        m = len(self.registers)
+        q = 64 - self.precision
+        histogram = [self.registers.count(rank) for rank in range(q + 2)]
+        if histogram[0] == m:
+            return 0
+        z = m * tau(1 - histogram[q + 1] / m)
+        for rank in range(q, 0, -1):
+            z = 0.5 * (z + histogram[rank])
+        z += m * sigma(histogram[0] / m)
+        return int(round(m * m / (2 * log(2) * z)))
+
+    def error(self):
+        """Returns the standard error of the count as a fraction of it"""
+        return 1.04 / pow(len(self.registers), 1/2)
+
+
+class DistinctCount(object):
+    """Counts distinct values exactly by keeping the set of their 64 bit hashes, then once more
+    than limit are kept switches to a HyperLogLog so memory stays bounded. An estimate is never
+    more than the number of values added. Can be merged with another DistinctCount, giving an
+    exact count while the union of both is under the limit.
+
+    Methods:
+        add -- Adds a value.
+
+        update -- Adds each value in a sequence.
+
+        merge -- Adds the values counted by another DistinctCount.
+
+        count -- Returns the number of distinct values, estimated if not exact.
+
+    Variables:
+        exact -- Whether the count is exact.
+
+        n -- Number of values added.
+
+        hashes -- Set of the hashes of the values while the count is exact.
+
+        sketch -- HyperLogLog of the values once the count is estimated, None until then.
+    """
+
+    def __init__(self, precision=None, limit=None):
+        """Keyword arguments:
+            precision -- Precision of the HyperLogLog used past the limit, default
+            distinct_precision.
+
+            limit -- Number of distinct values counted exactly, default distinct_limit.
+        """
+        self.precision = precision if precision else distinct_precision
+        self.limit = limit if limit else distinct_limit
+        self.n = 0
+        self.hashes = set()
+        self.sketch = None
+
+    @property
+    def exact(self):
+        return self.sketch is None
+
+    def spill(self):
+        """Moves the hashes kept into a HyperLogLog"""
+        self.sketch = HyperLogLog(self.precision)
+        for hashed in self.hashes:
+            self.sketch.add_hash(hashed)
+        self.hashes = set()
+
+    def add(self, value):
+        """Adds a value"""
+        self.n += 1
+        if self.sketch is not None:
+            self.sketch.add_hash(hash64(value))
+            return
+        self.hashes.add(hash64(value))
+        if len(self.hashes) > self.limit:
+            self.spill()
+
+    def update(self, values):
+        """Adds each value in a sequence"""
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """Adds the values counted by another DistinctCount, returns self"""
+        self.n += other.n
+        if self.sketch is None and other.sketch is None:
+            self.hashes |= other.hashes
+            if len(self.hashes) > self.limit:
+                self.spill()
+            return self
+        if self.sketch is None:
+            self.spill()
+        if other.sketch is None:
+            for hashed in other.hashes:
+                self.sketch.add_hash(hashed)
+        else:
+            self.sketch.merge(other.sketch)
+        return self
+
+    def count(self):
+        """Returns the number of distinct values added, estimated if not exact. An estimate
+        is at most the number of values added."""
+        if self.sketch is None:
+            return len(self.hashes)
+        return min(self.sketch.count(), self.n)
+
+
+class SpaceSaving(object):
+    """Space-Saving summary of Metwally, Agrawal and El Abbadi of the most common values of a
+    stream. Counts are kept for at most capacity values; a value not counted replaces the
+    value with the smallest count and takes over its count plus one, remembering that count as
+    its error. The count of each value kept is an overestimate by at most its error, which is
+    at most n / capacity, so any value appearing more often than that is kept. Also keeps a
+    DistinctCount of every value added. Summaries with the same capacity can be merged.
+
+    Methods:
+        add -- Adds a value.
+
+        update -- Adds each value in a sequence.
+
+        merge -- Adds the values summarised by another SpaceSaving.
+
+        most_common -- Returns the values with the largest counts and their counts.
+
+        guaranteed -- Returns the number of times a value kept certainly appeared.
+
+    Variables:
+        capacity -- Number of values counts are kept for.
+
+        n -- Number of values added.
+
+        counts -- Dictionary of the count of each value kept.
+
+        errors -- Dictionary of the most each count may be overestimated by.
+
+        distinct -- DistinctCount of the values added.
+    """
+
+    def __init__(self, capacity=None):
+        self.capacity = capacity if capacity else heavy_capacity
+        self.n = 0
+        self.counts = {}
+        self.errors = {}
+        self.distinct = DistinctCount()
+        # Heap of (count, order, value) from which the smallest count is found, entries
+        # whose count is no longer the count of their value are skipped
+        self.heap = []
+        self.order = 0
+
+    def push(self, value):
+        """Adds the current count of a value to the heap"""
+        heapq.heappush(self.heap, (self.counts[value], self.order, value))
+        self.order += 1
+        if len(self.heap) > 4 * self.capacity:
+            self.heap = [entry for entry in self.heap if self.counts.get(entry[2]) == entry[0]]
+            heapq.heapify(self.heap)
+
+    def pop_smallest(self):
+        """Removes the value with the smallest count, returns its count"""
+        while True:
+            count, order, value = heapq.heappop(self.heap)
+            if self.counts.get(value) == count:
+                del self.counts[value]
+                del self.errors[value]
+                return count
+
+    def add(self, value, count=1):
+        """Adds a value, count times"""
+        self.n += count
+        self.distinct.add(value)
+        if value in self.counts:
+            self.counts[value] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[value] = count
+            self.errors[value] = 0
+        else:
+            smallest = self.pop_smallest()
+            self.counts[value] = smallest + count
+            self.errors[value] = smallest
+        self.push(value)
+
+    def update(self, values):
+        """Adds each value in a sequence"""
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """Adds the values summarised by another SpaceSaving to this one, returns self. A value
+        kept by only one summary is counted in the other as that summary's smallest count if it
+        is full, as it may have been replaced there."""
+        own = min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+        theirs = min(other.counts.values()) if len(other.counts) >= other.capacity else 0
+        counts = {}
+        errors = {}
+        for value in set(self.counts) | set(other.counts):
+            counts[value] = self.counts.get(value, own) + other.counts.get(value, theirs)
+            errors[value] = self.errors.get(value, own) + other.errors.get(value, theirs)
+        kept = heapq.nlargest(self.capacity, counts.items(), key=lambda item: item[1])
+        self.counts = dict(kept)
+        self.errors = dict((value, errors[value]) for value, count in kept)
+        self.n += other.n
+        self.distinct.merge(other.distinct)
+        self.heap = []
+        for value in self.counts:
+            self.push(value)
+        return self
+
+    def most_common(self, n=None):
+        """Returns a list of up to n (value, count) of the values with the largest counts, most
+        common first. Counts may be overestimated, see guaranteed."""
+        if n is None:
+            n = len(self.counts)
+        return heapq.nlargest(n, self.counts.items(), key=lambda item: item[1])
+
+    def guaranteed(self, value):
+        """Returns the number of times a value kept certainly appeared, 0 if it is not kept"""
+        if value not in self.counts:
+            return 0
+        return self.counts[value] - self.errors[value]
+
+
+def reservoir(items, size, seed=0):
+    """Returns a uniform random sample of size items from an iterable of unknown length in a
+    single pass, using Li's Algorithm L which draws random numbers only for the items that
+    enter the sample and skips over the rest. The sample is a list of (index, item) in the
+    order the items were read, returned with the number of items read.
+
+    Keyword arguments:
+        items -- Iterable of the items to sample.
+
+        size -- Number of items kept.
+
+        seed -- Seed of the random numbers, the same seed keeps the same items of a file.
+    """
+    rng = random.Random(seed)
+    items = iter(items)
+    sample = list(enumerate(islice(items, size)))
+    seen = len(sample)
+    if seen < size or size <= 0:
+        return sample, seen
+    w = exp(log(1.0 - rng.random()) / size)
+    while True:
+        skip = int(floor(log(1.0 - rng.random()) / log(1.0 - w)))
+        skipped = sum(1 for item in islice(items, skip))
+        seen += skipped
+        if skipped < skip:
+            break
+        for item in items:
+            sample[rng.randrange(size)] = (seen, item)
+            seen += 1
+            break
+        else:
+            break
+        w *= exp(log(1.0 - rng.random()) / size)
+    sample.sort(key=lambda pair: pair[0])
+    return sample, seen
+
+
+def wilson_interval(count, total, z=None):
+    """Returns the lower and upper bounds of the Wilson score interval of the rate count /
+    total, which unlike the normal approximation stays within 0 and 1 for rare and common
+    events in a small sample.
+
+    Keyword arguments:
+        count -- Number of times the event was seen in the sample, at most total. Counts
+        outside 0 and total are clamped to them.
+
+        total -- Number of items in the sample.
+
+        z -- Number of standard errors either side of the rate, interval_z if not given.
+    """
+    if z is None:
+        z = interval_z
+    if total <= 0:
+        return 0.0, 1.0
+    count = min(max(count, 0), total)
+    rate = count / total
+    centre = rate + z * z / (2 * total)
+    spread = z * sqrt(rate * (1 - rate) / total + z * z / (4 * total * total))
+    scale = 1 + z * z / total
+    return max(0.0, (centre - spread) / scale), min(1.0, (centre + spread) / scale)
+
+
+class SPRT(object):
+    """Wald's sequential probability ratio test of whether the rate of an event is at least a
+    threshold, deciding after as few observations as the evidence allows. Tests a rate of
+    threshold + margin against threshold - margin, keeping the log likelihood ratio of the
+    observations and stopping once it crosses the bound set by the confidence. A rate well
+    clear of the threshold is decided after a few hundred observations or less.
+
+    Methods:
+        add -- Adds an observation of whether the event happened.
+
+    Variables:
+        decision -- True once the rate is accepted as at least the threshold, False once it is
+        rejected, None until decided.
+
+        n -- Number of observations added before the decision.
+
+        hits -- Number of those observations where the event happened.
+    """
+
+    def __init__(self, threshold, confidence=None, margin=None):
+        """Keyword arguments:
+            threshold -- Rate the event is tested against.
+
+            confidence -- Probability of the right decision outside the margin, default
+            test_confidence.
+
+            margin -- Distance either side of the threshold where either decision is allowed,
+            default test_margin.
+        """
+        confidence = confidence if confidence else test_confidence
+        margin = margin if margin else test_margin
+        low = min(max(threshold - margin, 1e-6), 1 - 2e-6)
+        high = max(min(threshold + margin, 1 - 1e-6), low + 1e-6)
+        self.hit = log(high / low)
+        self.miss = log((1 - high) / (1 - low))
+        self.bound = log(confidence / (1 - confidence))
+        self.ratio = 0.0
+        self.n = 0
+        self.hits = 0
+        self.decision = True if threshold <= 0 else None
+
+    def add(self, happened):
+        """Adds an observation of whether the event happened, returns the decision"""
+        if self.decision is None:
+            self.n += 1
+            if happened:
+                self.hits += 1
+                self.ratio += self.hit
+                if self.ratio >= self.bound:
+                    self.decision = True
+            else:
+                self.ratio += self.miss
+                if self.ratio <= -self.bound:
+                    self.decision = False
+        return self.decision
@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-15 -*-
+"""Sources of the rows of a file. Files compressed with gzip, bz2 or xz are decompressed as
+they are read, optionally in a separate thread, so they never have to be written out to disk.
+The rows of the sheets of Excel workbooks are read straight from the workbook, with openpyxl
+in read only mode for .xlsx files if it is installed and otherwise with xlrd loading only the
+sheet read. Rows from any iterable, such as a database cursor, are read through a RowSource.
+
+Global Variables:
+    compressions -- Extensions of compressed files with the compression each is read with.
+
+    magic_numbers -- The bytes each compressed file starts with, with its compression. The
+    start of a file is checked before its extension.
+
+    read_ahead_size -- Number of bytes decompressed at a time by a ThreadedReader. Default 1MB.
+
+    read_ahead_blocks -- Most blocks of lines a ThreadedReader holds ahead of the parser.
+    Default 4.
+
+    excel_extensions -- Extensions of the Excel workbooks read.
+
+    fetch_size -- Number of rows fetched from a database cursor at a time, if its arraysize
+    is smaller. Default 1000.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+from queue import Queue
+from datetime import datetime, date, time
+from threading import Thread
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+try:
+    import xlrd
+except ImportError:
+    xlrd = None
+
+
+compressions = {'.gz': 'gzip', '.gzip': 'gzip', '.bz2': 'bz2', '.xz': 'xz', '.lzma': 'xz'}
+magic_numbers = ((b'\x1f\x8b', 'gzip'), (b'BZh', 'bz2'), (b'\xfd7zXZ\x00', 'xz'))
+read_ahead_size = 1024 * 1024
+read_ahead_blocks = 4
+openers = {'gzip': gzip.open, 'bz2': bz2.open, 'xz': lzma.open}
+excel_extensions = ('.xls', '.xlsx', '.xlsm')
+fetch_size = 1000
+
+
+def compression(filename):
+    """Returns the compression of a file, 'gzip', 'bz2' or 'xz', from the bytes it starts
+    with or otherwise its extension, or None if it is not compressed.
+
+    Keyword arguments:
+        filename -- The filename of the file.
+    """
+    try:
+        with open(filename, 'rb') as fp:
+            start = fp.read(6)
+    except OSError:
+        start = b''
+    for magic, kind in magic_numbers:
+        if start.startswith(magic):
+            return kind
+    return compressions.get(os.path.splitext(filename)[1].lower())
+
+
+def base_name(filename):
+    """Returns the filename without the extension of its compression, i.e. data.csv for
+    data.csv.gz, which the files written for it are named after.
+
+    Keyword arguments:
+        filename -- The filename of the file.
+    """
+    name, ext = os.path.splitext(filename)
+    if ext.lower() in compressions:
+        return name
+    return filename
+
+
+def output_name(filename, sheet=None):
+    """Returns the name the files written for a file or a sheet of a workbook are named after,
+    without an extension, i.e. data for data.csv.gz and book_Sheet1 for Sheet1 of book.xlsx.
+
+    Keyword arguments:
+        filename -- The filename of the file.
+
+        sheet -- The name of the sheet of a workbook, None for a file or a workbook of a
+        single sheet.
+    """
+    name = os.path.splitext(base_name(filename))[0]
+    if sheet is not None:
+        name += "_" + sheet
+    return name
+
+
+def open_text(filename, threaded=False):
+    """Opens a file for reading as text, decompressing it as it is read if it is compressed.
+
+    Keyword arguments:
+        filename -- The filename of the file.
+
+        threaded -- If True a compressed file is decompressed in a separate thread while the
+        lines already read are parsed. Default False.
+    """
+    kind = compression(filename)
+    if kind is None:
+        return open(filename, newline='', encoding='ISO-8859-1')
+    if threaded:
+        return ThreadedReader(openers[kind](filename, 'rb'))
+    return openers[kind](filename, 'rt', newline='', encoding='ISO-8859-1')
+
+
+class ThreadedReader(object):
+    """Iterates over the lines of a binary file decompressed in blocks by a separate thread.
+    The decompressors release the GIL, so decompressing the next blocks overlaps with parsing
+    the lines of the last one. Lines end at \\n, \\r or \\r\\n as they do for files opened
+    with newline=''.
+
+    Methods:
+        close -- Stops the thread and closes the file.
+
+    Variables:
+        fp -- The decompressed file read, opened in binary mode.
+
+        blocks -- Queue of the blocks read, an empty block at the end of the file or the
+        exception reading stopped at.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.blocks = Queue(maxsize=read_ahead_blocks)
+        self.stopped = False
+        self.thread = Thread(target=self.read_ahead, daemon=True)
+        self.thread.start()
+
+    def read_ahead(self):
+        try:
+            while not self.stopped:
+                block = self.fp.read(read_ahead_size)
+                self.blocks.put(block)
+                if not block:
+                    break
+        except Exception as e:
+            self.blocks.put(e)
+
+    def __iter__(self):
+        rest = ''
+        while True:
+            block = self.blocks.get()
+            if isinstance(block, Exception):
+                raise block
+            if not block:
+                self.blocks.put(block)
+                if rest:
+                    yield rest
+                return
+            lines = io.StringIO(rest + block.decode('ISO-8859-1'), newline='').readlines()
+            # The last line may carry on in the next block, as may a \r\n split between them
+            rest = lines.pop()
+            for line in lines:
+                yield line
+
+    def close(self):
+        self.stopped = True
+        while self.thread.is_alive():
+            # Make room for a block the thread is waiting to put
+            while not self.blocks.empty():
+                self.blocks.get()
+            self.thread.join(0.1)
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def is_excel(filename):
+    """Returns True if the file is an Excel workbook, from its extension.
+
+    Keyword arguments:
+        filename -- The filename of the file.
+    """
+    return os.path.splitext(filename)[1].lower() in excel_extensions
+
+
+def use_openpyxl(filename):
+    return openpyxl is not None and os.path.splitext(filename)[1].lower() != '.xls'
+
+
+def sheet_names(filename):
+    """Returns the names of the sheets of an Excel workbook, without reading the sheets.
+
+    Keyword arguments:
+        filename -- The filename of the workbook.
+    """
+    if use_openpyxl(filename):
+        wb = openpyxl.load_workbook(filename, read_only=True)
+        names = wb.sheetnames
+        wb.close()
+        return names
+    wb = xlrd.open_workbook(filename, on_demand=True)
+    names = wb.sheet_names()
+    wb.release_resources()
+    return names
+
+
+def value_text(value):
+    """Returns the text of a value read from a row source. None is written as an empty
+    string, booleans as TRUE or FALSE and dates and times in ISO format.
+
+    Keyword arguments:
+        value -- The value.
+    """
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return ''
+    if value is True or value is False:
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode('ISO-8859-1')
+    return str(value)
+
+
+def cell_text(value):
+    """Returns the text of the value of a cell of a sheet as value_text() does, except that
+    numbers Excel stores as floats are written as integers if they are whole.
+
+    Keyword arguments:
+        value -- The value of the cell.
+    """
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return value_text(value)
+
+
+def sheet_rows(filename, sheet=None):
+    """Generator yielding the rows of a sheet of an Excel workbook as lists of the text of
+    their cells. Only the sheet read is loaded, and .xlsx files are streamed a row at a time
+    by openpyxl if it is installed.
+
+    Keyword arguments:
+        filename -- The filename of the workbook.
+
+        sheet -- The name of the sheet, None for the first sheet.
+    """
+    if use_openpyxl(filename):
+        wb = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+        try:
+            ws = wb[sheet] if sheet is not None else wb.worksheets[0]
+            for row in ws.iter_rows():
+                yield [cell_text(cell.value) for cell in row]
+        finally:
+            wb.close()
+        return
+    wb = xlrd.open_workbook(filename, on_demand=True)
+    try:
+        sh = wb.sheet_by_name(sheet) if sheet is not None else wb.sheet_by_index(0)
+        for rownum in range(sh.nrows):
+            row = []
+            for kind, value in zip(sh.row_types(rownum), sh.row_values(rownum)):
+                if kind == xlrd.XL_CELL_DATE:
+                    value = xlrd.xldate_as_datetime(value, wb.datemode)
+                elif kind == xlrd.XL_CELL_BOOLEAN:
+                    value = bool(value)
+                elif kind == xlrd.XL_CELL_ERROR:
+                    value = xlrd.error_text_from_code.get(value, '')
+                row.append(cell_text(value))
+            yield row
+    finally:
+        wb.release_resources()
+
+
+def cursor_header(cursor):
+    """Returns the names of the columns of the result of a query from a DB-API cursor.
+
+    Keyword arguments:
+        cursor -- A DB-API cursor, such as a sqlite3.Cursor, a query has been executed on.
+    """
+    return [column[0] for column in cursor.description]
+
+
+def cursor_rows(cursor, size=None):
+    """Generator yielding the rows of the result of a query from a DB-API cursor, fetching
+    them in batches with fetchmany().
+
+    Keyword arguments:
+        cursor -- A DB-API cursor, such as a sqlite3.Cursor, a query has been executed on.
+
+        size -- Number of rows fetched at a time, by default the cursor's arraysize or
+        fetch_size if that is larger. sqlite3 cursors have an arraysize of 1.
+    """
+    if size is None:
+        size = max(getattr(cursor, 'arraysize', 1) or 1, fetch_size)
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        for row in rows:
+            yield row
+
+
+class RowSource(object):
+    """The rows of data from an iterable in place of a file, the header row followed by the
+    rows of values. Values are converted to text by value_text(). The iterable is read once,
+    keeping the first rows so the rows can be read again from the start as long as no more
+    than those were read before, as Data does to read the rows before the data. Reading
+    further raises ValueError.
+
+    Methods:
+        rows -- Generator yielding the rows from the start.
+
+    Variables:
+        head -- The first rows read, up to keep rows.
+
+        keep -- The number of rows kept to be read again, None to keep every row. Default 100.
+    """
+
+    def __init__(self, header, rows, keep=100):
+        self.head = [[value_text(value) for value in header]]
+        self.iterator = iter(rows)
+        self.keep = keep
+        self.passed = False
+
+    def rows(self):
+        for row in self.head:
+            yield row
+        if self.passed:
+            raise ValueError("The rows of an iterable can only be read again up to row %d"
+                             % len(self.head))
+        for values in self.iterator:
+            row = [value_text(value) for value in values]
+            if self.keep is None or len(self.head) < self.keep:
+                self.head.append(row)
+            else:
+                self.passed = True
+            yield row
@@ -0,0 +1,1018 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-15 -*-
+"""Disk backed storage for the values of a column, typed storage of numeric columns, typed
+and dictionary encoded in memory storage of the values of a column once its type is known,
+compact storage of the errors found in the cells of the data and of the rows of the file left
+out of the columns.
+
+Values are written to a binary file as records of a 4 byte length followed by the utf-8
+encoded value, so values may contain any character including commas and new lines. The
+offset of each record is kept in memory allowing any value to be read with a single seek.
+Edited values are appended to the end of the file and the offset of the value moved to the
+new record, the old record is left in place until the file is compacted.
+
+Global Variables:
+    buffer_size -- Number of bytes of values held in memory before being written to the
+    file, also the size of the blocks read when iterating over values. Default 1MB.
+
+    block_cache -- Number of blocks of the file held in memory when iterating over values.
+
+    EMPTY, INT, FLOAT, BAD -- Kinds of value held in a NumericVector, an empty value, an
+    integer, a decimal number and a value that is not a number.
+
+    code_types -- Typecodes of the arrays a DictionaryColumn may hold its codes in, with the
+    number of distinct values each can code.
+
+    empty_reason -- Reason given for an error in an empty cell, which is formatted without
+    its value.
+
+    error_fields -- Names of the fields of each error written by an error sink.
+
+    column_error_limit -- Number of errors of each column an ErrorStore keeps in memory when
+    it writes every error to a sink. Default 1000.
+"""
+import csv
+import json
+import os
+import struct
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from collections.abc import Sequence
+
+
+buffer_size = 1024 * 1024
+block_cache = 4
+EMPTY, INT, FLOAT, BAD = range(4)
+largest_exact = 2 ** 53
+code_types = (('B', 256), ('H', 65536), ('I', 2 ** 32))
+record_length = struct.Struct('<I')
+empty_reason = 'empty cell'
+error_fields = ('row', 'column', 'value', 'reason')
+column_error_limit = 1000
+
+
+def encode(value):
+    """Returns the bytes stored for a value. Values that are not strings are stored as
+    their string representation.
+
+    Keyword arguments:
+        value -- The value to be stored.
+    """
+    if not isinstance(value, str):
+        value = str(value)
+    return value.encode('utf-8', 'surrogatepass')
+
+
+def decode(data):
+    """Returns the value stored in the given bytes"""
+    return data.decode('utf-8', 'surrogatepass')
+
+
+class ColumnStore(Sequence):
+    """Sequence of values stored in a binary file with an in memory index of the offset of
+    each value. Supports indexing, slicing, iteration and len as a list would.
+
+    Methods:
+        append -- Adds a value to the end of the store.
+
+        extend -- Adds each value in a sequence to the end of the store.
+
+        replace -- Replaces all values in the store with the values given.
+
+        flush -- Writes any buffered values to the file.
+
+        compact -- Rewrites the file without the records replaced by edits.
+
+        close -- Writes any buffered values and closes the file.
+
+        remove -- Closes and deletes the file.
+
+    Variables:
+        filename -- Name of the file the values are stored in.
+
+        offsets -- Array of the offset in the file of the record of each value.
+
+        size -- Size of the file including values still held in the buffer.
+
+        edits -- Number of records in the file which have been replaced by an edit.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, 'w+b')
+        self.offsets = array('Q')
+        self.size = 0
+        self.edits = 0
+        self.pending = bytearray()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.read(self.offsets[i]) for i in range(*index.indices(len(self.offsets)))]
+        return self.read(self.offsets[index])
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            indexes = range(*index.indices(len(self.offsets)))
+            values = list(value)
+            if len(indexes) != len(values):
+                raise ValueError("Can not change the number of values in a column store by slice")
+            for i, new_value in zip(indexes, values):
+                self[i] = new_value
+            return
+        self.offsets[index] = self.write(encode(value))
+        self.edits += 1
+
+    def __iter__(self):
+        """Reads values in the order of the index, keeping the blocks of the file last read
+        so values are read without seeking when few have been edited.
+        """
+        blocks = OrderedDict()
+        for i in range(len(self.offsets)):
+            yield self.read(self.offsets[i], blocks)
+
+    def read_block(self, number, blocks, end):
+        """Returns the block of the file with the given number, reading it into blocks if it
+        is not already held or ends before the given position in the block.
+        """
+        block = blocks.get(number)
+        if block is None or (len(block) < end and len(block) < buffer_size):
+            self.file.seek(number * buffer_size)
+            block = self.file.read(buffer_size)
+            blocks[number] = block
+            if len(blocks) > block_cache:
+                blocks.popitem(last=False)
+        return block
+
+    def read(self, offset, blocks=None):
+        """Returns the value of the record at the given offset.
+
+        Keyword arguments:
+            offset -- Offset of the record in the file.
+            blocks -- Dictionary of blocks of the file already read, if reading many values.
+        """
+        start = self.size - len(self.pending)
+        if offset >= start:
+            # Record has not been written to the file yet
+            pos = offset - start
+            length = record_length.unpack_from(self.pending, pos)[0]
+            pos += record_length.size
+            return decode(bytes(self.pending[pos:pos + length]))
+        if blocks is not None:
+            number, pos = divmod(offset, buffer_size)
+            block = self.read_block(number, blocks, pos + record_length.size)
+            if pos + record_length.size <= len(block):
+                length = record_length.unpack_from(block, pos)[0]
+                pos += record_length.size
+                block = self.read_block(number, blocks, pos + length)
+                if pos + length <= len(block):
+                    return decode(block[pos:pos + length])
+        # Record runs over the end of a block
+        self.file.seek(offset)
+        length = record_length.unpack(self.file.read(record_length.size))[0]
+        return decode(self.file.read(length))
+
+    def write(self, data):
+        """Adds a record containing data to the end of the file, returns its offset"""
+        offset = self.size
+        self.pending += record_length.pack(len(data))
+        self.pending += data
+        self.size += record_length.size + len(data)
+        if len(self.pending) >= buffer_size:
+            self.flush()
+        return offset
+
+    def append(self, value):
+        """Adds a value to the end of the store"""
+        self.offsets.append(self.write(encode(value)))
+
+    def extend(self, values):
+        """Adds each value in a sequence to the end of the store"""
+        for value in values:
+            self.offsets.append(self.write(encode(value)))
+
+    def replace(self, values):
+        """Replaces all values in the store with the values given"""
+        values = list(values)
+        self.pending = bytearray()
+        self.file.seek(0)
+        self.file.truncate()
+        self.offsets = array('Q')
+        self.size = 0
+        self.edits = 0
+        self.extend(values)
+
+    def flush(self):
+        """Writes any buffered values to the end of the file"""
+        if self.pending:
+            self.file.seek(self.size - len(self.pending))
+            self.file.write(self.pending)
+            self.pending = bytearray()
+
+    def compact(self):
+        """Rewrites the file holding only the current value of each record"""
+        if not self.edits:
+            return
+        filename = self.filename + '.compact'
+        offsets = array('Q')
+        size = 0
+        with open(filename, 'wb') as fp:
+            for value in self:
+                data = encode(value)
+                offsets.append(size)
+                fp.write(record_length.pack(len(data)))
+                fp.write(data)
+                size += record_length.size + len(data)
+        self.file.close()
+        os.replace(filename, self.filename)
+        self.file = open(self.filename, 'r+b')
+        self.pending = bytearray()
+        self.offsets = offsets
+        self.size = size
+        self.edits = 0
+
+    def close(self):
+        """Writes any buffered values and closes the file"""
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def remove(self):
+        """Closes and deletes the file"""
+        if not self.file.closed:
+            self.file.close()
+        self.pending = bytearray()
+        self.offsets = array('Q')
+        self.size = 0
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+
+class NumericVector(object):
+    """The values of a numeric column parsed once into an array of floats, with the kind of
+    each value kept in a mask so integers keep their type and empty values and values which
+    are not numbers are known. Integers too large to be held exactly as a float are kept
+    separately.
+
+    Methods:
+        count -- Returns the number of values of a kind.
+
+        positions -- Returns the positions of the values of a kind.
+
+        value -- Returns the number at a position, None if it is empty or not a number.
+
+        numbers -- Returns a list of the numbers in the vector in order, without the empty
+        values and values which are not numbers.
+
+        chunks -- Yields the positions and numbers of the vector a chunk at a time.
+
+        set_empty -- Marks the value at a position as empty.
+
+    Variables:
+        kinds -- Bytearray of the kind of each value, one of EMPTY, INT, FLOAT or BAD.
+
+        floats -- Array of each value as a float, 0 where the value is not a number.
+
+        exact -- Dictionary of integers too large to be held exactly as a float by position.
+
+        parsed -- Dictionary of the kind and number of each distinct value.
+    """
+
+    def __init__(self, values, parse, counts=None):
+        """Parses each distinct value once using parse, which returns None for an empty
+        value, the number otherwise and raises ValueError if the value is not a number.
+
+        Keyword arguments:
+            values -- Sequence of string values.
+
+            parse -- Function converting a string value to a number.
+
+            counts -- Counter of the values if already counted, only its keys are used.
+        """
+        self.parsed = {}
+        for value in (counts if counts is not None else set(values)):
+            try:
+                number = parse(value)
+            except ValueError:
+                self.parsed[value] = (BAD, 0.0, None)
+                continue
+            if number is None:
+                self.parsed[value] = (EMPTY, 0.0, None)
+            elif isinstance(number, int):
+                self.parsed[value] = (INT, float(number), number if abs(number) > largest_exact else None)
+            else:
+                self.parsed[value] = (FLOAT, number, None)
+        self.kinds = bytearray(len(values))
+        self.floats = array('d', bytes(8 * len(values)))
+        self.exact = {}
+        parsed = self.parsed
+        for i, value in enumerate(values):
+            kind, number, exact = parsed[value]
+            self.kinds[i] = kind
+            self.floats[i] = number
+            if exact is not None:
+                self.exact[i] = exact
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def count(self, kind):
+        """Returns the number of values of the given kind"""
+        return self.kinds.count(kind)
+
+    def positions(self, kind):
+        """Returns a list of the positions of values of the given kind"""
+        if kind not in self.kinds:
+            return []
+        return [i for i, value_kind in enumerate(self.kinds) if value_kind == kind]
+
+    def value(self, position):
+        """Returns the number at the position, None if the value is empty or not a number"""
+        kind = self.kinds[position]
+        if kind == INT:
+            if position in self.exact:
+                return self.exact[position]
+            return int(self.floats[position])
+        if kind == FLOAT:
+            return self.floats[position]
+        return None
+
+    def numbers(self):
+        """Returns a list of the numbers in the vector in order, integers as int and decimal
+        numbers as float, leaving out empty values and values which are not numbers.
+        """
+        if INT not in self.kinds:
+            if EMPTY not in self.kinds and BAD not in self.kinds:
+                return self.floats.tolist()
+            return [number for number, kind in zip(self.floats, self.kinds) if kind == FLOAT]
+        numbers = []
+        for i, kind in enumerate(self.kinds):
+            if kind == INT:
+                numbers.append(self.exact[i] if i in self.exact else int(self.floats[i]))
+            elif kind == FLOAT:
+                numbers.append(self.floats[i])
+        return numbers
+
+    def chunks(self, size):
+        """Yields the positions and numbers of the vector a chunk of size values at a time, as
+        two lists, leaving out empty values and values which are not numbers.
+        """
+        for start in range(0, len(self.kinds), size):
+            positions = []
+            numbers = []
+            for i in range(start, min(start + size, len(self.kinds))):
+                number = self.value(i)
+                if number is not None:
+                    positions.append(i)
+                    numbers.append(number)
+            yield positions, numbers
+
+    def set_empty(self, position):
+        """Marks the value at the position as empty, as when an error value is removed"""
+        self.kinds[position] = EMPTY
+        self.floats[position] = 0.0
+        self.exact.pop(position, None)
+
+
+class DictionaryColumn(Sequence):
+    """Values of a column with few distinct values, held as a code per value into a list of the
+    distinct values. Codes take as few bits as the number of distinct values allows, a single
+    bit per value while there are no more than two, such as in a boolean column, then a byte
+    and more as distinct values are added. Supports indexing, assignment, slicing, iteration,
+    len and append as a list would, giving back the original strings.
+
+    Methods:
+        append -- Adds a value to the end of the column.
+
+        extend -- Adds each value in a sequence to the end of the column.
+
+    Variables:
+        names -- List of the distinct values, indexed by code.
+
+        index -- Dictionary of the code of each distinct value.
+
+        bits -- Bytearray of the code of each value as a single bit, None once there are more
+        than two distinct values.
+
+        codes -- Array of the code of each value once there are more than two distinct
+        values, None until then.
+    """
+
+    def __init__(self, values=()):
+        self.names = []
+        self.index = {}
+        self.bits = bytearray()
+        self.codes = None
+        self.length = 0
+        self.extend(values)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('column index out of range')
+        if self.codes is not None:
+            return self.names[self.codes[index]]
+        return self.names[(self.bits[index >> 3] >> (index & 7)) & 1]
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            indexes = range(*index.indices(self.length))
+            values = list(value)
+            if len(indexes) != len(values):
+                raise ValueError("Can not change the number of values in a column by slice")
+            for i, new_value in zip(indexes, values):
+                self[i] = new_value
+            return
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('column assignment index out of range')
+        code = self.code(value)
+        if self.codes is not None:
+            self.codes[index] = code
+        elif code:
+            self.bits[index >> 3] |= 1 << (index & 7)
+        else:
+            self.bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def __iter__(self):
+        names = self.names
+        if self.codes is not None:
+            for code in self.codes:
+                yield names[code]
+        else:
+            bits = self.bits
+            for i in range(self.length):
+                yield names[(bits[i >> 3] >> (i & 7)) & 1]
+
+    def code(self, value):
+        """Returns the code of a value, adding it to the distinct values if it is new and
+        widening the codes if they can not hold it."""
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.names)
+            self.names.append(value)
+            if self.codes is None and code > 1:
+                bits = self.bits
+                self.codes = array(code_types[0][0], ((bits[i >> 3] >> (i & 7)) & 1 for i in range(self.length)))
+                self.bits = None
+            elif self.codes is not None:
+                for typecode, size in code_types:
+                    if code < size:
+                        if typecode != self.codes.typecode:
+                            self.codes = array(typecode, self.codes)
+                        break
+        return code
+
+    def append(self, value):
+        """Adds a value to the end of the column"""
+        code = self.code(value)
+        if self.codes is not None:
+            self.codes.append(code)
+        else:
+            if self.length & 7 == 0:
+                self.bits.append(0)
+            if code:
+                self.bits[self.length >> 3] |= 1 << (self.length & 7)
+        self.length += 1
+
+    def extend(self, values):
+        """Adds each value in a sequence to the end of the column"""
+        for value in values:
+            self.append(value)
+
+
+class NumericColumn(Sequence):
+    """Values of a numeric column held as an array of numbers with a bitmap of which values
+    are numbers. Integers are held as 64 bit integers and decimal numbers as floats with their
+    number of decimal places. A value is only held as a number if the number gives back the
+    same string, any other value which is not empty is kept as a string, so the original
+    strings are always given back. Supports indexing, assignment, slicing, iteration, len and
+    append as a list would.
+
+    Methods:
+        append -- Adds a value to the end of the column.
+
+        extend -- Adds each value in a sequence to the end of the column.
+
+        encode -- Returns the number and decimal places a value is held as.
+
+    Variables:
+        integer -- Whether values are held as integers rather than decimal numbers.
+
+        numbers -- Array of the number of each value, 0 where the value is not held as a
+        number.
+
+        places -- Bytearray of the decimal places of each decimal number, None for integers.
+
+        valid -- Bytearray of a bit for each value, set if the value is held as a number.
+
+        exceptions -- Dictionary of the values which are not empty and not held as a number
+        by position.
+    """
+
+    def __init__(self, values=(), integer=True):
+        self.integer = integer
+        self.numbers = array('q' if integer else 'd')
+        self.places = None if integer else bytearray()
+        self.valid = bytearray()
+        self.exceptions = {}
+        self.length = 0
+        self.extend(values)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.length))]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('column index out of range')
+        return self.value(index)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            indexes = range(*index.indices(self.length))
+            values = list(value)
+            if len(indexes) != len(values):
+                raise ValueError("Can not change the number of values in a column by slice")
+            for i, new_value in zip(indexes, values):
+                self[i] = new_value
+            return
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('column assignment index out of range')
+        self.exceptions.pop(index, None)
+        encoded = self.encode(value)
+        if encoded is None:
+            self.numbers[index] = 0
+            self.valid[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+            if value != '':
+                self.exceptions[index] = value
+        else:
+            self.numbers[index] = encoded[0]
+            self.valid[index >> 3] |= 1 << (index & 7)
+        if self.places is not None:
+            self.places[index] = encoded[1] if encoded is not None else 0
+
+    def __iter__(self):
+        for i in range(self.length):
+            yield self.value(i)
+
+    def value(self, index):
+        """Returns the string of the value at a position"""
+        if (self.valid[index >> 3] >> (index & 7)) & 1:
+            if self.places is None:
+                return str(self.numbers[index])
+            return '%.*f' % (self.places[index], self.numbers[index])
+        return self.exceptions.get(index, '')
+
+    def encode(self, value):
+        """Returns a tuple of the number and decimal places a value is held as, None if the
+        value is not a number or the number does not give back the same string."""
+        if not value:
+            return None
+        try:
+            if self.integer:
+                number = int(value)
+                if -2 ** 63 <= number < 2 ** 63 and str(number) == value:
+                    return number, 0
+            else:
+                number = float(value)
+                dot = value.find('.')
+                places = len(value) - dot - 1 if dot >= 0 else 0
+                if places < 256 and '%.*f' % (places, number) == value:
+                    return number, places
+        except (ValueError, OverflowError):
+            pass
+        return None
+
+    def append(self, value):
+        """Adds a value to the end of the column"""
+        if self.length & 7 == 0:
+            self.valid.append(0)
+        encoded = self.encode(value)
+        if encoded is None:
+            self.numbers.append(0)
+            if value != '':
+                self.exceptions[self.length] = value
+        else:
+            self.numbers.append(encoded[0])
+            self.valid[self.length >> 3] |= 1 << (self.length & 7)
+        if self.places is not None:
+            self.places.append(encoded[1] if encoded is not None else 0)
+        self.length += 1
+
+    def extend(self, values):
+        """Adds each value in a sequence to the end of the column"""
+        for value in values:
+            self.append(value)
+
+
+class RowMap(Sequence):
+    """Number of rows of the file left out of the columns, such as invalid rows, before each
+    value of a column, which maps the position of a value to the row of the file it came from.
+    The number changes only after a row left out, so only the positions where it changes are
+    kept, each with the number from there on, and a position is looked up by binary search. A
+    file with no invalid rows needs nothing kept at all. Supports indexing,
+    iteration and len as a list of the number for each position would.
+
+    Editing the numbers with shift keeps the change in a Fenwick tree over the positions kept,
+    so removing an invalid row does not rewrite the number of every value after it.
+
+    Methods:
+        append -- Adds the number for the next position.
+
+        extend -- Adds the number for each of the next positions.
+
+        extend_map -- Adds the positions of another RowMap with a number added to each.
+
+        shift -- Adds to the number of every position from a position on.
+
+        clear -- Removes all positions.
+
+    Variables:
+        starts -- Array of the positions where the number changes.
+
+        offsets -- Array of the number from each position in starts on, before any shift.
+
+        tree -- Fenwick tree of the changes made by shift to the numbers of each position in
+        starts, None until shift is used.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(self.length))]
+        if position < 0:
+            position += self.length
+        if not 0 <= position < self.length:
+            raise IndexError('row map index out of range')
+        run = bisect_right(self.starts, position) - 1
+        if run < 0:
+            return 0
+        if self.tree is None:
+            return self.offsets[run]
+        return self.offsets[run] + self.change(run)
+
+    def __iter__(self):
+        self.fold()
+        run = 0
+        offset = 0
+        for position in range(self.length):
+            while run < len(self.starts) and self.starts[run] == position:
+                offset = self.offsets[run]
+                run += 1
+            yield offset
+
+    def append(self, offset):
+        """Adds the number for the next position"""
+        if offset != self.last:
+            self.fold()
+            self.starts.append(self.length)
+            self.offsets.append(offset)
+            self.last = offset
+        self.length += 1
+
+    def extend(self, offsets):
+        """Adds the number for each of the next positions"""
+        for offset in offsets:
+            self.append(offset)
+
+    def extend_map(self, other, added=0):
+        """Adds the positions of another RowMap after those of this one, adding a number to
+        each of their numbers.
+
+        Keyword arguments:
+            other -- RowMap of the positions to add.
+
+            added -- Number added to the number of each position of other.
+        """
+        self.fold()
+        other.fold()
+        if other.length and added != self.last and (not other.starts or other.starts[0] != 0):
+            self.starts.append(self.length)
+            self.offsets.append(added)
+            self.last = added
+        for start, offset in zip(other.starts, other.offsets):
+            if offset + added != self.last:
+                self.starts.append(self.length + start)
+                self.offsets.append(offset + added)
+                self.last = offset + added
+        self.length += other.length
+
+    def shift(self, position, amount):
+        """Adds amount to the number of every position from position on.
+
+        Keyword arguments:
+            position -- First position changed.
+
+            amount -- Number added, negative when a row before position is removed.
+        """
+        if not 0 <= position < self.length:
+            return
+        run = bisect_right(self.starts, position) - 1
+        if run < 0 or self.starts[run] != position:
+            # The number does not change at position, so a change is kept from there
+            offset = self[position]
+            self.fold()
+            run += 1
+            self.starts.insert(run, position)
+            self.offsets.insert(run, offset)
+        if self.tree is None:
+            self.tree = array('q', bytes(8 * (len(self.starts) + 1)))
+        i = run + 1
+        while i < len(self.tree):
+            self.tree[i] += amount
+            i += i & -i
+        self.last += amount
+
+    def change(self, run):
+        """Returns the sum of the shifts made to the number of the position starts[run]"""
+        total = 0
+        i = run + 1
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def fold(self):
+        """Adds the shifts kept in the tree to offsets and drops the tree"""
+        if self.tree is not None:
+            changes = [self.change(run) for run in range(len(self.starts))]
+            for run, change in enumerate(changes):
+                self.offsets[run] += change
+            self.tree = None
+
+    def clear(self):
+        """Removes all positions"""
+        self.length = 0
+        self.last = 0
+        self.starts = array('Q')
+        self.offsets = array('q')
+        self.tree = None
+
+
+class ErrorStore(Sequence):
+    """Errors found in the cells of the data held as arrays of numbers rather than a tuple and
+    a string per error. The reason and value of each error are kept as codes into tables of
+    the distinct reasons and values, as the errors of a column share few of either. Indexing
+    gives an error as the tuple (row, column, value, reason, position) it was added as, and
+    the text of an error is only made when asked for.
+
+    Given a sink every error is written to it as it is added, and only the first
+    column_limit errors of each column are kept, so memory use does not grow with the number
+    of errors. len() is the number of errors kept, total the number added.
+
+    Methods:
+        append -- Adds an error given as a (row, column, value, reason, position) tuple.
+
+        add -- Adds an error.
+
+        clear -- Removes all errors.
+
+        format -- Returns the text of an error.
+
+        column_counts -- Returns the number of errors in each column.
+
+        cell_counts -- Returns the number of cells with an error in each column.
+
+    Variables:
+        sink -- Error sink every error is written to, None if errors are only kept.
+
+        column_limit -- Number of errors of each column kept, None to keep every error.
+
+        total -- Number of errors added, including those not kept.
+
+        column_cells -- Number of distinct cells with an error in each column, including those
+        not kept. A cell may have more than one error, i.e. not an integer and out of range.
+
+        rows -- Array of the row of each error, numbered from 0 including the rows before the
+        data and invalid rows.
+
+        columns -- Array of the column number of each error.
+
+        positions -- Array of the position of each error in the values of its column.
+
+        reasons -- Array of the code of the reason of each error.
+
+        values -- Array of the code of the value of each error.
+
+        reason_names -- List of the distinct reasons, indexed by code.
+
+        value_names -- List of the distinct values, indexed by code.
+
+        formatted -- FormattedErrors giving the text of each error.
+    """
+
+    def __init__(self, sink=None, column_limit=None):
+        """Keyword arguments:
+            sink -- Error sink, such as a CSVErrorSink, written each error as it is added.
+
+            column_limit -- Number of errors of each column kept, column_error_limit if a sink
+            is given, otherwise every error is kept.
+        """
+        self.sink = sink
+        if column_limit is None and sink is not None:
+            column_limit = column_error_limit
+        self.column_limit = column_limit
+        self.formatted = FormattedErrors(self)
+        self.clear()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.rows)))]
+        return (self.rows[index], self.columns[index], self.value_names[self.values[index]],
+                self.reason_names[self.reasons[index]], self.positions[index])
+
+    def code(self, names, codes, name):
+        """Returns the code of a name in a table, adding it if it is new"""
+        code = codes.get(name)
+        if code is None:
+            code = codes[name] = len(names)
+            names.append(name)
+        return code
+
+    def add(self, row, column, value, reason, position):
+        """Adds an error.
+
+        Keyword arguments:
+            row -- Row of the cell, numbered from 0 including the rows before the data and
+            invalid rows.
+
+            column -- Number of the column of the cell.
+
+            value -- Value of the cell.
+
+            reason -- Reason the cell is an error.
+
+            position -- Position of the cell in the values of the column.
+        """
+        self.total += 1
+        kept = self.column_totals.get(column, 0)
+        self.column_totals[column] = kept + 1
+        # The errors of a column are added in position order, so a new cell is a new position
+        if self.last_positions.get(column) != position:
+            self.last_positions[column] = position
+            self.column_cells[column] = self.column_cells.get(column, 0) + 1
+        if self.sink is not None:
+            self.sink.write((row, column, value, reason, position))
+        if self.column_limit is not None and kept >= self.column_limit:
+            return
+        self.rows.append(row)
+        self.columns.append(column)
+        self.positions.append(position)
+        self.reasons.append(self.code(self.reason_names, self.reason_codes, reason))
+        self.values.append(self.code(self.value_names, self.value_codes, value))
+
+    def append(self, error):
+        """Adds an error given as a (row, column, value, reason, position) tuple"""
+        self.add(*error)
+
+    def clear(self):
+        """Removes all errors, errors already written to the sink are left in it"""
+        self.total = 0
+        self.column_totals = {}
+        self.column_cells = {}
+        self.last_positions = {}
+        self.rows = array('Q')
+        self.columns = array('I')
+        self.positions = array('Q')
+        self.reasons = array('I')
+        self.values = array('I')
+        self.reason_names = []
+        self.reason_codes = {}
+        self.value_names = []
+        self.value_codes = {}
+
+    def format(self, index):
+        """Returns the text of the error at an index, with the row and column numbered from 1"""
+        reason = self.reason_names[self.reasons[index]]
+        if reason == empty_reason:
+            return "Row: %d Column: %d  - %s" % (self.rows[index] + 1, self.columns[index] + 1, reason)
+        return "Row: %d Column: %d Value: %s - %s" % (self.rows[index] + 1, self.columns[index] + 1,
+                                                      self.value_names[self.values[index]], reason)
+
+    def column_counts(self):
+        """Returns a dictionary of the number of errors added for each column by column number"""
+        return dict(self.column_totals)
+
+    def cell_counts(self):
+        """Returns a dictionary of the number of cells with an error in each column by column
+        number"""
+        return dict(self.column_cells)
+
+
+class FormattedErrors(Sequence):
+    """The text of each error in an ErrorStore, made as each is indexed so the text of errors
+    that are never shown is never made. Supports indexing, slicing, iteration and len as a
+    list would.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.store.format(i) for i in range(*index.indices(len(self.store)))]
+        if index < 0:
+            index += len(self.store)
+        if not 0 <= index < len(self.store):
+            raise IndexError('error index out of range')
+        return self.store.format(index)
+
+    def clear(self):
+        """Removes all errors from the store"""
+        self.store.clear()
+
+
+class CSVErrorSink(object):
+    """Writes errors to a CSV file as they are found, one row per error with the fields in
+    error_fields and the row and column numbered from 1 as in the report.
+
+    Methods:
+        write -- Writes an error.
+
+        close -- Closes the file.
+
+    Variables:
+        filename -- Name of the file written to.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(error_fields)
+
+    def write(self, error):
+        """Writes an error given as a (row, column, value, reason, position) tuple"""
+        row, column, value, reason, position = error
+        self.writer.writerow((row + 1, column + 1, value, reason))
+
+    def close(self):
+        """Closes the file"""
+        self.file.close()
+
+
+class JSONErrorSink(object):
+    """Writes errors to a newline delimited JSON file as they are found, one object per line
+    with the fields in error_fields and the row and column numbered from 1 as in the report.
+
+    Methods:
+        write -- Writes an error.
+
+        close -- Closes the file.
+
+    Variables:
+        filename -- Name of the file written to.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, 'w', encoding='utf-8')
+
+    def write(self, error):
+        """Writes an error given as a (row, column, value, reason, position) tuple"""
+        row, column, value, reason, position = error
+        self.file.write(json.dumps(OrderedDict(zip(error_fields, (row + 1, column + 1, value, reason)))))
+        self.file.write('\n')
+
+    def close(self):
+        """Closes the file"""
+        self.file.close()
+
+
+def error_sink(filename):
+    """Returns an error sink writing to the given file, newline delimited JSON if the file
+    name ends in .json, .jsonl or .ndjson and CSV otherwise.
+
+    Keyword arguments:
+        filename -- Name of the file errors are written to.
+    """
+    if os.path.splitext(filename)[1].lower() in ('.json', '.jsonl', '.ndjson'):
+        return JSONErrorSink(filename)
+    return CSVErrorSink(filename)
@@ -59,7 +59,7 @@ init();
 <br>&nbsp<br>
 <br>&nbsp<br>
 <div class="container">
-    <h1>Analysis Report of {filename}</h1>
+    <h1>Analysis Report of {filename}</h1>{sample_note}
 </div>
 
 <div class="container">
@@ -3,6 +3,26 @@ to process the data for the data class"""
 
 import csv
 
+
+def column_numbers(cells):
+    """Returns the numbers of the columns listed in the cells of a template row, counted from
+    0. Each cell is a column number or an inclusive range of columns such as 3-7, counted
+    from 1.
+
+    Keyword arguments:
+        cells -- The cells of the row after the option name.
+    """
+    numbers = []
+    for cell in cells:
+        cell = cell.strip()
+        if cell.isdigit():
+            numbers.append(int(cell) - 1)
+        elif '-' in cell:
+            low, high = sorted(int(x) for x in cell.split('-'))
+            numbers.extend(range(low - 1, high))
+    return numbers
+
+
 class Template(object):
     """Object storing user input that describes data given. Able to specify:
     
@@ -32,6 +52,22 @@ class Template(object):
                 values numeric values can take.
             
                 ignore_set -- A set listing all the columns that empty cells are to be ignored in.
+
+                quantile_sketch -- Size of the quantile sketch used to estimate the quartiles of
+                numeric columns, 0 (the default) finds them exactly.
+
+                ignore_na -- True to ignore N/A values in every column, or a list of the columns
+                to ignore them in.
+
+                delete_set -- List of the columns deleted from the data.
+
+                display -- List of the columns to display, every other column is left out of
+                the data. Empty to display every column.
+
+                hide -- List of the columns left out of the data.
+
+            Deleted, hidden and columns not displayed are never read into the data. Columns
+            may be given as ranges, i.e. display,1-5,8.
         
             Columns and rows start at 1 not 0
         
@@ -52,10 +88,11 @@ class Template(object):
         self.std_devs = 3
         self.range_vals = []
         self.ignore_set = set()
-        self.ignore_set = False
+        self.ignore_na = False
         self.delete_set = []
         self.display = []
         self.hide = []
+        self.quantile_sketch = 0
 
         self.read(filename)
         
@@ -103,16 +140,15 @@ class Template(object):
                         if row[1] == 'all':
                             self.ignore_na = True
                         else:
-                            self.ignore_na = []
-                            for col in row[1:]:
-                                if isinstance(col,int):
-                                    self.ignore_na.append(int(col))
+                            self.ignore_na = column_numbers(row[1:])
                     elif row[0].lower() == 'threshold_val':
                         self.threshold_val = float(row[1])
                     elif row[0].lower() == 'enum_threshold_val':
                         self.enum_threshold_val = int(row[1])    
                     elif row[0].lower() == 'std_dev': 
                         self.std_devs = float(row[1])
+                    elif row[0].lower() == 'quantile_sketch':
+                        self.quantile_sketch = int(row[1])
                     elif row[0].lower() == 'range':
                         self.range_vals.append(float(row[1]))
                         self.range_vals.append(float(row[2]))
@@ -120,33 +156,10 @@ class Template(object):
                         for value in row[1:]:
                             self.ignore_set.add(int(value) - 1)
                     elif row[0].lower() == 'delete_col':
-                        for col in row[1:]:
-                            self.delete_set.append(int(col))
+                        self.delete_set.extend(column_numbers(row[1:]))
                     elif row[0].lower() == 'display':
-                        for col in row[1:]:
-                            if isinstance(col,int):
-                                self.display.append(int(col)-1)
-                            elif '-' in col:
-                                display_range = col.split('-')
-                                display_range = [ int(x) for x in display_range]
-                                if display_range[0] > display_range[1]:
-                                    temp = display_range[0]
-                                    display_range[0] = display_range[1]
-                                    display_range[1] = temp
-                                for i in range(int(display_range[0], int(display_range[1]))):
-                                    self.display.append(i-1)
+                        self.display.extend(column_numbers(row[1:]))
                     elif row[0].lower() == 'hide':
-                        for col in row[1:]:
-                            if isinstance(col,int):
-                                self.hide.append(int(col)-1)
-                            elif '-' in col:
-                                hide_range = col.split('-')
-                                hide_range = [ int(x) for x in hide_range]
-                                if hide_range[0] > hide_range[1]:
-                                    temp = hide_range[0]
-                                    hide_range[0] = hide_range[1]
-                                    hide_range[1] = temp
-                                for i in range(int(hide_range[0]), int(hide_range[1])):
-                                    self.hide.append(i-1)
+                        self.hide.extend(column_numbers(row[1:]))
                     else:
                         print("Not an option: ", row)
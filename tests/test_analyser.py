@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-15 -*-
+"""Tests of the statistics of numeric columns, run from the main directory with
+python -m unittest discover tests
+"""
+import os
+import random
+import sys
+import unittest
+from bisect import bisect_left, bisect_right
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import analyser
+from analyser import NumericalAnalyser, describe, describe_sketch
+from storage import NumericVector
+
+
+class DescribeSketchTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(4)
+        self.numbers = [rng.gauss(100, 15) for i in range(100000)]
+        # Single extremes in the middle of the column, which a compacted sketch may drop
+        self.numbers[31234] = -500.25
+        self.numbers[77777] = 900.75
+        values = ['%.2f' % x for x in self.numbers] + ['', 'n/a']
+        self.vector = NumericVector(values, NumericalAnalyser.parse)
+        self.numbers = [float(value) for value in values[:-2]]
+
+    def test_exact_min_and_max(self):
+        # Read in several chunks so the minimum and maximum are merged across them
+        chunk_size = analyser.sketch_chunk_size
+        analyser.sketch_chunk_size = 30000
+        try:
+            stats = describe_sketch(self.vector, 1.5, 10, 50)
+        finally:
+            analyser.sketch_chunk_size = chunk_size
+        self.assertEqual(stats['min'], -500.25)
+        self.assertEqual(stats['max'], 900.75)
+        self.assertEqual(stats['moments'].n, len(self.numbers))
+
+    def test_quartiles_within_rank_error(self):
+        stats = describe(self.vector, 1.5, 10, quantile_sketch=200)
+        exact = describe(self.vector, 1.5, 10)
+        self.assertEqual((stats['min'], stats['max']), (exact['min'], exact['max']))
+        self.assertAlmostEqual(stats['mean'], exact['mean'], places=9)
+        self.assertAlmostEqual(stats['stdev'], exact['stdev'], places=9)
+        self.assertIsNone(exact['quantile_error'])
+        error = stats['quantile_error']
+        self.assertGreater(error, 0)
+        ordered = sorted(self.numbers)
+        for key, q in (('quartile_low', 0.25), ('median', 0.5), ('quartile_up', 0.75)):
+            low = bisect_left(ordered, stats[key]) / len(ordered)
+            high = bisect_right(ordered, stats[key]) / len(ordered)
+            self.assertLessEqual(low - error, q)
+            self.assertGreaterEqual(high + error, q)
+        # The two extremes are the furthest outliers either way
+        rows = list(stats['outlier_rows'])
+        self.assertEqual((rows[0], rows[-1]), (31234, 77777))
+
+
+if __name__ == '__main__':
+    unittest.main()
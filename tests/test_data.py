@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-15 -*-
+"""Tests of reading the rows of a file into columns, run from the main directory with
+python -m unittest discover tests
+"""
+import contextlib
+import csv
+import gzip
+import io
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data
+from data import Data
+
+csv_files = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'csv_files')
+
+# Delimiter, number of columns and number of invalid rows of each file in csv_files
+fixtures = {
+    'Backslash.csv': ('\\', 6, 0),
+    'Empty Cell Test.csv': (',', 2, 21),
+    'SampleFile.csv': (',', 21, 1),
+    'Tabs.csv': ('Tab', 5, 0),
+    'TabsSem.csv': ('Tab', 5, 0),
+    'Test B errors 2.csv': (',', 19, 0),
+    'Test B errors 3.csv': (',', 19, 1),
+    'Test B errors.csv': (',', 24, 0),
+    'Test B.csv': (',', 24, 0),
+    'Type_test.csv': (',', 8, 0),
+    'Type_test_1err.csv': (',', 8, 0),
+    'basic_errors.csv': (',', 6, 0),
+    'bools.csv': (',', 4, 0),
+    'dash.csv': ('-', 5, 0),
+    'date.csv': (',', 6, 0),
+    'email.csv': (',', 4, 0),
+    'pipe.csv': ('|', 3, 0),
+    'semicolon.csv': (';', 5, 0),
+    'separated_data.csv': (',', 1, 0),
+    'space.csv': ('Space', 3, 2),
+    'space2.csv': ('Space', 3, 0),
+}
+
+
+def read(filename, stream=False, **kwargs):
+    """Returns the Data of a file with its rows read into columns"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        loaded = Data(filename, stream=stream, **kwargs)
+        if stream:
+            loaded.load()
+        else:
+            loaded.remove_invalid()
+            loaded.create_columns()
+    return loaded
+
+
+def analyse(filename):
+    """Returns the Data of a file once analysed as the application does"""
+    loaded = read(filename)
+    with contextlib.redirect_stdout(io.StringIO()):
+        loaded.clean()
+        loaded.pre_analysis()
+        loaded.find_errors()
+        loaded.analysis()
+    return loaded
+
+
+def snapshot(loaded):
+    """Returns everything read from a file, to compare the ways of reading it"""
+    return (loaded.delimiter_type, loaded.raw_data, list(loaded.invalid_rows),
+            list(loaded.invalid_rows_indexes), list(loaded.invalid_rows_pos),
+            loaded.formatted_invalid_rows, [(column.header, list(column.values)) for column in loaded.columns])
+
+
+class FixtureTest(unittest.TestCase):
+
+    def test_csv_files(self):
+        names = sorted(name for name in os.listdir(csv_files) if name.endswith('.csv'))
+        self.assertEqual(names, sorted(fixtures))
+        for name in names:
+            delimiter, columns, invalid = fixtures[name]
+            filename = os.path.join(csv_files, name)
+            loaded = read(filename)
+            self.assertEqual((name, loaded.delimiter_type, len(loaded.columns), len(loaded.invalid_rows)),
+                             (name, delimiter, columns, invalid))
+            streamed = read(filename, stream=True)
+            self.assertEqual(snapshot(streamed)[1:], snapshot(loaded)[1:], name)
+
+    def test_mixed_delimiters(self):
+        # The ;0.23 cell of the tab delimited file is kept as it is, so width is not a number
+        loaded = analyse(os.path.join(csv_files, 'TabsSem.csv'))
+        self.assertEqual([column.type for column in loaded.columns],
+                         ['Integer', 'Integer', 'Float', 'String', 'Numeric'])
+        self.assertIn(';0.23', list(loaded.columns[3].values))
+
+    def test_space_delimiter(self):
+        # Runs of spaces between values are a single delimiter
+        loaded = read(os.path.join(csv_files, 'space.csv'))
+        self.assertTrue(loaded.dialect['skipinitialspace'])
+        self.assertEqual([list(column.values)[:3] for column in loaded.columns],
+                         [['1', '3', '3'], ['2', '4', '5'], ['3', '5', '7']])
+        self.assertEqual(loaded.formatted_invalid_rows, [['Row: 2'], ['Row: 13']])
+
+
+class ParallelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.range_size = data.range_size
+        data.range_size = 20000
+
+    def tearDown(self):
+        data.range_size = self.range_size
+        shutil.rmtree(self.directory)
+
+    def write(self, name, quote, delimiter=','):
+        """Writes a file with a line before the header, quoted delimiters and new lines in
+        quoted fields and some invalid rows, returns its filename"""
+        rng = random.Random(8)
+        filename = os.path.join(self.directory, name)
+        with open(filename, 'w', newline='', encoding='ISO-8859-1') as fp:
+            fp.write('\nid%sname%snote%svalue\n' % (delimiter, delimiter, delimiter))
+            for i in range(30000):
+                r = rng.random()
+                if r < 0.01:
+                    fp.write('%d%sbad\n' % (i, delimiter))
+                elif r < 0.4:
+                    name = '%smulti\nline %s%s %d%s' % (quote, quote, quote, i, quote)
+                    note = quote + 'a' + delimiter + 'b' + quote
+                    fp.write(delimiter.join(['%d' % i, name, note, '%f' % rng.random()]) + '\r\n')
+                else:
+                    fp.write('%d%sname%d%snote%s%d\n' % (i, delimiter, i % 50, delimiter, delimiter,
+                                                         rng.randint(0, 1000)))
+        return filename
+
+    def assertSame(self, loaded, expected):
+        # Sizes first, as a difference of the whole snapshots takes long to show
+        self.assertEqual([len(column.values) for column in loaded.columns],
+                         [len(column.values) for column in expected.columns])
+        self.assertEqual(loaded.invalid_rows_indexes, expected.invalid_rows_indexes)
+        self.assertTrue(snapshot(loaded) == snapshot(expected))
+
+    def assertParallel(self, filename):
+        serial = read(filename, stream=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            parallel = Data(filename, stream=True, workers=4)
+            self.assertTrue(parallel.load_parallel())
+        self.assertSame(parallel, serial)
+        self.assertSame(read(filename), serial)
+        self.assertGreater(len(serial.invalid_rows), 0)
+        self.assertEqual(len(serial.columns[0].values) + len(serial.invalid_rows), 30000)
+        return serial
+
+    def test_quoted_fields(self):
+        filename = self.write('quoted.csv', '"')
+        serial = self.assertParallel(filename)
+        self.assertTrue(any(name.startswith('multi\nline " ') for name in serial.columns[1].values))
+        self.assertIn('a,b', list(serial.columns[2].values))
+        compressed = filename + '.gz'
+        with open(filename, 'rb') as source, gzip.open(compressed, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        self.assertSame(read(compressed, stream=True), serial)
+
+    def test_other_quote_character(self):
+        filename = self.write('single.csv', "'", '|')
+        serial = self.assertParallel(filename)
+        self.assertEqual(serial.dialect['quotechar'], "'")
+        self.assertEqual(serial.delimiter_type, '|')
+        self.assertTrue(any(name.startswith("multi\nline ' ") for name in serial.columns[1].values))
+        self.assertIn('a|b', list(serial.columns[2].values))
+
+
+class SourceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        rng = random.Random(9)
+        self.header = ['id', 'name', 'amount', 'note']
+        self.rows = [(i, 'name %d' % (i % 40), round(rng.uniform(0, 100), 2) if i % 17 else None,
+                      'a, "quoted"\nnote' if i % 50 == 0 else 'note') for i in range(500)]
+        self.connection = sqlite3.connect(':memory:')
+        self.connection.execute('CREATE TABLE extract (id INTEGER, name TEXT, amount REAL, note TEXT)')
+        self.connection.executemany('INSERT INTO extract VALUES (?, ?, ?, ?)', self.rows)
+        # The same rows written to a csv file, None as an empty value
+        self.filename = os.path.join(self.directory, 'extract.csv')
+        with open(self.filename, 'w', newline='') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(self.header)
+            for row in self.rows:
+                writer.writerow(['' if value is None else value for value in row])
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.directory)
+
+    def cursor(self):
+        return self.connection.execute('SELECT * FROM extract ORDER BY id')
+
+    def test_cursor_matches_file(self):
+        expected = read(self.filename, stream=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            streamed = Data.from_cursor(self.cursor(), stream=True, name='extract')
+            streamed.load()
+            loaded = Data.from_cursor(self.cursor(), name='extract')
+            loaded.remove_invalid()
+            loaded.create_columns()
+        self.assertEqual(snapshot(streamed)[1:], snapshot(expected)[1:])
+        self.assertEqual(snapshot(loaded)[2:], snapshot(read(self.filename))[2:])
+        self.assertEqual(list(loaded.columns[3].values)[0], 'a, "quoted"\nnote')
+
+    def test_load_without_stream(self):
+        # Rows read when the Data is created can be read again by load()
+        expected = read(self.filename, stream=True)
+        with contextlib.redirect_stdout(io.StringIO()):
+            loaded = Data.from_cursor(self.cursor())
+            self.assertEqual(len(loaded.raw_data), len(self.rows) + 1)
+            loaded.load()
+        self.assertEqual(snapshot(loaded)[2:], snapshot(expected)[2:])
+
+    def test_stream_read_once(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            streamed = Data.from_rows(self.header, iter(self.rows), stream=True)
+            streamed.load()
+            self.assertEqual(len(streamed.columns[0].values), len(self.rows))
+            with self.assertRaises(ValueError):
+                streamed.load()
+
+
+if __name__ == '__main__':
+    unittest.main()
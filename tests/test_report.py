@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-15 -*-
+"""Tests of the html report of a file, run from the main directory with
+python -m unittest discover tests
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import column
+from data import Data
+from report import Report
+
+
+def analyse(filename):
+    """Returns the Data of a file once analysed as the application does"""
+    data = Data(filename)
+    data.remove_invalid()
+    data.create_columns()
+    data.clean()
+    data.pre_analysis()
+    data.find_errors()
+    data.analysis()
+    return data
+
+
+class NumericalAnalysisTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'numbers.csv')
+        # Each number appears as many times as its position in the list
+        rows = []
+        for count, number in enumerate([70, 30, 90, 10, 50, 20, 80], 1):
+            rows += [number] * count
+        random.Random(6).shuffle(rows)
+        with open(self.filename, 'w') as fp:
+            fp.write('number,id\n')
+            for i, number in enumerate(rows):
+                fp.write('%d,%d\n' % (number, i))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_least_common_order(self):
+        data = analyse(self.filename)
+        numbers = data.columns[0]
+        self.assertEqual(numbers.most_common[:3], [('80', 7), ('20', 6), ('50', 5)])
+        self.assertEqual(numbers.least_common[:3], [('70', 1), ('30', 2), ('90', 3)])
+        cells = Report(data).numerical_analysis().split('</td><td>')
+        self.assertEqual(cells[1], '(80, 7)<br>(20, 6)<br>(50, 5)<br>(10, 4)<br>(90, 3)')
+        self.assertEqual(cells[2], '(70, 1)<br>(30, 2)<br>(90, 3)<br>(10, 4)<br>(50, 5)')
+
+    def test_no_least_common(self):
+        # Past frequency_limit only the most common values are counted
+        limit = column.frequency_limit
+        column.frequency_limit = 5
+        try:
+            data = analyse(self.filename)
+        finally:
+            column.frequency_limit = limit
+        numbers = data.columns[0]
+        self.assertEqual(numbers.least_common, [])
+        self.assertEqual(numbers.most_common[:3], [('80', 7), ('20', 6), ('50', 5)])
+        cells = Report(data).numerical_analysis().split('</td><td>')
+        self.assertEqual(cells[1], '(80, 7)<br>(20, 6)<br>(50, 5)<br>(10, 4)<br>(90, 3)')
+        self.assertEqual(cells[2], '')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-15 -*-
+"""Tests of the mergeable summaries of the values of a column, run from the main directory
+with python -m unittest discover tests
+"""
+import os
+import random
+import statistics
+import sys
+import unittest
+from collections import Counter
+from bisect import bisect_left, bisect_right
+from math import fsum
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import column
+from column import Column
+from sketch import Moments, KLL, DistinctCount, SpaceSaving
+
+
+def rank_range(ordered, x):
+    """Returns the lowest and highest fraction of the sorted values at or below x"""
+    return bisect_left(ordered, x) / len(ordered), bisect_right(ordered, x) / len(ordered)
+
+
+class MomentsTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(1)
+        self.values = [rng.gauss(50, 10) for i in range(5000)] + [rng.expovariate(0.1) for i in range(3000)]
+        rng.shuffle(self.values)
+
+    def assertMoments(self, moments, values):
+        self.assertEqual(moments.n, len(values))
+        self.assertAlmostEqual(moments.mean, statistics.mean(values), places=9)
+        self.assertAlmostEqual(moments.variance(), statistics.pvariance(values), places=7)
+        self.assertAlmostEqual(moments.stdev(), statistics.pstdev(values), places=8)
+        mean = statistics.mean(values)
+        m2 = fsum((x - mean) ** 2 for x in values) / len(values)
+        m3 = fsum((x - mean) ** 3 for x in values) / len(values)
+        m4 = fsum((x - mean) ** 4 for x in values) / len(values)
+        self.assertAlmostEqual(moments.skewness(), m3 / m2 ** 1.5, places=9)
+        self.assertAlmostEqual(moments.kurtosis(), m4 / m2 ** 2, places=9)
+
+    def test_of(self):
+        self.assertMoments(Moments.of(self.values), self.values)
+
+    def test_add(self):
+        moments = Moments()
+        for x in self.values:
+            moments.add(x)
+        self.assertMoments(moments, self.values)
+
+    def test_merge(self):
+        # Uneven splits, including an empty one, merged in different orders
+        for cuts in ((0, 1, 4000, 8000), (0, 2500, 2500, 7999, 8000), (0, 17, 333, 6000, 8000)):
+            parts = [self.values[start:stop] for start, stop in zip(cuts, cuts[1:])]
+            merged = Moments()
+            for part in parts:
+                merged.merge(Moments.of(part))
+            self.assertMoments(merged, self.values)
+            merged = Moments()
+            for part in reversed(parts):
+                other = Moments()
+                other.update(part)
+                merged.merge(other)
+            self.assertMoments(merged, [x for part in reversed(parts) for x in part])
+
+    def test_empty_and_constant(self):
+        self.assertIsNone(Moments().variance())
+        self.assertIsNone(Moments().stdev())
+        constant = Moments.of([3.0] * 10)
+        self.assertEqual(constant.variance(), 0)
+        self.assertIsNone(constant.skewness())
+        self.assertIsNone(constant.jarque_bera())
+        self.assertIsNone(constant.normaltest())
+
+    def test_normaltest(self):
+        rng = random.Random(2)
+        gaussian = Moments.of([rng.gauss(0, 1) for i in range(5000)])
+        skewed = Moments.of([rng.expovariate(1) for i in range(5000)])
+        self.assertTrue(gaussian.normaltest())
+        self.assertLess(abs(gaussian.skewness()), 0.1)
+        self.assertLess(abs(gaussian.kurtosis() - 3), 0.2)
+        self.assertFalse(skewed.normaltest())
+        self.assertGreater(skewed.jarque_bera(), 1000)
+
+
+class KLLTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(3)
+        self.values = [rng.gauss(0, 1) for i in range(200000)]
+        self.ordered = sorted(self.values)
+        self.fractions = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+    def assertRanks(self, quantiles):
+        error = quantiles.rank_error()
+        self.assertGreater(error, 0)
+        for q in self.fractions:
+            low, high = rank_range(self.ordered, quantiles.quantile(q))
+            self.assertLessEqual(low - error, q)
+            self.assertGreaterEqual(high + error, q)
+
+    def test_quantile_within_rank_error(self):
+        quantiles = KLL()
+        quantiles.update(self.values)
+        self.assertEqual(quantiles.n, len(self.values))
+        self.assertRanks(quantiles)
+        # The sketch holds O(k) numbers however many are added
+        self.assertLess(sum(len(compactor) for compactor in quantiles.levels), 3 * quantiles.k)
+        self.assertAlmostEqual(quantiles.quantile(0.5), statistics.median(self.values), delta=0.05)
+
+    def test_add_matches_update(self):
+        added = KLL()
+        for x in self.values[:20000]:
+            added.add(x)
+        updated = KLL()
+        updated.update(self.values[:20000])
+        self.assertEqual(added.levels, updated.levels)
+
+    def test_merge_halves(self):
+        half = len(self.values) // 2
+        whole = KLL()
+        whole.update(self.values)
+        first = KLL()
+        first.update(self.values[:half])
+        second = KLL(seed=1)
+        second.update(self.values[half:])
+        merged = first.merge(second)
+        self.assertEqual(merged.n, len(self.values))
+        self.assertRanks(merged)
+        error = whole.rank_error() + merged.rank_error()
+        for q in self.fractions:
+            whole_rank = rank_range(self.ordered, whole.quantile(q))[0]
+            merged_rank = rank_range(self.ordered, merged.quantile(q))[0]
+            self.assertLessEqual(abs(whole_rank - merged_rank), error)
+
+    def test_exact_until_compacted(self):
+        quantiles = KLL()
+        quantiles.update([5, 1, 4, 2, 3])
+        self.assertEqual(quantiles.rank_error(), 0)
+        self.assertEqual([quantiles.quantile(q) for q in (0, 0.2, 0.5, 1)], [1, 1, 3, 5])
+        self.assertIsNone(KLL().quantile(0.5))
+
+
+class DistinctCountTest(unittest.TestCase):
+
+    def test_switch_at_limit(self):
+        distinct = DistinctCount(limit=1000)
+        distinct.update(['value %d' % i for i in range(1000)] * 2)
+        self.assertTrue(distinct.exact)
+        self.assertEqual(distinct.count(), 1000)
+        self.assertEqual(distinct.n, 2000)
+        distinct.add('value 1000')
+        self.assertFalse(distinct.exact)
+        self.assertAlmostEqual(distinct.count(), 1001, delta=1001 * 3 * 0.0082)
+        distinct.update(['value %d' % i for i in range(1001, 5000)])
+        self.assertFalse(distinct.exact)
+        self.assertAlmostEqual(distinct.count(), 5000, delta=5000 * 3 * 0.0082)
+
+    def test_estimate_at_most_values_added(self):
+        # Every value distinct, as in an id column, where the estimate alone may come out high
+        ids = [str(i) for i in range(300000)]
+        distinct = DistinctCount()
+        distinct.update(ids)
+        self.assertFalse(distinct.exact)
+        self.assertLessEqual(distinct.count(), len(ids))
+        self.assertGreater(distinct.count(), len(ids) * 0.97)
+        column = Column('id')
+        self.assertLessEqual(column.uniqueCount(ids), len(ids))
+        self.assertFalse(column.unique_exact)
+
+    def test_merge_chunks(self):
+        values = ['value %d' % (i % 1500) for i in range(6000)]
+        chunks = [values[start:start + 1000] for start in range(0, len(values), 1000)]
+        merged = DistinctCount(limit=2000)
+        for chunk in chunks:
+            counted = DistinctCount(limit=2000)
+            counted.update(chunk)
+            merged.merge(counted)
+        self.assertTrue(merged.exact)
+        self.assertEqual(merged.count(), 1500)
+        self.assertEqual(merged.n, len(values))
+        # Chunks under the limit whose union is over it, merged in with estimated counts
+        values = ['value %d' % i for i in range(6000)]
+        merged = DistinctCount(limit=2000)
+        whole = DistinctCount(limit=2000)
+        whole.update(values)
+        for start in range(0, len(values), 1500):
+            counted = DistinctCount(limit=2000)
+            counted.update(values[start:start + 1500] + values[:100])
+            self.assertTrue(counted.exact)
+            merged.merge(counted)
+        self.assertFalse(merged.exact)
+        self.assertEqual(merged.sketch.registers, whole.sketch.registers)
+        self.assertEqual(merged.n, 6400)
+        estimated = DistinctCount(limit=2000)
+        estimated.update(values[:3000])
+        self.assertFalse(estimated.exact)
+        exact = DistinctCount(limit=2000)
+        exact.update(values[3000:4000])
+        estimated.merge(exact)
+        self.assertAlmostEqual(estimated.count(), 4000, delta=4000 * 3 * 0.0082)
+
+
+class SpaceSavingTest(unittest.TestCase):
+
+    def setUp(self):
+        # Zipf distributed values, a few common and thousands seen once or twice
+        rng = random.Random(5)
+        weights = [1 / pow(rank, 1.3) for rank in range(1, 20001)]
+        total = fsum(weights)
+        cumulative = []
+        running = 0.0
+        for weight in weights:
+            running += weight / total
+            cumulative.append(running)
+        self.values = ['v%d' % min(bisect_left(cumulative, rng.random()), 19999)
+                       for i in range(100000)]
+        self.counts = Counter(self.values)
+
+    def assertBounds(self, summary):
+        for value, count in summary.counts.items():
+            self.assertLessEqual(summary.guaranteed(value), self.counts[value])
+            self.assertGreaterEqual(count, self.counts[value])
+            self.assertLessEqual(summary.errors[value], summary.n / summary.capacity)
+
+    def test_most_common(self):
+        summary = SpaceSaving(200)
+        summary.update(self.values)
+        self.assertEqual(summary.n, len(self.values))
+        self.assertEqual(len(summary.counts), 200)
+        self.assertBounds(summary)
+        expected = self.counts.most_common(15)
+        self.assertEqual([value for value, count in summary.most_common(15)],
+                         [value for value, count in expected])
+        # The most common values are never replaced, so their counts are exact
+        self.assertEqual([summary.guaranteed(value) for value, count in expected],
+                         [count for value, count in expected])
+        self.assertEqual(summary.guaranteed('not added'), 0)
+
+    def test_merge(self):
+        first = SpaceSaving(200)
+        first.update(self.values[:60000])
+        second = SpaceSaving(200)
+        second.update(self.values[60000:])
+        merged = first.merge(second)
+        self.assertEqual(merged.n, len(self.values))
+        self.assertLessEqual(len(merged.counts), 200)
+        self.assertBounds(merged)
+        self.assertEqual([value for value, count in merged.most_common(10)],
+                         [value for value, count in self.counts.most_common(10)])
+
+    def test_column_past_frequency_limit(self):
+        limit = column.frequency_limit
+        column.frequency_limit = 1000
+        try:
+            col = Column('values')
+            col.add_values(self.values)
+            self.assertIsNone(col.frequencies())
+            heavy = col.heavy
+            self.assertIsNotNone(heavy)
+            self.assertBounds(heavy)
+            for value, count in self.counts.most_common(20):
+                self.assertEqual(heavy.guaranteed(value), count)
+            col.define_most_least_common()
+        finally:
+            column.frequency_limit = limit
+        self.assertEqual(col.most_common, self.counts.most_common(15))
+        self.assertEqual(col.least_common, [])
+        # Distinct values are still counted exactly up to sketch.distinct_limit
+        self.assertTrue(col.unique_exact)
+        self.assertEqual(col.unique, len(self.counts))
+
+    def test_least_common_order(self):
+        col = Column('values')
+        col.add_values(['c', 'a', 'b', 'a', 'd', 'b', 'a', 'e', 'e', 'c', 'a', 'f', 'b'])
+        col.define_most_least_common()
+        self.assertEqual(col.most_common[:2], [('a', 4), ('b', 3)])
+        # Fewest first, values with the same count in the order they were first seen
+        self.assertEqual(col.least_common, [('d', 1), ('f', 1), ('c', 2), ('e', 2), ('b', 3), ('a', 4)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-15 -*-
+"""Tests of the storage of the values of a column, run from the main directory with
+python -m unittest discover tests
+"""
+import os
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage
+from column import Column
+from storage import ColumnStore, DictionaryColumn, NumericColumn, RowMap
+
+
+def read_records(filename):
+    """Returns the values of every record in a column store file, in file order"""
+    values = []
+    with open(filename, 'rb') as fp:
+        data = fp.read()
+    pos = 0
+    while pos < len(data):
+        length = struct.unpack_from('<I', data, pos)[0]
+        pos += 4
+        values.append(data[pos:pos + length].decode('utf-8'))
+        pos += length
+    return values
+
+
+class ColumnStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'values.col')
+        # Small blocks so records run over the ends of blocks and the buffer is flushed
+        self.buffer_size = storage.buffer_size
+        storage.buffer_size = 64
+        self.values = ['%d' % i if i % 3 else 'a, "quoted"\nvalue %d \xe9' % i for i in range(200)]
+
+    def tearDown(self):
+        storage.buffer_size = self.buffer_size
+        shutil.rmtree(self.directory)
+
+    def test_extend_and_read(self):
+        store = ColumnStore(self.filename)
+        store.extend(self.values)
+        store.append('')
+        self.assertEqual(len(store), 201)
+        self.assertEqual(list(store), self.values + [''])
+        self.assertEqual(store[150], self.values[150])
+        self.assertEqual(store[-1], '')
+        self.assertEqual(store[10:20], self.values[10:20])
+        store.close()
+        self.assertEqual(read_records(self.filename), self.values + [''])
+
+    def test_edits_are_appended(self):
+        store = ColumnStore(self.filename)
+        store.extend(self.values)
+        expected = list(self.values)
+        for i in (0, 5, 77, 199):
+            store[i] = 'edited %d' % i
+            expected[i] = 'edited %d' % i
+        store[10:13] = ['x', 'y', 'z']
+        expected[10:13] = ['x', 'y', 'z']
+        with self.assertRaises(ValueError):
+            store[0:2] = ['too few']
+        self.assertEqual(store.edits, 7)
+        self.assertEqual(list(store), expected)
+        self.assertEqual([store[i] for i in range(len(store))], expected)
+        store.close()
+        # The replaced records stay in the file until it is compacted
+        self.assertEqual(read_records(self.filename), self.values + expected[:1] + expected[5:6]
+                         + expected[77:78] + expected[199:200] + ['x', 'y', 'z'])
+
+    def test_compact(self):
+        store = ColumnStore(self.filename)
+        store.extend(self.values)
+        expected = list(self.values)
+        for i in range(0, 200, 7):
+            store[i] = 'edited %d' % i
+            expected[i] = 'edited %d' % i
+        size = store.size
+        store.compact()
+        self.assertEqual(store.edits, 0)
+        self.assertLess(store.size, size)
+        self.assertEqual(os.path.getsize(self.filename), store.size)
+        self.assertFalse(os.path.exists(self.filename + '.compact'))
+        self.assertEqual(read_records(self.filename), expected)
+        self.assertEqual(list(store), expected)
+        # The store keeps working after it is compacted
+        store.append('after')
+        store[3] = 'again'
+        expected.append('after')
+        expected[3] = 'again'
+        self.assertEqual(list(store), expected)
+        store.compact()
+        store.close()
+        self.assertEqual(read_records(self.filename), expected)
+
+    def test_replace(self):
+        store = ColumnStore(self.filename)
+        store.extend(self.values)
+        store[0] = 'edited'
+        store.replace(['one', 'two'])
+        self.assertEqual(store.edits, 0)
+        self.assertEqual(list(store), ['one', 'two'])
+        store.close()
+        self.assertEqual(read_records(self.filename), ['one', 'two'])
+
+    def test_remove(self):
+        store = ColumnStore(self.filename)
+        store.extend(self.values)
+        store.remove()
+        self.assertFalse(os.path.exists(self.filename))
+        self.assertEqual(len(store), 0)
+        store.remove()
+
+    def test_column_values_on_disk(self):
+        cwd = os.getcwd()
+        os.chdir(self.directory)
+        try:
+            column = Column('values', offline=False)
+            column.add_values(self.values)
+            column.save_file()
+            filename = column.valuefilename
+            self.assertTrue(os.path.isfile(filename))
+            self.assertEqual(list(column.values), self.values)
+            values = column.values
+            values[1] = 'edited'
+            column.values = values
+            self.assertEqual(column.values[1], 'edited')
+            self.assertEqual(column.store.edits, 0)
+            column.values = ['new', 'values']
+            self.assertEqual(list(column.values), ['new', 'values'])
+            del column.values
+            self.assertFalse(os.path.exists(filename))
+        finally:
+            os.chdir(cwd)
+
+
+class TypedColumnTest(unittest.TestCase):
+
+    integers = ['0', '12', '-7', '9223372036854775807', '-9223372036854775808', '9223372036854775808',
+                '123456789012345678901234567890', '007', '+5', '-0', ' 3', '3 ', '1_000', '', '1.0',
+                'abc', 'N/A', '\u0663']
+    decimals = ['1.00', '.35', '-.5', '0.1', '2.50', '3', '-0.0', '-0', '1e5', '1E-3', '5.', '+1.5',
+                'nan', 'inf', '-inf', '0.30000000000000004', '12345678901234567.5', '1.' + '0' * 300,
+                '', 'abc', '0x10', '1,5']
+
+    def assertRoundTrip(self, column, values):
+        self.assertEqual(len(column), len(values))
+        self.assertEqual(list(column), values)
+        self.assertEqual([column[i] for i in range(len(values))], values)
+        self.assertEqual(column[-1], values[-1])
+        self.assertEqual(column[1:5], values[1:5])
+
+    def test_integer_column(self):
+        column = NumericColumn(self.integers)
+        self.assertRoundTrip(column, self.integers)
+        # Only the values which give back the same string are held as numbers
+        self.assertEqual(sorted(column.exceptions.values()),
+                         sorted(value for value in self.integers[5:] if value not in ('', '0', '12')))
+
+    def test_decimal_column(self):
+        column = NumericColumn(self.decimals, integer=False)
+        self.assertRoundTrip(column, self.decimals)
+        self.assertEqual(column.encode('1.00'), (1.0, 2))
+        self.assertEqual(column.encode('-0.0'), (-0.0, 1))
+        # Numbers written differently from how they are formatted are kept as strings
+        self.assertIsNone(column.encode('.35'))
+        self.assertIsNone(column.encode('1e5'))
+        self.assertEqual(column.exceptions[self.decimals.index('.35')], '.35')
+
+    def test_numeric_edits(self):
+        for integer, values in ((True, self.integers), (False, self.decimals)):
+            column = NumericColumn(values, integer)
+            expected = list(values)
+            for i, value in enumerate(reversed(values)):
+                column[i] = value
+                expected[i] = value
+            column[-1] = 'last'
+            expected[-1] = 'last'
+            column[2:4] = ['', '42']
+            expected[2:4] = ['', '42']
+            column.append('1.00')
+            expected.append('1.00')
+            self.assertRoundTrip(column, expected)
+            with self.assertRaises(IndexError):
+                column[len(expected)]
+            with self.assertRaises(ValueError):
+                column[0:2] = ['1']
+
+    def test_dictionary_column(self):
+        values = ['TRUE', 'FALSE', 'FALSE', 'TRUE', 'TRUE', 'FALSE', 'TRUE', 'TRUE', 'FALSE']
+        column = DictionaryColumn(values)
+        self.assertIsNone(column.codes)
+        self.assertRoundTrip(column, values)
+        column[0] = 'FALSE'
+        values[0] = 'FALSE'
+        self.assertRoundTrip(column, values)
+        # A third value widens the single bits to codes, which widen as values are added
+        values += [' true', '', 'True', '1.00', '.35']
+        column.extend(values[9:])
+        self.assertEqual(column.codes.typecode, 'B')
+        self.assertRoundTrip(column, values)
+        values += ['value %d' % i for i in range(300)]
+        column.extend(values[14:])
+        self.assertEqual(column.codes.typecode, 'H')
+        column[3] = 'value 299'
+        values[3] = 'value 299'
+        self.assertRoundTrip(column, values)
+        self.assertEqual(sorted(column.names), sorted(set(values)))
+        with self.assertRaises(IndexError):
+            column[len(values)] = 'x'
+
+    def test_column_encode_values(self):
+        floats = ['1.00', '.35', '2.5', '', '-0.10', '7', 'abc'] + ['%d.%02d' % (i, i % 100) for i in range(100)]
+        enum = ['Low', 'High', 'Medium', ''] * 30
+        for kind, values, storage_type in (('Float', floats, NumericColumn),
+                                           ('Integer', self.integers * 3 + ['1'] * 60, NumericColumn),
+                                           ('Enum', enum, DictionaryColumn)):
+            column = Column('values')
+            column.add_values(values)
+            column.type = kind
+            column.encode_values()
+            self.assertIsInstance(column.mvalues, storage_type)
+            self.assertEqual(list(column.values), values)
+            self.assertEqual(column.values[1], values[1])
+
+
+class RowMapTest(unittest.TestCase):
+
+    def random_map(self, rng, length):
+        """Returns a RowMap of invalid rows counts and the list of the same numbers"""
+        row_map = RowMap()
+        numbers = []
+        invalid = rng.choice((0, 0, 3))
+        for i in range(length):
+            if rng.random() < 0.1:
+                invalid += rng.randint(1, 3)
+            row_map.append(invalid)
+            numbers.append(invalid)
+        return row_map, numbers
+
+    def assertSame(self, row_map, numbers, rng):
+        self.assertEqual(len(row_map), len(numbers))
+        for i in rng.sample(range(len(numbers)), min(20, len(numbers))):
+            self.assertEqual(row_map[i], numbers[i])
+        if numbers:
+            self.assertEqual(row_map[-1], numbers[-1])
+            self.assertEqual(row_map[2:9], numbers[2:9])
+        self.assertEqual(list(row_map), numbers)
+
+    def test_matches_list(self):
+        rng = random.Random(7)
+        for trial in range(20):
+            row_map, numbers = self.random_map(rng, rng.randint(0, 50))
+            self.assertSame(row_map, numbers, rng)
+            for step in range(60):
+                action = rng.random()
+                if action < 0.3:
+                    offset = numbers[-1] + rng.choice((0, 0, 1)) if numbers else rng.choice((0, 2))
+                    row_map.append(offset)
+                    numbers.append(offset)
+                elif action < 0.5:
+                    other, other_numbers = self.random_map(rng, rng.randint(0, 30))
+                    added = rng.choice((0, numbers[-1] if numbers else 0, rng.randint(0, 9)))
+                    row_map.extend_map(other, added)
+                    numbers.extend(number + added for number in other_numbers)
+                elif numbers:
+                    # Several shifts before reading keep the changes in the tree
+                    for shift in range(rng.randint(1, 4)):
+                        position = rng.randrange(len(numbers))
+                        amount = rng.choice((-1, -2, 1))
+                        row_map.shift(position, amount)
+                        for i in range(position, len(numbers)):
+                            numbers[i] += amount
+                if rng.random() < 0.5:
+                    self.assertSame(row_map, numbers, rng)
+            self.assertSame(row_map, numbers, rng)
+
+    def test_no_invalid_rows(self):
+        row_map = RowMap()
+        row_map.extend([0] * 1000)
+        self.assertEqual(len(row_map.starts), 0)
+        self.assertEqual(list(row_map), [0] * 1000)
+        row_map.shift(1000, 1)
+        self.assertEqual(row_map[999], 0)
+        with self.assertRaises(IndexError):
+            row_map[1000]
+        row_map.clear()
+        self.assertEqual(list(row_map), [])
+
+
+if __name__ == '__main__':
+    unittest.main()